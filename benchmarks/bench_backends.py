@@ -0,0 +1,58 @@
+"""
+Latency comparison of the in-process XGBoost backend vs. the SageMaker backend.
+
+Runs fully offline: the SageMaker path talks to a stubbed endpoint that adds a
+configurable network delay. Usage:
+
+    python -m benchmarks.bench_backends --requests 2000 --endpoint-latency-ms 15
+"""
+import argparse
+import json
+import time
+
+from benchmarks.stubs import StubSageMakerRuntime
+from benchmarks.synthetic import make_feature_matrix, percentile_summary, train_synthetic_booster
+from src.inference.model_backend import LocalXGBoostBackend, SageMakerBackend, load_booster
+
+
+def time_single_rows(backend, X):
+    samples = []
+    for i in range(X.shape[0]):
+        start = time.perf_counter()
+        backend.predict_proba(X[i:i + 1])
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--endpoint-latency-ms", type=float, default=15.0)
+    parser.add_argument("--model-path", default=None, help="Use a real artifact instead of a synthetic booster")
+    args = parser.parse_args()
+
+    if args.model_path:
+        booster, _ = load_booster([args.model_path])
+    else:
+        booster = train_synthetic_booster()
+
+    X, _ = make_feature_matrix(args.requests, seed=7)
+    local = LocalXGBoostBackend(booster)
+    remote = SageMakerBackend("stub-endpoint", "us-east-1",
+                              client=StubSageMakerRuntime(booster, latency_ms=args.endpoint_latency_ms))
+
+    # Warm up both paths so the first call doesn't skew the tail
+    local.predict_proba(X[:1])
+    remote.predict_proba(X[:1])
+
+    results = {
+        "requests": args.requests,
+        "endpoint_latency_ms": args.endpoint_latency_ms,
+        "local": percentile_summary(time_single_rows(local, X)),
+        "sagemaker_stub": percentile_summary(time_single_rows(remote, X)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
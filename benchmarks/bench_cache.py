@@ -0,0 +1,133 @@
+"""
+Prediction cache: hit ratio, scoring throughput and memory on streamed vitals.
+
+Builds consumer-style inputs from stream_to_kinesis.generate_vital_data plus
+fixed per-patient demographics. Two event streams are compared: the generator
+as-is, and the same events with a share of device resends (exact repeats of
+one of the last few hundred events). Each stream is scored in
+get_records-sized pages, directly and through CachedBackend (as BatchScorer
+does), with two backends: the in-process booster, and the SageMaker backend
+against a stub endpoint with simulated round-trip latency. Also reports the
+cache's memory estimate against tracemalloc and checks that invalidate() (run
+on model reload) empties it. Finally drives /predict on the resend stream
+through the in-process ASGI app (as load_test) with the cache off and on, for
+both backends; there a hit also skips the micro-batcher's wait and, for the
+endpoint, the round trip. Usage:
+
+    python -m benchmarks.bench_cache --events 50000 --resend-share 0.3 --endpoint-latency-ms 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.load_test import load_api, run_load
+from benchmarks.stubs import StubCloudWatch, StubSageMakerRuntime
+from benchmarks.synthetic import make_patient_records, train_synthetic_booster
+
+
+def make_events(n, resend_share, patients=900, seed=0):
+    from src.streaming.consume_kinesis import build_input
+    from src.streaming.stream_to_kinesis import generate_vital_data
+    rng = random.Random(seed)
+    demographics = {f"P{100 + i}": r for i, r in enumerate(make_patient_records(patients, seed=seed))}
+    events = []
+    for _ in range(n):
+        if events and rng.random() < resend_share:
+            events.append(events[-rng.randint(1, min(len(events), 300))])
+            continue
+        vitals = generate_vital_data(rng=rng)
+        events.append(build_input(vitals, demographics[vitals["patient_id"]]))
+    return events
+
+
+def score_pages(backend, X, page_size):
+    start = time.perf_counter()
+    proba = np.concatenate([backend.predict_proba(X[i:i + page_size]) for i in range(0, len(X), page_size)])
+    return proba, time.perf_counter() - start
+
+
+async def run_api(api, events, concurrency):
+    api.cloudwatch = StubCloudWatch()
+    async with api.app.router.lifespan_context(api.app):
+        result = await run_load(api, events, concurrency)
+        if api.prediction_cache is not None:
+            result["cache"] = api.prediction_cache.stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--resend-share", type=float, default=0.3)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--endpoint-latency-ms", type=float, default=15.0)
+    parser.add_argument("--api-requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    from src.features.schema import encode_batch
+    from src.inference.cache import CachedBackend, PredictionCache
+    from src.inference.model_backend import LocalXGBoostBackend, SageMakerBackend
+    booster = train_synthetic_booster()
+    backends = {
+        "local": LocalXGBoostBackend(booster),
+        "sagemaker_stub": SageMakerBackend("bench", "us-east-1",
+                                           client=StubSageMakerRuntime(booster, args.endpoint_latency_ms)),
+    }
+    results = {"events": args.events, "page_size": args.page_size,
+               "endpoint_latency_ms": args.endpoint_latency_ms}
+    for name, share in (("generator", 0.0), (f"resends_{args.resend_share:g}", args.resend_share)):
+        X = encode_batch(make_events(args.events, share))
+        results[name] = {}
+        for backend_name, backend in backends.items():
+            direct, direct_s = score_pages(backend, X, args.page_size)
+            cache = PredictionCache(max_entries=args.events)
+            cached, cached_s = score_pages(CachedBackend(backend, cache, "bench"), X, args.page_size)
+            results[name][backend_name] = {
+                "direct_events_per_sec": round(len(X) / direct_s),
+                "cached_events_per_sec": round(len(X) / cached_s),
+                "identical_output": bool(np.allclose(direct, cached, atol=1e-6)),
+            }
+        stats = cache.stats()
+        cache.invalidate()
+        # Memory: refill a fresh cache under tracemalloc (kept out of the timed runs)
+        traced = PredictionCache(max_entries=args.events)
+        tracemalloc.start()
+        traced.predict("bench", backends["local"].predict_proba, X)
+        traced_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results[name].update({
+            "hit_ratio": stats["hit_ratio"],
+            "entries": stats["entries"],
+            "memory_bytes_estimate": stats["memory_bytes"],
+            "memory_bytes_traced": traced_bytes,
+            "empty_after_invalidate": cache.stats()["entries"] == 0,
+        })
+
+    events = make_events(args.api_requests, args.resend_share, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        booster_path = os.path.join(tmp, "model.json")
+        booster.save_model(booster_path)
+        os.environ["MODEL_REGISTRY_DIR"] = os.path.join(tmp, "registry")
+        api = load_api(tmp, booster_path)
+        results["predict_endpoint"] = {}
+        for backend_name in backends:
+            api.MODEL_BACKEND = backend_name if backend_name == "local" else "sagemaker"
+            api.load_backend = lambda *a, _backend=backends[backend_name], **k: _backend
+            for enabled in (False, True):
+                api.PREDICTION_CACHE = enabled
+                api.prediction_cache = None
+                results["predict_endpoint"][f"{backend_name}_cache_{'on' if enabled else 'off'}"] = \
+                    asyncio.run(run_api(api, events, args.concurrency))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+NumPy evaluator over flattened trees vs. xgboost.Booster.predict, batch sizes 1 to 100k.
+
+Converts the booster (the artifact in models/ if usable, else a synthetic one
+with the production hyperparameters) with CompiledTrees.from_booster, checks
+that probabilities match Booster.predict within --tolerance (with and without
+missing values), then reports the median call time per batch size for Booster.predict
+(DMatrix), Booster.inplace_predict and the NumPy evaluator. Resident memory is
+measured in fresh subprocesses that load the model and score the largest batch:
+one with xgboost and the booster, one with only NumPy and the saved .npz.
+Usage:
+
+    python -m benchmarks.bench_compiled_trees --batch-sizes 1 10 100 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_feature_matrix
+
+
+def child(mode, model_path, rows):
+    """Runs in a fresh process; prints RSS after loading and after scoring `rows` rows."""
+    from benchmarks.suite import peak_rss_mb as rss_mb
+
+    X, _ = make_feature_matrix(rows, seed=11)
+    baseline = rss_mb()
+    if mode == "xgboost":
+        import xgboost as xgb
+        booster = xgb.Booster(model_file=model_path)
+        loaded = rss_mb()
+        proba = booster.predict(xgb.DMatrix(X))
+    else:
+        from src.inference.compiled_trees import CompiledTrees
+        trees = CompiledTrees.load(model_path)
+        loaded = rss_mb()
+        proba = trees.predict_proba(X)
+    print(json.dumps({"mode": mode, "baseline_rss_mb": baseline, "loaded_rss_mb": loaded,
+                      "peak_rss_mb": rss_mb(), "xgboost_imported": "xgboost" in sys.modules,
+                      "mean_proba": round(float(proba.mean()), 6)}))
+
+
+def run_child(mode, model_path, rows):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_compiled_trees", "--child", mode, model_path, str(rows)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_call(fn, X, min_seconds=0.3, max_calls=2000):
+    fn(X)  # warm-up
+    samples = []
+    deadline = time.perf_counter() + min_seconds
+    while len(samples) < 3 or (time.perf_counter() < deadline and len(samples) < max_calls):
+        start = time.perf_counter()
+        fn(X)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000, 100000])
+    parser.add_argument("--model-path", default=None, help="booster artifact; default: the API's local candidates")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="max |Δ probability| vs. Booster.predict")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child[0], args.child[1], int(args.child[2]))
+
+    import xgboost as xgb
+    from benchmarks.synthetic import train_synthetic_booster
+    from src.inference.compiled_trees import CompiledTrees
+    from src.inference.model_backend import load_booster
+
+    try:
+        booster, source = load_booster([args.model_path] if args.model_path else None)
+    except FileNotFoundError:
+        booster, source = train_synthetic_booster(), "synthetic"
+    trees = CompiledTrees.from_booster(booster)
+    results = {"model": source, "trees": trees.stats(), "cpu_count": os.cpu_count()}
+
+    # Agreement, on rows with and without missing values
+    X, _ = make_feature_matrix(max(args.batch_sizes), seed=3)
+    X_missing = X[:20000].copy()
+    X_missing[np.random.default_rng(0).random(X_missing.shape) < 0.1] = np.nan
+    diffs = {}
+    for name, data in (("complete", X), ("missing_10pct", X_missing)):
+        diffs[name] = float(np.abs(booster.predict(xgb.DMatrix(data)) - trees.predict_proba(data)).max())
+    results["max_abs_diff"] = diffs
+    results["within_tolerance"] = all(d <= args.tolerance for d in diffs.values())
+
+    timings = []
+    for n in args.batch_sizes:
+        batch = X[:n]
+        row = {
+            "batch_size": n,
+            "dmatrix_predict_us": time_call(lambda b: booster.predict(xgb.DMatrix(b)), batch),
+            "inplace_predict_us": time_call(booster.inplace_predict, batch),
+            "numpy_us": time_call(trees.predict_proba, batch),
+        }
+        row = {k: round(v, 1) if isinstance(v, float) else v for k, v in row.items()}
+        row["speedup_vs_dmatrix"] = round(row["dmatrix_predict_us"] / row["numpy_us"], 2)
+        row["speedup_vs_inplace"] = round(row["inplace_predict_us"] / row["numpy_us"], 2)
+        timings.append(row)
+    results["timings"] = timings
+
+    with tempfile.TemporaryDirectory() as tmp:
+        booster_path = os.path.join(tmp, "model.ubj")
+        booster.save_model(booster_path)
+        trees_path = os.path.join(tmp, "trees.npz")
+        trees.save(trees_path)
+        rows = max(args.batch_sizes)
+        results["memory"] = {
+            "rows": rows,
+            "artifact_bytes": {"booster": os.path.getsize(booster_path), "npz": os.path.getsize(trees_path)},
+            "xgboost": run_child("xgboost", booster_path, rows),
+            "numpy": run_child("numpy", trees_path, rows),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
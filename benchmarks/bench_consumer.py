@@ -0,0 +1,128 @@
+"""
+Kinesis consumer scoring throughput (events/sec): in-process vs HTTP loopback.
+
+Feeds get_records-sized pages of synthetic vitals through
+consume_kinesis.process_records with demographics in a local SQLite
+`patient_data` table. The in-process mode scores each page with one
+BatchScorer call; the HTTP mode posts every event over a pooled session to the
+real FastAPI app served by uvicorn on localhost (offline stand-ins as in
+load_test). Usage:
+
+    python -m benchmarks.bench_consumer --events 5000 --page-size 500
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+from benchmarks.load_test import load_api
+from benchmarks.stubs import StubCloudWatch
+from benchmarks.synthetic import make_patient_records, train_synthetic_booster
+
+
+def make_demographics_db(path, records):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE patient_data (patient_id TEXT PRIMARY KEY, age INTEGER, gender TEXT, "
+            "cholesterol REAL, blood_sugar REAL)"
+        ))
+        patients = {r["patient_id"]: r for r in records}
+        conn.execute(
+            text("INSERT INTO patient_data VALUES (:patient_id, :age, :gender, :cholesterol, :blood_sugar)"),
+            list(patients.values())
+        )
+    return engine
+
+
+def make_vitals(records):
+    keys = ("patient_id", "blood_pressure", "heart_rate", "oxygen_saturation", "temperature")
+    return [{k: r[k] for k in keys} for r in records]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_pages(consumer, vitals, page_size):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(0, len(vitals), page_size):
+            consumer.process_records(vitals[i:i + page_size])
+    elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 3), "events_per_sec": round(len(vitals) / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--http-events", type=int, default=1000, help="events for the slower HTTP mode")
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        booster_path = os.path.join(tmp, "model.json")
+        train_synthetic_booster().save_model(booster_path)
+        api = load_api(tmp, booster_path)
+        api.cloudwatch = StubCloudWatch()
+
+        import uvicorn
+        from src.inference.model_backend import LocalXGBoostBackend
+        from src.inference.scoring import BatchScorer
+        from src.logging.log_to_s3 import AuditLogShipper, FileSink
+        from src.post_prediction.store_to_sql import PredictionWriter, init_db
+        from src.streaming import consume_kinesis as consumer
+        from src.streaming.demographics import DemographicsService
+
+        records = make_patient_records(max(args.events, args.http_events))
+        vitals = make_vitals(records)
+        consumer.demographics_service = DemographicsService(
+            make_demographics_db(os.path.join(tmp, "patients.db"), records))
+        consumer.demographics_service.warm_up()
+        results = {"events": args.events, "http_events": args.http_events, "page_size": args.page_size}
+
+        # In-process: one backend call per page, audit log + SQL rows written behind
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'consumer.db')}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            init_db(engine)
+        consumer.SCORING_MODE = "inprocess"
+        consumer._scorer = BatchScorer(
+            LocalXGBoostBackend.from_artifacts([booster_path]),
+            audit_log=AuditLogShipper(FileSink(os.path.join(tmp, "consumer-audit"))).start(),
+            sql_writer=PredictionWriter(engine).start()
+        )
+        run_pages(consumer, vitals[:5], args.page_size)  # warm-up
+        results["inprocess"] = run_pages(consumer, vitals[:args.events], args.page_size)
+        consumer._scorer.close()
+        results["inprocess"]["sql_writer"] = consumer._scorer.sql_writer.stats()
+
+        # HTTP loopback: uvicorn serving the API in a background thread
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        consumer.SCORING_MODE = "http"
+        consumer.PREDICTION_API_URL = f"http://127.0.0.1:{port}/predict"
+        run_pages(consumer, vitals[:50], args.page_size)  # warm-up
+        results["http"] = run_pages(consumer, vitals[:args.http_events], args.page_size)
+        server.should_exit = True
+        thread.join()
+
+        results["speedup"] = round(
+            results["inprocess"]["events_per_sec"] / results["http"]["events_per_sec"], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
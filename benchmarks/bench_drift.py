@@ -0,0 +1,89 @@
+"""
+Drift monitor cost and sensitivity on synthetic patients.
+
+Builds a reference profile from synthetic training records, then measures the
+per-prediction cost of updating the live sketches (single records as on
+/predict, and pages as on /predict/batch and the Kinesis consumer), shows that
+report() time does not depend on how many predictions have been observed, and
+checks that a shifted population is flagged while an unshifted one is not.
+Usage:
+
+    python -m benchmarks.bench_drift --reference 100000 --live 1000000
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_patient_records
+from src.post_prediction.drift import DriftMonitor, DriftProfile
+
+
+def shifted(records, seed=1):
+    """Older, sicker population: +12 years, +10 bpm heart rate, more high blood pressure."""
+    rng = random.Random(seed)
+    out = []
+    for r in records:
+        r = dict(r, age=min(r["age"] + 12, 100), heart_rate=r["heart_rate"] + 10)
+        if rng.random() < 0.3:
+            r["blood_pressure"] = "high"
+        out.append(r)
+    return out
+
+
+def results_for(records, seed):
+    rng = np.random.default_rng(seed)
+    return [{"readmitted_probability": float(p)} for p in rng.beta(2, 5, len(records))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reference", type=int, default=100000)
+    parser.add_argument("--live", type=int, default=1000000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    reference_records = make_patient_records(args.reference, seed=0)
+    columns = {k: [r[k] for r in reference_records] for k in reference_records[0]}
+    reference = DriftProfile.from_records(columns, np.random.default_rng(0).beta(2, 5, args.reference))
+    results = {"reference_rows": args.reference}
+
+    page = make_patient_records(args.page_size, seed=1)
+    page_results = results_for(page, 1)
+
+    monitor = DriftMonitor(reference, state_dir=None)
+    start = time.perf_counter()
+    for record, result in zip(page, page_results):
+        monitor.observe(record, result)
+    results["observe_us_per_record"] = round((time.perf_counter() - start) / len(page) * 1e6, 2)
+
+    report_ms = {}
+    observed = len(page)
+    start = time.perf_counter()
+    while observed < args.live:
+        monitor.observe_many(page, page_results)
+        observed += len(page)
+        if observed in (10000, 100000, 1000000) or observed >= args.live:
+            t = time.perf_counter()
+            monitor.report()
+            report_ms[observed] = round((time.perf_counter() - t) * 1000, 3)
+            start += time.perf_counter() - t
+    results["observe_many_us_per_record"] = round((time.perf_counter() - start) / (observed - len(page)) * 1e6, 2)
+    results["report_ms_by_observations"] = report_ms
+    results["unshifted"] = {k: v for k, v in monitor.report().items() if k != "features"}
+
+    drifted = DriftMonitor(reference, state_dir=None)
+    live = shifted(make_patient_records(20000, seed=2))
+    drifted.observe_many(live, results_for(live, 2))
+    report = drifted.report()
+    results["shifted"] = {
+        "drifted_features": report["drifted_features"],
+        "psi": {k: v.get("psi") for k, v in report["features"].items()},
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
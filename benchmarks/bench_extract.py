@@ -0,0 +1,101 @@
+"""
+Peak RSS of the SQL-to-S3 export as the table grows (local SQLite, stub S3).
+
+Each run happens in a fresh subprocess so ru_maxrss reflects that run only.
+Compares the previous pattern (pd.read_sql of the whole table + to_csv) with
+the streaming export (server-side cursor chunks -> gzip CSV multipart parts),
+and checks the streamed object decompresses to every row. Usage:
+
+    python -m benchmarks.bench_extract --rows 50000 200000 800000
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+
+def make_patient_table(path, rows, seed=0):
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE patient_data (patient_id TEXT, age INTEGER, gender TEXT, blood_pressure TEXT, "
+            "heart_rate INTEGER, cholesterol REAL, blood_sugar REAL, diagnosis TEXT, readmitted INTEGER)"
+        ))
+        insert = text("INSERT INTO patient_data VALUES (:patient_id, :age, :gender, :blood_pressure, "
+                      ":heart_rate, :cholesterol, :blood_sugar, :diagnosis, :readmitted)")
+        for start in range(0, rows, 50000):
+            conn.execute(insert, [{
+                "patient_id": f"P{i:08d}", "age": rng.randint(18, 95), "gender": rng.choice(["male", "female"]),
+                "blood_pressure": rng.choice(["normal", "high", "low"]), "heart_rate": rng.randint(60, 130),
+                "cholesterol": round(rng.uniform(150, 300), 1), "blood_sugar": round(rng.uniform(70, 200), 1),
+                "diagnosis": rng.choice(["diabetes", "hypertension", "copd", "heart failure"]),
+                "readmitted": rng.randint(0, 1),
+            } for i in range(start, min(start + 50000, rows))])
+
+
+def child(mode, db_path, out_dir):
+    from src.sql_to_s3.extract_from_sql import SQL_QUERY, export_query_to_s3
+    engine = create_engine(f"sqlite:///{db_path}")
+    start = time.perf_counter()
+    result = {"mode": mode}
+    if mode == "read_sql":
+        import pandas as pd
+        df = pd.read_sql(SQL_QUERY, con=engine)
+        df.to_csv(os.path.join(out_dir, "export.csv"), index=False)
+        result["rows"] = len(df)
+    else:
+        from benchmarks.stubs import StubS3
+        s3 = StubS3(keep_bodies=(mode == "verify"))
+        manifest = export_query_to_s3(engine, SQL_QUERY, "training_data/export.csv.gz", bucket="bench", client=s3)
+        result.update(rows=manifest["rows"], parts=len(manifest["parts"]), compressed_mb=round(manifest["bytes"] / 2**20, 2))
+        if mode == "verify":
+            lines = gzip.decompress(s3.objects[("bench", "training_data/export.csv.gz")]).decode().splitlines()
+            result["verified_rows"] = len(lines) - 1
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(json.dumps(result))
+
+
+def run_child(mode, db_path, out_dir):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_extract", "--child", mode, db_path, out_dir],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50000, 200000, 800000])
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            db_path = os.path.join(tmp, f"patients_{rows}.db")
+            make_patient_table(db_path, rows)
+            results.append({
+                "rows": rows,
+                "read_sql": run_child("read_sql", db_path, tmp),
+                "streaming": run_child("streaming", db_path, tmp),
+            })
+        # Largest table again, keeping the object to check every multipart member decodes
+        results.append({"rows": args.rows[-1], "verify": run_child("verify", db_path, tmp)})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Streaming feature store: update cost, memory per patient and eviction.
+
+Replays synthetic vitals in arrival order (patients report in turn every
+--interval-s seconds of stream time; 2% of events arrive up to 30 s late), one
+FeatureStore.update_event per record as the Kinesis consumer does, which also
+returns the rolling aggregates. Two runs:
+
+  steady: a few thousand patients with full rings (the 60-minute window
+          holds its maximum of readings); store vs. a baseline that keeps
+          each patient's raw last hour and rescans it on every event, and
+          memory per patient from tracemalloc (a separate fill, kept out of
+          the timed run) against the store's own estimate.
+  scale:  --patients active patients (default 100k); events/sec and total
+          memory (estimate).
+
+Finally checks that idle patients are expired by stream time and that a
+bounded store never tracks more than --max-patients. Usage:
+
+    python -m benchmarks.bench_feature_store --patients 100000 --events 1000000
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from src.features.schema import ROLLING_VITALS, ROLLING_WINDOWS_MIN
+from src.streaming.feature_store import FeatureStore
+
+
+def make_events(patients, n, interval_s, seed=0, start=1.7e9):
+    rng = random.Random(seed)
+    step = interval_s / patients
+    events = []
+    for i in range(n):
+        now = start + i * step
+        timestamp = now - rng.uniform(0, 30) if rng.random() < 0.02 else now
+        events.append({
+            "patient_id": f"P{i % patients}",
+            "timestamp": datetime.utcfromtimestamp(timestamp).isoformat(),
+            "heart_rate": rng.randint(60, 130),
+            "blood_pressure": rng.choice(["120/80", "130/85", "140/90"]),
+            "oxygen_saturation": round(rng.uniform(90, 100), 2),
+            "temperature": round(rng.uniform(36.0, 39.0), 1),
+        })
+    return events
+
+
+def run_store(events, store=None):
+    store = store or FeatureStore()
+    start = time.perf_counter()
+    for event in events:
+        store.update_event(event)
+    elapsed = time.perf_counter() - start
+    return store, dict(store.stats(), events_per_sec=round(len(events) / elapsed),
+                       us_per_event=round(elapsed / len(events) * 1e6, 2))
+
+
+def run_naive(events):
+    histories = {}
+    start = time.perf_counter()
+    for event in events:
+        now = datetime.fromisoformat(event["timestamp"]).timestamp()
+        history = histories.setdefault(event["patient_id"], [])
+        history.append((now, event))
+        while history[0][0] < now - ROLLING_WINDOWS_MIN[-1] * 60:
+            history.pop(0)
+        naive_features(history, now)
+    elapsed = time.perf_counter() - start
+    return {"events_per_sec": round(len(events) / elapsed), "us_per_event": round(elapsed / len(events) * 1e6, 2)}
+
+
+def naive_features(history, now):
+    """Recompute every window from the raw (time, vitals) history."""
+    out = {}
+    for window in ROLLING_WINDOWS_MIN:
+        points = [(t, v) for t, v in history if t >= now - window * 60]
+        for name in ROLLING_VITALS:
+            xs = [v[name] for _, v in points]
+            out[f"{name}_mean_{window}m"] = sum(xs) / len(xs) if xs else None
+            out[f"{name}_min_{window}m"] = min(xs, default=None)
+            out[f"{name}_max_{window}m"] = max(xs, default=None)
+        out[f"vitals_count_{window}m"] = len(points)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=100000)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--interval-s", type=float, default=60.0, help="stream time between a patient's events")
+    parser.add_argument("--steady-patients", type=int, default=2000)
+    parser.add_argument("--steady-events-per-patient", type=int, default=100)
+    parser.add_argument("--max-patients", type=int, default=1000)
+    args = parser.parse_args()
+    results = {"interval_s": args.interval_s, "windows_min": ROLLING_WINDOWS_MIN}
+
+    events = make_events(args.steady_patients, args.steady_patients * args.steady_events_per_patient,
+                         args.interval_s)
+    store, stats = run_store(events)
+    full = sum(store.features(f"P{i}")["vitals_count_60m"] for i in range(100)) / 100
+    del store
+    tracemalloc.start()
+    traced, _ = run_store(events)
+    traced_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    results["steady"] = {
+        "patients": args.steady_patients,
+        "events": len(events),
+        "mean_readings_in_60m_window": full,
+        "store": dict(stats, memory_bytes_per_patient_traced=round(traced_bytes / len(traced)),
+                      memory_bytes_per_patient_estimate=round(traced.memory_bytes() / len(traced))),
+        "naive_rescan": run_naive(events),
+    }
+    del traced
+
+    events = make_events(args.patients, args.events, args.interval_s, seed=1)
+    store, stats = run_store(events)
+    results["scale"] = dict(stats, patients=args.patients, events=len(events),
+                            memory_mb_estimate=round(store.memory_bytes() / 2 ** 20, 1))
+    del store
+
+    # Eviction: a bounded store, then a long gap in stream time
+    bounded = FeatureStore(max_patients=args.max_patients, idle_ttl_s=3600)
+    peak = 0
+    for event in events[:args.max_patients * 20]:
+        bounded.update_event(event)
+        peak = max(peak, len(bounded))
+    last_time = datetime.fromisoformat(event["timestamp"]).timestamp()
+    later = dict(event, patient_id="LATE", timestamp=datetime.utcfromtimestamp(last_time + 2 * 3600).isoformat())
+    bounded.update_event(later)
+    results["eviction"] = dict(bounded.stats(), max_patients=args.max_patients, peak_patients=peak,
+                               only_late_patient_left=len(bounded) == 1 and bounded.features("LATE") is not None)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Feature encoding cost: the previous pandas preprocess() vs. the shared schema encoder.
+
+Also asserts that the encoder matches a training-style pd.get_dummies over a
+whole frame. (The old per-request preprocess() is not a valid reference:
+drop_first on a one-row frame drops the only category present, so its
+indicator columns were always 0.) Usage:
+
+    python -m benchmarks.bench_features --rows 20000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_patient_records
+from src.features.schema import FEATURE_COLUMNS, allocate, encode_batch, encode_columns, encode_row
+
+
+def pandas_preprocess(record):
+    """Reference: the per-request encoding predict_api used before the shared schema."""
+    df = pd.DataFrame([record])
+    df = pd.get_dummies(df, columns=["gender", "blood_pressure"], drop_first=True)
+    for col in ["gender_male", "blood_pressure_normal"]:
+        if col not in df.columns:
+            df[col] = 0
+    return df[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+
+
+def per_row_us(fn, records):
+    start = time.perf_counter()
+    for record in records:
+        fn(record)
+    return round((time.perf_counter() - start) / len(records) * 1e6, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    records = make_patient_records(args.rows)
+    sample = records[:500]
+
+    reference = pd.get_dummies(pd.DataFrame(sample), columns=["gender", "blood_pressure"], drop_first=True)
+    reference = reference[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    assert np.array_equal(reference, encode_batch(sample)), "schema encoder diverges from pandas preprocess"
+    assert np.array_equal(reference, encode_columns(pd.DataFrame(sample))), "column encoder diverges"
+
+    buffer = allocate()
+    start = time.perf_counter()
+    encode_batch(records)
+    batch_s = time.perf_counter() - start
+    frame = pd.DataFrame(records)
+    start = time.perf_counter()
+    encode_columns(frame)
+    columns_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "rows": args.rows,
+        "pandas_preprocess_us_per_row": per_row_us(pandas_preprocess, sample),
+        "encode_row_us_per_row": per_row_us(lambda r: encode_row(r, buffer), records),
+        "encode_batch_us_per_row": round(batch_s / args.rows * 1e6, 3),
+        "encode_columns_us_per_row": round(columns_s / args.rows * 1e6, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
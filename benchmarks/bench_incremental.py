@@ -0,0 +1,90 @@
+"""
+Retraining data fetch: full re-read vs. watermark-based incremental dataset.
+
+Builds a local SQLite `patient_data` / `predictions_log`, then for a few
+retraining rounds (each adding --new-predictions rows) compares the previous
+fetch_combined_data pattern (pd.read_sql of both tables) with
+IncrementalDataset.sync + read, which queries only rows past the stored
+watermark and serves earlier partitions from the local cache. The dataset is
+kept in a local directory (LocalObjectStore). Usage:
+
+    python -m benchmarks.bench_incremental --patients 200000 --predictions 200000 --new-predictions 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from benchmarks.bench_extract import make_patient_table
+from benchmarks.synthetic import make_patient_records
+from src.post_prediction.store_to_sql import _insert_rows, _to_row, init_db
+from src.sql_to_s3.dataset import IncrementalDataset, LocalObjectStore
+
+
+def add_predictions(engine, n, seed):
+    prediction = {"readmitted_prediction": 1, "readmitted_probability": 0.8123, "timestamp": datetime.utcnow()}
+    records = make_patient_records(n, seed=seed)
+    for i in range(0, n, 50000):
+        _insert_rows([_to_row(r, prediction) for r in records[i:i + 50000]], engine)
+
+
+def full_reread(engine):
+    df_original = pd.read_sql("SELECT * FROM patient_data", con=engine)
+    df_new = pd.read_sql("SELECT * FROM predictions_log", con=engine)
+    return len(df_original) + len(df_new)
+
+
+def incremental(engine, dataset):
+    before = dataset.row_counts()
+    dataset.sync(engine)
+    after = dataset.row_counts()
+    rows = len(dataset.read("patient_data")) + len(dataset.read("predictions_log"))
+    queried = sum(after.values()) - sum(before.values())
+    return rows, queried
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=200000)
+    parser.add_argument("--predictions", type=int, default=200000)
+    parser.add_argument("--new-predictions", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    rounds = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "hospital.db")
+        make_patient_table(db_path, args.patients)
+        engine = create_engine(f"sqlite:///{db_path}")
+        init_db(engine)
+        add_predictions(engine, args.predictions, seed=0)
+        dataset = IncrementalDataset(LocalObjectStore(os.path.join(tmp, "store")), bucket="bench",
+                                     cache_dir=os.path.join(tmp, "cache"))
+
+        for round_number in range(args.rounds + 1):
+            if round_number:
+                add_predictions(engine, args.new_predictions, seed=round_number)
+            start = time.perf_counter()
+            full_rows = full_reread(engine)
+            full_s = time.perf_counter() - start
+            start = time.perf_counter()
+            rows, queried = incremental(engine, dataset)
+            incremental_s = time.perf_counter() - start
+            assert rows == full_rows, (rows, full_rows)
+            rounds.append({
+                "round": round_number, "rows": rows,
+                "full_reread": {"seconds": round(full_s, 2), "rows_queried": full_rows},
+                "incremental": {"seconds": round(incremental_s, 2), "rows_queried": queried},
+            })
+        manifest = dataset.load_manifest()
+    print(json.dumps({"rounds": rounds, "partitions": len(manifest["partitions"]),
+                      "watermarks": manifest["watermarks"]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
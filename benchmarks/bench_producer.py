@@ -0,0 +1,93 @@
+"""
+Vitals producer throughput (events/sec) against an in-memory Kinesis stand-in.
+
+Compares the original one-put_record-per-event loop with KinesisBatchProducer
+(PutRecords batches, retry of throttled entries only), checks that the rate
+limiter holds a target rate, and replays a generated recording at N x real
+time. Every put call sleeps --latency-ms to simulate the network round-trip.
+Usage:
+
+    python -m benchmarks.bench_producer --events 20000 --latency-ms 5 --failure-rate 0.02
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.stubs import FakeKinesis
+from src.streaming.stream_to_kinesis import (
+    KinesisBatchProducer, generate_vital_data, load_replay_events, replay, simulate_patients
+)
+
+
+def bench_single(events, latency_ms):
+    client = FakeKinesis(latency_ms=latency_ms)
+    start = time.perf_counter()
+    for _ in range(events):
+        data = generate_vital_data()
+        client.put_record(StreamName=client.stream_name, Data=json.dumps(data), PartitionKey=data["patient_id"])
+    elapsed = time.perf_counter() - start
+    return {"events": events, "put_calls": client.put_calls, "events_per_sec": round(events / elapsed, 1)}
+
+
+def bench_batched(events, latency_ms, failure_rate, workers, rate=0):
+    client = FakeKinesis(latency_ms=latency_ms, failure_rate=failure_rate)
+    producer = KinesisBatchProducer(client, client.stream_name, backoff_s=0.001).start()
+    start = time.perf_counter()
+    stats = simulate_patients(producer, rate=rate, patients=1000, workers=workers, max_events=events)
+    elapsed = time.perf_counter() - start
+    producer.close()
+    stats.update(events_per_sec=round(events / elapsed, 1), in_stream=client.record_count())
+    return stats
+
+
+def write_recording(path, events, span_s):
+    start = datetime(2024, 7, 18, 14, 0, 0)
+    rng = random.Random(0)
+    with open(path, "w") as f:
+        for i in range(events):
+            event = generate_vital_data(rng=rng)
+            event["timestamp"] = (start + timedelta(seconds=span_s * i / events)).isoformat()
+            f.write(json.dumps(event) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--single-events", type=int, default=500, help="events for the slow put_record loop")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--target-rate", type=float, default=2000.0)
+    parser.add_argument("--replay-speed", type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = {"latency_ms": args.latency_ms, "failure_rate": args.failure_rate}
+    results["put_record_loop"] = bench_single(args.single_events, args.latency_ms)
+    results["put_records_batched"] = bench_batched(args.events, args.latency_ms, args.failure_rate, args.workers)
+    results["speedup"] = round(
+        results["put_records_batched"]["events_per_sec"] / results["put_record_loop"]["events_per_sec"], 1)
+
+    paced = bench_batched(int(args.target_rate * 3), args.latency_ms, 0.0, args.workers, rate=args.target_rate)
+    results["rate_limited"] = {"target_rate": args.target_rate, "achieved_rate": paced["events_per_sec"]}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        span_s = 20.0
+        write_recording(os.path.join(tmp, "vitals.ndjson"), 2000, span_s)
+        events = load_replay_events(tmp)
+        client = FakeKinesis(latency_ms=args.latency_ms)
+        start = time.perf_counter()
+        producer = KinesisBatchProducer(client, client.stream_name).start()
+        replay(producer, events, args.replay_speed)
+        elapsed = time.perf_counter() - start
+        producer.close()
+        results["replay"] = {"events": len(events), "recorded_span_s": span_s, "speed": args.replay_speed,
+                             "elapsed_s": round(elapsed, 2), "in_stream": client.record_count()}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Model hot reload under load: dropped requests, latency around the swap, time to swap.
+
+Registers a synthetic model as production in a temporary registry and drives
+/predict with N concurrent clients through the in-process ASGI app (same local
+stand-ins as load_test). Partway through the run a second version is promoted
+and POST /model/reload is called. It reports failed requests, how many
+responses each version served, and latency percentiles for requests that
+started before, during and after the reload, next to a run without a reload.
+Usage:
+
+    python -m benchmarks.bench_reload --requests 4000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.asgi_client import asgi_request
+from benchmarks.load_test import load_api
+from benchmarks.stubs import StubCloudWatch
+from benchmarks.synthetic import make_patient_records, percentile_summary, train_synthetic_booster
+
+
+async def run(api, records, concurrency, registry=None, new_version=None, reload_after=0.5):
+    samples = []  # (start, end, status, body)
+    queue = asyncio.Queue()
+    for record in records:
+        queue.put_nowait(record)
+
+    async def client():
+        while not queue.empty():
+            record = queue.get_nowait()
+            start = time.perf_counter()
+            status, _, body = await asgi_request(api.app, "POST", "/predict", record)
+            samples.append((start, time.perf_counter(), status, json.loads(body)))
+
+    reload = {}
+
+    async def reloader():
+        await asyncio.sleep(reload_after)
+        registry.promote(new_version)
+        reload["start"] = time.perf_counter()
+        status, _, body = await asgi_request(api.app, "POST", "/model/reload")
+        reload["end"] = time.perf_counter()
+        reload["response"] = json.loads(body)
+
+    api.cloudwatch = StubCloudWatch()
+    async with api.app.router.lifespan_context(api.app):
+        await asyncio.gather(*[asgi_request(api.app, "POST", "/predict", r) for r in records[:50]])  # warm-up
+        tasks = [client() for _ in range(concurrency)]
+        if new_version is not None:
+            tasks.append(reloader())
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    failed = [s for s in samples if s[2] != 200 or "error" in s[3]]
+    versions = {}
+    for _, _, _, body in samples:
+        versions[body.get("model_version")] = versions.get(body.get("model_version"), 0) + 1
+    result = {
+        "requests": len(samples),
+        "failed": len(failed),
+        "requests_per_sec": round(len(samples) / elapsed, 1),
+        "served_by_version": versions,
+        "latency_all": percentile_summary([(end - start) * 1000 for start, end, _, _ in samples]),
+    }
+    if reload:
+        windows = {"before": [], "during": [], "after": []}
+        for start, end, _, _ in samples:
+            window = "before" if end < reload["start"] else "after" if start > reload["end"] else "during"
+            windows[window].append((end - start) * 1000)
+        result["reload_ms"] = round((reload["end"] - reload["start"]) * 1000, 1)
+        result["reload_response"] = reload["response"]
+        result["latency_by_window"] = {k: percentile_summary(v) for k, v in windows.items() if v}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--reload-after", type=float, default=0.5, help="seconds into the run to promote v2")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["MODEL_REGISTRY_DIR"] = os.path.join(tmp, "registry")
+        os.environ["MODEL_RELOAD_INTERVAL_S"] = "0"  # reload only when asked, so the swap time is known
+        paths = []
+        for seed in (1, 2):
+            path = os.path.join(tmp, f"model-{seed}.json")
+            train_synthetic_booster(seed=seed).save_model(path)
+            paths.append(path)
+        api = load_api(tmp, paths[0])
+        registry = api.registry
+        registry.register(paths[0], {"seed": 1}, version="v1", promote=True)
+        registry.register(paths[1], {"seed": 2}, version="v2")
+        records = make_patient_records(args.requests)
+
+        results = {"requests": args.requests, "concurrency": args.concurrency}
+        results["no_reload"] = asyncio.run(run(api, records, args.concurrency))
+        results["with_reload"] = asyncio.run(
+            run(api, records, args.concurrency, registry, "v2", args.reload_after))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
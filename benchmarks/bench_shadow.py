@@ -0,0 +1,106 @@
+"""
+Shadow / canary scoring: latency of the primary response with and without a candidate.
+
+Registers two synthetic models in a temporary registry (production and
+candidate) and drives /predict with N concurrent clients through the
+in-process ASGI app (same local stand-ins as load_test). Runs with no
+candidate, with the candidate shadowing 100% of traffic, and as a 10% canary.
+Reports primary latency percentiles, which model answered, shadow calls
+scored / shed, agreement, and the comparison records found in the audit log.
+Usage:
+
+    python -m benchmarks.bench_shadow --requests 4000 --concurrency 64
+"""
+import argparse
+import asyncio
+import glob
+import gzip
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.asgi_client import asgi_request
+from benchmarks.load_test import load_api
+from benchmarks.stubs import StubCloudWatch
+from benchmarks.synthetic import make_patient_records, percentile_summary, train_synthetic_booster
+
+
+def count_comparisons(audit_dir):
+    count = 0
+    for path in glob.glob(os.path.join(audit_dir, "**", "*.gz"), recursive=True):
+        with gzip.open(path, "rt") as f:
+            count += sum(json.loads(line).get("record_type") == "model_comparison" for line in f if line.strip())
+    return count
+
+
+async def run(api, records, concurrency):
+    latencies = []
+    versions = {}
+    queue = asyncio.Queue()
+    for record in records:
+        queue.put_nowait(record)
+
+    async def client():
+        while not queue.empty():
+            record = queue.get_nowait()
+            start = time.perf_counter()
+            status, _, body = await asgi_request(api.app, "POST", "/predict", record)
+            latencies.append((time.perf_counter() - start) * 1000)
+            version = json.loads(body).get("model_version")
+            versions[version] = versions.get(version, 0) + 1
+            assert status == 200, status
+
+    api.cloudwatch = StubCloudWatch()
+    async with api.app.router.lifespan_context(api.app):
+        await asyncio.gather(*[asgi_request(api.app, "POST", "/predict", r) for r in records[:50]])  # warm-up
+        started = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+        await api.shadow.drain()
+        _, _, body = await asgi_request(api.app, "GET", "/stats/candidate")
+    return dict(
+        percentile_summary(latencies),
+        requests_per_sec=round(len(records) / elapsed, 1),
+        answered_by_version=versions,
+        candidate=json.loads(body),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--canary-percent", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["MODEL_REGISTRY_DIR"] = os.path.join(tmp, "registry")
+        os.environ["MODEL_RELOAD_INTERVAL_S"] = "0"
+        paths = []
+        for seed in (1, 2):
+            path = os.path.join(tmp, f"model-{seed}.json")
+            train_synthetic_booster(seed=seed).save_model(path)
+            paths.append(path)
+        api = load_api(tmp, paths[0])
+        registry = api.registry
+        registry.register(paths[0], {"seed": 1}, version="v1", promote=True)
+        registry.register(paths[1], {"seed": 2}, version="v2")
+        records = make_patient_records(args.requests)
+
+        results = {"requests": args.requests, "concurrency": args.concurrency}
+        for name, mode, percent in (("no_candidate", None, 0), ("shadow_100", "shadow", 100.0),
+                                    (f"canary_{args.canary_percent:g}", "canary", args.canary_percent)):
+            if mode is None:
+                registry.clear_candidate()
+            else:
+                registry.set_candidate("v2", mode, percent)
+            audit_dir = os.path.join(tmp, "audit", name)
+            api.AUDIT_LOG_DIR = audit_dir
+            results[name] = asyncio.run(run(api, records, args.concurrency))
+            results[name]["audit_comparisons"] = count_comparisons(audit_dir)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
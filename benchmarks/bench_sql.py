@@ -0,0 +1,73 @@
+"""
+Prediction persistence throughput (rows/sec) against a local SQLite database.
+
+Compares the previous per-prediction pattern (new engine + DDL + one INSERT per
+row), pooled single-row inserts, one bulk executemany, and the write-behind
+PredictionWriter. Usage:
+
+    python -m benchmarks.bench_sql --rows 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from benchmarks.synthetic import make_patient_records
+from src.post_prediction import store_to_sql
+from src.post_prediction.store_to_sql import PredictionWriter, _insert_rows, _to_row, init_db
+
+
+def rows_per_sec(n, seconds):
+    return round(n / seconds, 1) if seconds else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--legacy-rows", type=int, default=300, help="rows for the slow per-request-engine pattern")
+    args = parser.parse_args()
+
+    records = make_patient_records(args.rows)
+    prediction = {"readmitted_prediction": 1, "readmitted_probability": 0.8123}
+    results = {"rows": args.rows}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url)
+        init_db(engine)
+
+        # Previous pattern: engine + DDL + transaction per prediction
+        start = time.perf_counter()
+        for record in records[:args.legacy_rows]:
+            per_call_engine = create_engine(url)
+            store_to_sql.metadata.create_all(per_call_engine)
+            _insert_rows([_to_row(record, prediction)], per_call_engine)
+            per_call_engine.dispose()
+        results["per_request_engine_rows_per_sec"] = rows_per_sec(args.legacy_rows, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for record in records:
+            _insert_rows([_to_row(record, prediction)], engine)
+        results["pooled_single_row_rows_per_sec"] = rows_per_sec(args.rows, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        _insert_rows([_to_row(r, prediction) for r in records], engine)
+        results["bulk_executemany_rows_per_sec"] = rows_per_sec(args.rows, time.perf_counter() - start)
+
+        writer = PredictionWriter(engine=engine).start()
+        start = time.perf_counter()
+        for record in records:
+            writer.add(record, prediction)
+        writer.close()
+        results["write_behind_rows_per_sec"] = rows_per_sec(args.rows, time.perf_counter() - start)
+        results["write_behind_stats"] = writer.stats()
+        engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
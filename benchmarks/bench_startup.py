@@ -0,0 +1,124 @@
+"""
+Prediction API cold start: import time, time to live / ready, time to first prediction.
+
+Registers a synthetic model as production in a temporary registry, then starts
+the API in fresh child processes with AWS credentials and config removed from
+the environment (local audit-log directory, SQLite, stub CloudWatch; no
+CloudWatch Logs). Each child imports src.inference.predict_api, enters the app
+lifespan, polls GET /health/ready through the in-process ASGI client and sends
+one POST /predict. Times are measured from just before the child is spawned,
+so they include interpreter start. Runs with warm-up in the background (the
+default: live at once, ready once the model is loaded) and blocking in the
+startup hook. Also lists the heavy modules already loaded after the import.
+Track the medians per release. Usage:
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ("boto3", "botocore", "watchtower", "sqlalchemy", "xgboost", "pandas")
+
+
+def child(args):
+    """Runs in the spawned process; prints wall-clock milestones as JSON."""
+    t_start = time.time()
+    import src.inference.predict_api as api
+    t_import = time.time()
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    import logging
+    from benchmarks.asgi_client import asgi_request
+    from benchmarks.stubs import StubCloudWatch
+    logging.getLogger("healthcare-api").setLevel(logging.WARNING)
+    api.cloudwatch = StubCloudWatch()
+    record = {"patient_id": "P1", "age": 67, "gender": "female", "blood_pressure": "high", "heart_rate": 96,
+              "cholesterol": 232.0, "blood_sugar": 141.0, "oxygen_saturation": 93.5, "temperature": 37.9}
+
+    async def run():
+        milestones = {}
+        async with api.app.router.lifespan_context(api.app):
+            milestones["live"] = time.time()
+            status, _, _ = await asgi_request(api.app, "GET", "/health/live")
+            assert status == 200, status
+            not_ready = 0
+            while True:
+                status, _, body = await asgi_request(api.app, "GET", "/health/ready")
+                if status == 200:
+                    break
+                assert json.loads(body)["phase"] in ("starting", "warming_up"), body
+                not_ready += 1
+                await asyncio.sleep(0.005)
+            milestones["ready"] = time.time()
+            status, _, body = await asgi_request(api.app, "POST", "/predict", record)
+            assert status == 200 and "probability" in json.loads(body), body
+            milestones["first_prediction"] = time.time()
+            milestones["not_ready_polls"] = not_ready
+            milestones["startup_ms"] = api.lifecycle["startup_ms"]
+        return milestones
+
+    print(json.dumps(dict(asyncio.run(run()), start=t_start, imported=t_import, heavy_modules_after_import=loaded)))
+
+
+def spawn(tmp, background):
+    env = {k: v for k, v in os.environ.items() if not k.startswith("AWS_")}
+    env.update({
+        "HOME": tmp,  # no ~/.aws either
+        "PYTHONPATH": os.getcwd(),
+        "MODEL_REGISTRY_DIR": os.path.join(tmp, "registry"),
+        "MODEL_RELOAD_INTERVAL_S": "0",
+        "AUDIT_LOG_DIR": os.path.join(tmp, "audit"),
+        "SQL_URL": f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+        "CLOUDWATCH_LOGS": "false",
+        "WARM_UP_IN_BACKGROUND": "true" if background else "false",
+    })
+    t0 = time.time()
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child"], env=env,
+                         capture_output=True, text=True, check=True).stdout
+    m = json.loads(out.strip().splitlines()[-1])
+    return {
+        "interpreter_ms": (m["start"] - t0) * 1000,
+        "import_ms": (m["imported"] - m["start"]) * 1000,
+        "live_ms": (m["live"] - t0) * 1000,
+        "ready_ms": (m["ready"] - t0) * 1000,
+        "first_prediction_ms": (m["first_prediction"] - t0) * 1000,
+        "warm_up_ms": m["startup_ms"],
+        "not_ready_polls": m["not_ready_polls"],
+        "heavy_modules_after_import": m["heavy_modules_after_import"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    from benchmarks.synthetic import train_synthetic_booster
+    from src.inference.registry import ModelRegistry
+    results = {"runs": args.runs}
+    with tempfile.TemporaryDirectory() as tmp:
+        booster_path = os.path.join(tmp, "model.json")
+        train_synthetic_booster().save_model(booster_path)
+        ModelRegistry(os.path.join(tmp, "registry")).register(booster_path, {"source": "bench"}, version="v1",
+                                                              promote=True)
+        for name, background in (("background_warm_up", True), ("blocking_warm_up", False)):
+            runs = [spawn(tmp, background) for _ in range(args.runs)]
+            summary = {key: round(statistics.median(r[key] for r in runs), 1)
+                       for key in runs[0] if isinstance(runs[0][key], (int, float))}
+            summary["heavy_modules_after_import"] = runs[0]["heavy_modules_after_import"]
+            results[name] = summary
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
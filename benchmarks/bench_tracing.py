@@ -0,0 +1,88 @@
+"""
+Hot-path tracing: per-stage latency breakdown of /predict and the cost of the instrumentation.
+
+Measures the bare cost of one span, then drives /predict with N concurrent
+clients through the in-process ASGI app (same local stand-ins as load_test)
+with: the tracing middleware removed, the default (stage histograms only),
+Server-Timing headers on every response, and the sampling profiler at 1% and
+100% of requests. Reports requests/sec and latency percentiles per mode, the
+Server-Timing header of one request, the /predict and side-effect stage
+breakdown from GET /stats/stages, and the profiler's hottest stacks.
+Usage:
+
+    python -m benchmarks.bench_tracing --requests 3000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.asgi_client import asgi_request
+from benchmarks.load_test import load_api, run_load
+from benchmarks.stubs import StubCloudWatch
+from benchmarks.synthetic import make_patient_records, train_synthetic_booster
+
+
+def span_cost_ns(n=200000):
+    from src.inference.tracing import span
+    start = time.perf_counter()
+    for _ in range(n):
+        pass
+    empty = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        with span("bench", "noop"):
+            pass
+    return round((time.perf_counter() - start - empty) / n * 1e9)
+
+
+async def run_mode(api, records, concurrency, server_timing=False, sample_rate=0.0, middleware=True):
+    from src.inference import tracing
+    from src.inference.tracing import TracingMiddleware
+    tracing.SERVER_TIMING = server_timing
+    tracing.profiler.set_rate(sample_rate)
+    tracing.profiler.reset()
+    api.app.middleware_stack = None  # rebuilt with the new middleware list on the next request
+    api.app.user_middleware = [m for m in api.app.user_middleware if m.cls is not TracingMiddleware]
+    if middleware:
+        api.app.add_middleware(TracingMiddleware)
+    api.cloudwatch = StubCloudWatch()
+    async with api.app.router.lifespan_context(api.app):
+        await run_load(api, records[:100], concurrency)  # warm-up
+        result = await run_load(api, records, concurrency)
+        _, headers, _ = await asgi_request(api.app, "POST", "/predict", records[0], headers={"X-Server-Timing": "1"})
+        result["server_timing_header"] = headers.get("server-timing")
+        if sample_rate:
+            result["profiler"] = tracing.profiler.stats()
+            result["top_stacks"] = [line.rsplit(" ", 1) for line in tracing.profiler.collapsed(5).splitlines()]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    results = {"span_cost_ns": span_cost_ns(), "requests": args.requests, "concurrency": args.concurrency}
+    with tempfile.TemporaryDirectory() as tmp:
+        booster_path = os.path.join(tmp, "model.json")
+        train_synthetic_booster().save_model(booster_path)
+        os.environ["MODEL_REGISTRY_DIR"] = os.path.join(tmp, "registry")
+        api = load_api(tmp, booster_path)
+        records = make_patient_records(args.requests)
+        for name, kwargs in (("no_middleware", {"middleware": False}), ("stage_histograms", {}),
+                             ("server_timing", {"server_timing": True}), ("profiler_1pct", {"sample_rate": 0.01}),
+                             ("profiler_100pct", {"sample_rate": 1.0})):
+            results[name] = asyncio.run(run_mode(api, records, args.concurrency, **kwargs))
+        from src.inference.tracing import stage_breakdown
+        breakdown = stage_breakdown()
+        results["stages"] = {path: breakdown[path] for path in ("/predict", "side_effects", "batcher")
+                             if path in breakdown}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Local training backend: wall time and peak RSS on a synthetic dataset.
+
+Builds an incremental dataset (SQLite patient_data -> gzip CSV partitions in a
+local directory), then, each in a fresh subprocess so peak RSS is per run:
+trains through train_from_dataset with the hist method on 1 thread and on all
+cores, and with tree_method=exact (the SageMaker 1.5-1 container's CPU choice
+for small data). The SageMaker path itself needs AWS; its wall time is printed
+by the retraining pipeline. Usage:
+
+    python -m benchmarks.bench_training --rows 200000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+
+from benchmarks.bench_extract import make_patient_table
+
+
+def child(root, tree_method, nthread):
+    from src.sql_to_s3.dataset import IncrementalDataset, LocalObjectStore
+    from src.training.train_local import train_from_dataset
+    dataset = IncrementalDataset(LocalObjectStore(os.path.join(root, "store")), bucket="bench",
+                                 cache_dir=os.path.join(root, "cache"))
+    _, metadata, _ = train_from_dataset(dataset, params={"tree_method": tree_method}, nthread=int(nthread),
+                                        model_dir=os.path.join(root, f"models-{tree_method}-{nthread}"))
+    print(json.dumps({k: metadata[k] for k in ("rows", "load_time_s", "wall_time_s", "peak_rss_mb", "train_logloss")}))
+
+
+def run_child(root, tree_method, nthread):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_training", "--child", root, tree_method, str(nthread)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    from src.sql_to_s3.dataset import SOURCES, IncrementalDataset, LocalObjectStore
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "hospital.db")
+        make_patient_table(db_path, args.rows)
+        dataset = IncrementalDataset(LocalObjectStore(os.path.join(tmp, "store")), bucket="bench",
+                                     sources={"patient_data": SOURCES["patient_data"]},
+                                     cache_dir=os.path.join(tmp, "cache"))
+        dataset.sync(create_engine(f"sqlite:///{db_path}"))
+        cores = os.cpu_count()
+        results = {"rows": args.rows, "cores": cores}
+        results["hist_1_thread"] = run_child(tmp, "hist", 1)
+        if cores > 1:
+            results[f"hist_{cores}_threads"] = run_child(tmp, "hist", cores)
+        results["exact_all_threads"] = run_child(tmp, "exact", cores)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Hyperparameter search: validation logloss and wall time vs. the hard-coded config.
+
+On a synthetic readmission-like matrix, scores the current defaults
+(100 rounds, max_depth=5, eta=0.2, ...) on the tuner's held-out split, then
+runs src.training.tune with random search and with successive halving under
+the same wall-clock budget and worker count. Reports trials finished, wall
+time vs. budget, and the best validation logloss. Usage:
+
+    python -m benchmarks.bench_tuning --rows 100000 --budget 60
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import xgboost as xgb
+
+from benchmarks.synthetic import make_feature_matrix
+
+
+def default_logloss(X, y, seed):
+    from src.training.hyperparameters import HYPERPARAMETERS, LOCAL_TRAINING_PARAMS, NUM_ROUND
+    from src.training.tune import VALID_FRACTION, _split
+    X_train, y_train, X_valid, y_valid = _split(X, y, VALID_FRACTION, seed)
+    dtrain = xgb.QuantileDMatrix(X_train, label=y_train, max_bin=LOCAL_TRAINING_PARAMS["max_bin"])
+    dvalid = xgb.QuantileDMatrix(X_valid, label=y_valid, ref=dtrain)
+    evals_result = {}
+    start = time.perf_counter()
+    xgb.train(dict(HYPERPARAMETERS, **LOCAL_TRAINING_PARAMS), dtrain, num_boost_round=NUM_ROUND,
+              evals=[(dvalid, "valid")], evals_result=evals_result, verbose_eval=False)
+    return {"valid_logloss": round(evals_result["valid"]["logloss"][-1], 6),
+            "wall_time_s": round(time.perf_counter() - start, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--budget", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from src.training.tune import tune
+    X, y = make_feature_matrix(args.rows, seed=args.seed)
+    results = {"rows": args.rows, "budget_s": args.budget, "workers": args.workers, "trials": args.trials,
+               "default": default_logloss(X, y, args.seed)}
+    with tempfile.TemporaryDirectory() as tmp:
+        for strategy in ("random", "halving"):
+            tuning_dir = os.path.join(tmp, f"tuning-{strategy}")
+            summary = tune(X, y, budget_s=args.budget, workers=args.workers, n_trials=args.trials,
+                           strategy=strategy, seed=args.seed, tuning_dir=tuning_dir,
+                           model_dir=os.path.join(tmp, f"models-{strategy}"), best_params_path=None)
+            with open(os.path.join(tuning_dir, summary["run_id"], "trials.jsonl")) as f:
+                trials = [json.loads(line) for line in f]
+            results[strategy] = {
+                "trials_finished": len(trials),
+                "stopped": {reason: sum(t.get("stopped") == reason for t in trials)
+                            for reason in ("early_stopping", "max_rounds", "deadline")},
+                "wall_time_s": summary["wall_time_s"],
+                "best_valid_logloss": summary["valid_logloss"],
+                "best_num_round": summary["num_round"],
+                "best_params": summary["params"],
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
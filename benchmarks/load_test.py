@@ -0,0 +1,93 @@
+"""
+In-process load test for /predict: requests/sec and latency percentiles.
+
+Drives the real FastAPI app through ASGI with N concurrent clients, using local
+stand-ins for every external dependency (synthetic booster, stub CloudWatch with
+simulated API latency, local audit-log directory, SQLite). Compares side effects
+run inline on the event loop (SIDE_EFFECT_WORKERS=0, the previous behaviour)
+with side effects offloaded to the bounded pool. Usage:
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 64 --cloudwatch-latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.asgi_client import asgi_request
+from benchmarks.stubs import StubCloudWatch
+from benchmarks.synthetic import make_patient_records, percentile_summary, train_synthetic_booster
+
+
+def load_api(tmp_dir, booster_path):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ["AUDIT_LOG_DIR"] = os.path.join(tmp_dir, "audit")
+    os.environ["SQL_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ["CLOUDWATCH_LOGS"] = "false"
+    os.environ.setdefault("WARM_UP_IN_BACKGROUND", "false")  # serve as soon as the lifespan startup returns
+
+    import src.inference.model_backend as model_backend
+    model_backend.LOCAL_MODEL_CANDIDATES[:] = [booster_path]
+    import src.inference.predict_api as api
+    logging.getLogger("healthcare-api").setLevel(logging.WARNING)
+    return api
+
+
+async def run_load(api, records, concurrency, latencies=None):
+    latencies = [] if latencies is None else latencies
+    queue = asyncio.Queue()
+    for record in records:
+        queue.put_nowait(record)
+
+    async def client():
+        while not queue.empty():
+            record = queue.get_nowait()
+            start = time.perf_counter()
+            status, _, _ = await asgi_request(api.app, "POST", "/predict", record)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert status == 200, status
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return dict(percentile_summary(latencies), requests_per_sec=round(len(records) / elapsed, 1))
+
+
+async def run_mode(api, records, concurrency, workers, cloudwatch_latency_ms):
+    api.SIDE_EFFECT_WORKERS = workers
+    api.cloudwatch = StubCloudWatch(latency_ms=cloudwatch_latency_ms)
+    async with api.app.router.lifespan_context(api.app):
+        await run_load(api, records[:50], concurrency)  # warm-up
+        result = await run_load(api, records, concurrency)
+        result["side_effects"] = api.side_effects.stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4, help="side-effect pool size for the offloaded run")
+    parser.add_argument("--cloudwatch-latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        booster_path = os.path.join(tmp, "model.json")
+        train_synthetic_booster().save_model(booster_path)
+        api = load_api(tmp, booster_path)
+        records = make_patient_records(args.requests)
+
+        results = {"requests": args.requests, "concurrency": args.concurrency,
+                   "cloudwatch_latency_ms": args.cloudwatch_latency_ms}
+        results["inline_side_effects"] = asyncio.run(
+            run_mode(api, records, args.concurrency, 0, args.cloudwatch_latency_ms))
+        results["offloaded_side_effects"] = asyncio.run(
+            run_mode(api, records, args.concurrency, args.workers, args.cloudwatch_latency_ms))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
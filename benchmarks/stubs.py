@@ -0,0 +1,216 @@
+import hashlib
+import io
+import random
+import threading
+import time
+
+import numpy as np
+
+
+# === SageMaker Runtime ===
+class StubSageMakerRuntime:
+    """
+    Offline stand-in for boto3's sagemaker-runtime client.
+    Scores the CSV body with a local booster and sleeps to simulate the network round-trip.
+    """
+
+    def __init__(self, booster=None, latency_ms=15.0):
+        self.booster = booster
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def invoke_endpoint(self, EndpointName, ContentType, Body):
+        self.calls += 1
+        X = np.loadtxt(io.StringIO(Body), delimiter=",", ndmin=2, dtype=np.float32)
+        if self.booster is not None:
+            proba = self.booster.inplace_predict(X)
+        else:
+            proba = np.full(X.shape[0], 0.5)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        body = "\n".join(f"{p:.6f}" for p in proba)
+        return {"Body": io.BytesIO(body.encode("utf-8")), "ContentType": "text/csv"}
+
+
+# === CloudWatch ===
+class StubCloudWatch:
+    """Offline stand-in for boto3's cloudwatch client; records calls and simulates API latency."""
+
+    def __init__(self, latency_ms=20.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.datapoints = 0
+
+    def put_metric_data(self, Namespace, MetricData):
+        self.calls += 1
+        self.datapoints += len(MetricData)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return {}
+
+
+# === Kinesis ===
+class FakeKinesis:
+    """
+    In-memory stand-in for boto3's kinesis client covering the calls the producer
+    and consumer use. Records are routed to shards by hashing the partition key.
+    Each put call sleeps `latency_ms` to simulate the round-trip, and a
+    `failure_rate` fraction of put_records entries is rejected as throttled.
+    """
+
+    MAX_PUT_RECORDS = 500
+    MAX_PUT_BYTES = 5 * 1024 * 1024
+
+    def __init__(self, stream_name="patient_vitals_stream", shard_count=2, latency_ms=0.0,
+                 failure_rate=0.0, seed=0):
+        self.stream_name = stream_name
+        self.shards = {f"shardId-{i:012d}": [] for i in range(shard_count)}
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.put_calls = 0
+        self.failed_entries = 0
+
+    def _shard_for(self, partition_key):
+        digest = int(hashlib.md5(partition_key.encode("utf-8")).hexdigest(), 16)
+        return list(self.shards)[digest % len(self.shards)]
+
+    def _append(self, data, partition_key):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._lock:
+            self._sequence += 1
+            shard_id = self._shard_for(partition_key)
+            sequence_number = f"{self._sequence:056d}"
+            self.shards[shard_id].append({
+                "SequenceNumber": sequence_number,
+                "Data": data,
+                "PartitionKey": partition_key,
+                "ApproximateArrivalTimestamp": time.time(),
+            })
+        return shard_id, sequence_number
+
+    # --- producer API ---
+    def put_record(self, StreamName, Data, PartitionKey):
+        self.put_calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        shard_id, sequence_number = self._append(Data, PartitionKey)
+        return {"ShardId": shard_id, "SequenceNumber": sequence_number}
+
+    def put_records(self, StreamName, Records):
+        self.put_calls += 1
+        size = sum(len(r["Data"]) + len(r["PartitionKey"].encode("utf-8")) for r in Records)
+        if len(Records) > self.MAX_PUT_RECORDS or size > self.MAX_PUT_BYTES:
+            raise ValueError(f"PutRecords request too large: {len(Records)} records, {size} bytes")
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        results = []
+        failed = 0
+        for record in Records:
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                failed += 1
+                results.append({"ErrorCode": "ProvisionedThroughputExceededException",
+                                "ErrorMessage": "Rate exceeded for shard"})
+                continue
+            shard_id, sequence_number = self._append(record["Data"], record["PartitionKey"])
+            results.append({"ShardId": shard_id, "SequenceNumber": sequence_number})
+        with self._lock:
+            self.failed_entries += failed
+        return {"FailedRecordCount": failed, "Records": results}
+
+    def record_count(self):
+        return sum(len(records) for records in self.shards.values())
+
+    # --- consumer API ---
+    def list_shards(self, StreamName=None, NextToken=None):
+        return {"Shards": [{"ShardId": shard_id} for shard_id in self.shards]}
+
+    def get_shard_iterator(self, StreamName, ShardId, ShardIteratorType, StartingSequenceNumber=None):
+        records = self.shards[ShardId]
+        if ShardIteratorType == "TRIM_HORIZON":
+            position = 0
+        elif ShardIteratorType == "LATEST":
+            position = len(records)
+        elif ShardIteratorType in ("AFTER_SEQUENCE_NUMBER", "AT_SEQUENCE_NUMBER"):
+            position = sum(1 for r in records if r["SequenceNumber"] < StartingSequenceNumber)
+            if ShardIteratorType == "AFTER_SEQUENCE_NUMBER":
+                position += 1
+        else:
+            raise ValueError(f"Unsupported iterator type {ShardIteratorType}")
+        return {"ShardIterator": f"{ShardId}:{position}"}
+
+    def get_records(self, ShardIterator, Limit=10000):
+        shard_id, position = ShardIterator.rsplit(":", 1)
+        position = int(position)
+        records = self.shards[shard_id]
+        page = records[position:position + Limit]
+        next_position = position + len(page)
+        behind = 0
+        if next_position < len(records):
+            behind = int((time.time() - records[next_position]["ApproximateArrivalTimestamp"]) * 1000) + 1
+        return {
+            "Records": page,
+            "NextShardIterator": f"{shard_id}:{next_position}",
+            "MillisBehindLatest": behind,
+        }
+
+
+# === S3 ===
+class StubS3:
+    """
+    Offline stand-in for boto3's s3 client: put_object, get_object and
+    multipart uploads. Enforces the 5 MB minimum for all but the last part.
+    With `keep_bodies=False` only sizes are kept, so memory stays flat.
+    """
+
+    MIN_PART_BYTES = 5 * 1024 * 1024
+
+    def __init__(self, keep_bodies=True):
+        self.keep_bodies = keep_bodies
+        self.objects = {}
+        self.sizes = {}
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        with self._lock:
+            self.sizes[(Bucket, Key)] = len(Body)
+            if self.keep_bodies:
+                self.objects[(Bucket, Key)] = Body
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = f"upload-{len(self._uploads) + 1}"
+        self._uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self._uploads[UploadId][PartNumber] = (etag, Body if self.keep_bodies else len(Body))
+        return {"ETag": etag}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        uploaded = self._uploads.pop(UploadId)
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        for number in numbers[:-1]:
+            body = uploaded[number][1]
+            if (len(body) if isinstance(body, bytes) else body) < self.MIN_PART_BYTES:
+                raise ValueError(f"EntityTooSmall: part {number} is under 5 MB")
+        bodies = [uploaded[n][1] for n in numbers]
+        with self._lock:
+            self.sizes[(Bucket, Key)] = sum(len(b) if isinstance(b, bytes) else b for b in bodies)
+            if self.keep_bodies:
+                self.objects[(Bucket, Key)] = b"".join(bodies)
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._uploads.pop(UploadId, None)
+        return {}
@@ -0,0 +1,338 @@
+"""
+End-to-end benchmark suite: the real pipeline modules wired to local stand-ins.
+
+Every scenario runs in a fresh subprocess, so its peak RSS is its own, and uses
+no AWS or MySQL: a synthetic booster, StubS3 for audit logs and exports,
+FakeKinesis, StubCloudWatch, StubSageMakerRuntime and SQLite.
+
+    api_local      POST /predict with N concurrent clients, in-process model
+    api_sagemaker  the same against the stubbed SageMaker endpoint
+    stream         stream_to_kinesis producer -> FakeKinesis -> consume_kinesis
+                   shard workers -> in-process scoring, audit log, SQL writer;
+                   latency is event timestamp to scored
+    sql_writer     PredictionWriter write-behind inserts into SQLite
+    extract        extract_from_sql streaming export of patient_data to S3
+
+Each scenario reports throughput, p50/p95/p99 latency (null for the batch
+export) and peak RSS in the same schema. The results are JSON keyed by
+scenario, stamped with the git commit, and can be written with --output;
+--repeat N reports the median of N runs per scenario for less noise. Use
+--compare to diff against an earlier run; the change in each metric is given
+in percent, and --fail-on-regression exits with status 1 when a metric is
+worse than --tolerance. Usage:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --scenarios api_local stream --compare results.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+SCENARIOS = ("api_local", "api_sagemaker", "stream", "sql_writer", "extract")
+# Options forwarded to the scenario subprocesses
+PARAMS = ("requests", "concurrency", "endpoint_latency_ms", "cloudwatch_latency_ms", "events", "rate",
+          "patients", "shards", "kinesis_latency_ms", "rows", "extract_rows")
+# Metric -> True when higher is better
+COMPARED_METRICS = {"throughput": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def peak_rss_mb():
+    """Peak RSS of this process image. ru_maxrss would carry the parent's peak across fork + exec."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def summarize(count, seconds, unit, latencies_ms=None, start_rss_mb=None, **extra):
+    """The common result schema of every scenario."""
+    from benchmarks.synthetic import percentile_summary
+    result = {"throughput": round(count / seconds, 1), "unit": unit, "count": count, "seconds": round(seconds, 3)}
+    if latencies_ms:
+        summary = percentile_summary(latencies_ms)
+        result.update({key: summary[key] for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms")})
+    else:
+        result.update(mean_ms=None, p50_ms=None, p95_ms=None, p99_ms=None)
+    result.update(start_rss_mb=start_rss_mb, peak_rss_mb=peak_rss_mb(), **extra)
+    return result
+
+
+# === Scenarios (run in the child process) ===
+def run_api(args, workdir, sagemaker):
+    from functools import partial
+
+    from benchmarks.load_test import load_api, run_load
+    from benchmarks.stubs import StubCloudWatch, StubS3, StubSageMakerRuntime
+    from benchmarks.synthetic import make_patient_records
+    from src.logging.log_to_s3 import S3Sink
+
+    booster_path = os.path.join(workdir, "model.json")
+    os.environ["MODEL_REGISTRY_DIR"] = os.path.join(workdir, "registry-api")
+    api = load_api(workdir, booster_path)
+    s3 = StubS3(keep_bodies=False)
+    api.AUDIT_LOG_DIR = None
+    api.S3Sink = partial(S3Sink, client=s3)
+    api.cloudwatch = StubCloudWatch(latency_ms=args.cloudwatch_latency_ms)
+    if sagemaker:
+        import xgboost as xgb
+        from src.inference.model_backend import SageMakerBackend
+        endpoint = StubSageMakerRuntime(xgb.Booster(model_file=booster_path), latency_ms=args.endpoint_latency_ms)
+        api.MODEL_BACKEND = "sagemaker"
+        api.load_backend = lambda *a, **k: SageMakerBackend("bench-endpoint", "us-east-1", client=endpoint)
+    records = make_patient_records(args.requests)
+
+    async def run():
+        async with api.app.router.lifespan_context(api.app):
+            await run_load(api, records[:100], args.concurrency)  # warm-up
+            start_rss = peak_rss_mb()
+            latencies = []
+            start = time.perf_counter()
+            await run_load(api, records, args.concurrency, latencies=latencies)
+            return time.perf_counter() - start, latencies, start_rss
+
+    seconds, latencies, start_rss = asyncio.run(run())
+    return summarize(len(records), seconds, "requests/s", latencies, start_rss,
+                     audit_objects=len(s3.sizes), rows_written=api.sql_writer.stats()["rows_written"])
+
+
+def run_stream(args, workdir):
+    from sqlalchemy import create_engine
+
+    from benchmarks.bench_consumer import make_demographics_db
+    from benchmarks.stubs import FakeKinesis, StubS3
+    from benchmarks.synthetic import make_patient_records
+    from src.inference.model_backend import LocalXGBoostBackend
+    from src.inference.scoring import BatchScorer
+    from src.logging.log_to_s3 import AuditLogShipper, S3Sink
+    from src.post_prediction.store_to_sql import PredictionWriter, init_db
+    from src.streaming import consume_kinesis as consumer
+    from src.streaming.checkpoints import CheckpointStore
+    from src.streaming.demographics import DemographicsService
+    from src.streaming.feature_store import event_time
+    from src.streaming.stream_to_kinesis import KinesisBatchProducer, simulate_patients
+
+    patients = make_patient_records(args.patients)
+    for i, patient in enumerate(patients):
+        patient["patient_id"] = f"P{100 + i}"  # the ids simulate_patients sends
+    consumer.demographics_service = DemographicsService(
+        make_demographics_db(os.path.join(workdir, "patients.db"), patients))
+    consumer.demographics_service.warm_up()
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'stream.db')}")
+    s3 = StubS3(keep_bodies=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db(engine)
+    consumer._scorer = BatchScorer(
+        LocalXGBoostBackend.from_artifacts([os.path.join(workdir, "model.json")]),
+        audit_log=AuditLogShipper(S3Sink("bench", client=s3)).start(),
+        sql_writer=PredictionWriter(engine).start()
+    )
+    consumer._scorer.score([consumer.build_input(
+        {"patient_id": "P100", "blood_pressure": "high", "heart_rate": 80, "oxygen_saturation": 97.0,
+         "temperature": 37.0}, patients[0])])  # warm-up
+    consumer.INITIAL_POSITION = "TRIM_HORIZON"
+
+    kinesis = FakeKinesis(shard_count=args.shards, latency_ms=args.kinesis_latency_ms)
+    latencies = []
+    done = threading.Event()
+
+    def handler(vitals_list, sequence_numbers=None):
+        consumer.process_records(vitals_list, sequence_numbers)
+        now = time.time()
+        latencies.extend((now - event_time(v["timestamp"])) * 1000 for v in vitals_list)
+        if len(latencies) >= args.events:
+            done.set()
+
+    stop = threading.Event()
+    start_rss = peak_rss_mb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        thread = threading.Thread(target=consumer.consume_kinesis, name="consumer", daemon=True, kwargs=dict(
+            client=kinesis, checkpoints=CheckpointStore(":memory:"), handler=handler, stop_event=stop,
+            stream_name=kinesis.stream_name))
+        thread.start()
+        start = time.perf_counter()
+        producer = KinesisBatchProducer(kinesis, kinesis.stream_name, backoff_s=0.001).start()
+        simulate_patients(producer, rate=args.rate, patients=args.patients, workers=2, max_events=args.events)
+        done.wait(60 + args.events / 100)
+        seconds = time.perf_counter() - start
+        producer.close()
+        stop.set()
+        thread.join()  # closes the scorer: audit log and SQL writer are flushed
+    return summarize(len(latencies), seconds, "events/s", latencies, start_rss,
+                     target_rate=args.rate, sent=producer.records_sent, put_calls=kinesis.put_calls,
+                     audit_objects=len(s3.sizes), rows_written=consumer._scorer.sql_writer.stats()["rows_written"])
+
+
+def run_sql_writer(args, workdir):
+    from sqlalchemy import create_engine
+
+    from benchmarks.synthetic import make_patient_records
+    from src.post_prediction.store_to_sql import PredictionWriter, init_db
+
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'writer.db')}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db(engine)
+    records = make_patient_records(args.rows)
+    prediction = {"readmitted_prediction": 1, "readmitted_probability": 0.8123}
+    writer = PredictionWriter(engine).start()
+    start_rss = peak_rss_mb()
+    latencies = []
+    start = time.perf_counter()
+    for record in records:
+        call_start = time.perf_counter()
+        writer.add(record, prediction)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    writer.close()
+    seconds = time.perf_counter() - start
+    return summarize(writer.rows_written, seconds, "rows/s", latencies, start_rss, flushes=writer.flushes)
+
+
+def run_extract(args, workdir):
+    from sqlalchemy import create_engine
+
+    from benchmarks.bench_extract import make_patient_table
+    from benchmarks.stubs import StubS3
+    from src.sql_to_s3.extract_from_sql import SQL_QUERY, export_query_to_s3
+
+    db_path = os.path.join(workdir, "extract.db")
+    make_patient_table(db_path, args.extract_rows)
+    engine = create_engine(f"sqlite:///{db_path}")
+    start_rss = peak_rss_mb()
+    start = time.perf_counter()
+    manifest = export_query_to_s3(engine, SQL_QUERY, "training_data/export.csv.gz", bucket="bench",
+                                  client=StubS3(keep_bodies=False))
+    seconds = time.perf_counter() - start
+    return summarize(manifest["rows"], seconds, "rows/s", None, start_rss, parts=len(manifest["parts"]),
+                     compressed_mb=round(manifest["bytes"] / 2**20, 2))
+
+
+def child(args):
+    import logging
+    logging.getLogger("healthcare-api").setLevel(logging.WARNING)
+    runners = {
+        "api_local": lambda: run_api(args, args.workdir, sagemaker=False),
+        "api_sagemaker": lambda: run_api(args, args.workdir, sagemaker=True),
+        "stream": lambda: run_stream(args, args.workdir),
+        "sql_writer": lambda: run_sql_writer(args, args.workdir),
+        "extract": lambda: run_extract(args, args.workdir),
+    }
+    print(json.dumps(runners[args.child]()))
+
+
+# === Driver ===
+def run_scenario(name, args, workdir):
+    command = [sys.executable, "-m", "benchmarks.suite", "--child", name, "--workdir", workdir]
+    for param in PARAMS:
+        command += [f"--{param.replace('_', '-')}", str(getattr(args, param))]
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median_result(runs):
+    """Per-metric median over repeated runs of one scenario."""
+    merged = dict(runs[0], runs=len(runs))
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            merged[key] = statistics.median(run[key] for run in runs)
+    return merged
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, tolerance_pct):
+    """{scenario: {metric: baseline, current, change_pct, regression}} for scenarios present in both runs."""
+    out = {}
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        out[name] = {}
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            out[name][metric] = {"baseline": old, "current": new, "change_pct": round(change, 1),
+                                 "regression": worse > tolerance_pct}
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=3000, help="API requests per run")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--endpoint-latency-ms", type=float, default=15.0)
+    parser.add_argument("--cloudwatch-latency-ms", type=float, default=20.0)
+    parser.add_argument("--events", type=int, default=10000, help="stream events per run")
+    parser.add_argument("--rate", type=int, default=2000, help="producer events/sec, 0 = unthrottled")
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--shards", type=int, default=2)
+    parser.add_argument("--kinesis-latency-ms", type=float, default=5.0)
+    parser.add_argument("--rows", type=int, default=20000, help="rows for the SQL writer")
+    parser.add_argument("--extract-rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario; metrics are their medians")
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="percent change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    from benchmarks.synthetic import train_synthetic_booster
+    results = {
+        "commit": git_commit(),
+        "run_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "params": dict({param: getattr(args, param) for param in PARAMS}, repeat=args.repeat),
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        train_synthetic_booster().save_model(os.path.join(tmp, "model.json"))
+        for name in args.scenarios:
+            results["scenarios"][name] = median_result([run_scenario(name, args, tmp) for _ in range(args.repeat)])
+
+    regressions = False
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        results["compared_to"] = baseline.get("commit")
+        results["comparison"] = compare(baseline, results, args.tolerance)
+        regressions = any(m["regression"] for metrics in results["comparison"].values() for m in metrics.values())
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+
+# === CONFIG ===
+FEATURE_COUNT = 8
+HYPERPARAMETERS = {
+    "objective": "binary:logistic",
+    "max_depth": 5,
+    "eta": 0.2,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "eval_metric": "logloss",
+}
+NUM_ROUND = 100
+
+
+def make_patient_record(rng=random):
+    """Random PatientInput-shaped dict, matching the ranges produced by stream_to_kinesis."""
+    return {
+        "patient_id": f"P{rng.randint(100, 999)}",
+        "age": rng.randint(18, 95),
+        "gender": rng.choice(["male", "female"]),
+        "blood_pressure": rng.choice(["normal", "high", "low"]),
+        "heart_rate": rng.randint(60, 130),
+        "cholesterol": round(rng.uniform(150, 300), 1),
+        "blood_sugar": round(rng.uniform(70, 200), 1),
+        "oxygen_saturation": round(rng.uniform(90, 100), 2),
+        "temperature": round(rng.uniform(36.0, 39.0), 1),
+    }
+
+
+def make_patient_records(n, seed=42):
+    rng = random.Random(seed)
+    return [make_patient_record(rng) for _ in range(n)]
+
+
+def make_feature_matrix(n, seed=42):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(18, 95, n),
+        rng.integers(60, 130, n),
+        rng.uniform(150, 300, n),
+        rng.uniform(70, 200, n),
+        rng.uniform(90, 100, n),
+        rng.uniform(36.0, 39.0, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+    ]).astype(np.float32)
+    logit = 0.04 * (X[:, 0] - 55) + 0.03 * (X[:, 1] - 90) - 0.3 * (X[:, 4] - 95) - 0.8 * X[:, 7]
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(np.float32)
+    return X, y
+
+
+def train_synthetic_booster(n=5000, seed=42):
+    """Booster with the production hyperparameters, for benchmarks when no real artifact exists."""
+    import xgboost as xgb
+
+    X, y = make_feature_matrix(n, seed)
+    params = dict(HYPERPARAMETERS, tree_method="hist", seed=seed)
+    return xgb.train(params, xgb.DMatrix(X, label=y), num_boost_round=NUM_ROUND)
+
+
+def percentile_summary(samples_ms):
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "count": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 4),
+        "p50_ms": round(float(np.percentile(arr, 50)), 4),
+        "p95_ms": round(float(np.percentile(arr, 95)), 4),
+        "p99_ms": round(float(np.percentile(arr, 99)), 4),
+    }
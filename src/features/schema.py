@@ -0,0 +1,114 @@
+# src/features/schema.py
+
+import numpy as np
+
+# === Feature Schema ===
+# Fixed column order shared by serving and retraining. Categorical fields are
+# one-hot encoded with drop_first semantics: one indicator column per
+# non-reference category, matching the columns the model was trained on.
+NUMERIC_FEATURES = [
+    "age", "heart_rate", "cholesterol", "blood_sugar", "oxygen_saturation", "temperature"
+]
+CATEGORICAL_FEATURES = {
+    "gender": ["male"],
+    "blood_pressure": ["normal"],
+}
+FEATURE_COLUMNS = NUMERIC_FEATURES + [
+    f"{field}_{category}" for field, categories in CATEGORICAL_FEATURES.items() for category in categories
+]
+N_FEATURES = len(FEATURE_COLUMNS)
+DTYPE = np.float32
+
+# Rolling vitals aggregates from the streaming feature store (src/streaming/feature_store.py),
+# appended after FEATURE_COLUMNS for models trained with them. Missing values encode as NaN.
+ROLLING_VITALS = ["heart_rate", "oxygen_saturation", "temperature"]
+ROLLING_WINDOWS_MIN = [5, 15, 60]
+ROLLING_STATS = ["mean", "min", "max", "slope"]  # slope is per minute
+ROLLING_FEATURE_COLUMNS = [
+    f"{vital}_{stat}_{window}m" for window in ROLLING_WINDOWS_MIN for vital in ROLLING_VITALS for stat in ROLLING_STATS
+] + [f"vitals_count_{window}m" for window in ROLLING_WINDOWS_MIN]
+EXTENDED_FEATURE_COLUMNS = FEATURE_COLUMNS + ROLLING_FEATURE_COLUMNS
+N_EXTENDED_FEATURES = len(EXTENDED_FEATURE_COLUMNS)
+
+# Precomputed lookups: numeric field -> column, and field -> {category: column}
+NUMERIC_INDEX = tuple((name, FEATURE_COLUMNS.index(name)) for name in NUMERIC_FEATURES)
+CATEGORY_INDEX = {
+    field: {category: FEATURE_COLUMNS.index(f"{field}_{category}") for category in categories}
+    for field, categories in CATEGORICAL_FEATURES.items()
+}
+_CATEGORY_ITEMS = tuple(
+    (field, tuple(mapping.values()), mapping) for field, mapping in CATEGORY_INDEX.items()
+)
+
+
+def allocate(n_rows=None):
+    """Preallocate an output buffer: a single row, or an (n_rows, N_FEATURES) matrix."""
+    if n_rows is None:
+        return np.empty(N_FEATURES, dtype=DTYPE)
+    return np.empty((n_rows, N_FEATURES), dtype=DTYPE)
+
+
+def encode_row(record, out=None):
+    """Encode one PatientInput-shaped mapping into a float32 feature row."""
+    if out is None:
+        out = np.empty(N_FEATURES, dtype=DTYPE)
+    for name, i in NUMERIC_INDEX:
+        value = record.get(name)
+        out[i] = np.nan if value is None else value
+    for field, columns, mapping in _CATEGORY_ITEMS:
+        for i in columns:
+            out[i] = 0.0
+        i = mapping.get(record.get(field))
+        if i is not None:
+            out[i] = 1.0
+    return out
+
+
+def encode_batch(records, out=None):
+    """Encode a sequence of mappings into an (n, N_FEATURES) float32 matrix."""
+    n = len(records)
+    if out is None:
+        out = np.empty((n, N_FEATURES), dtype=DTYPE)
+    for r, record in enumerate(records):
+        encode_row(record, out[r])
+    return out[:n]
+
+
+def encode_batch_extended(records, out=None, features=None):
+    """
+    encode_batch plus the rolling aggregates: from `features` (one mapping or
+    None per record) when given, else from the records themselves (NaN where absent).
+    """
+    n = len(records)
+    if out is None:
+        out = np.empty((n, N_EXTENDED_FEATURES), dtype=DTYPE)
+    encode_batch(records, out[:, :N_FEATURES])
+    for r, record in enumerate(records if features is None else features):
+        row = out[r]
+        if not record:
+            row[N_FEATURES:] = np.nan
+            continue
+        for i, name in enumerate(ROLLING_FEATURE_COLUMNS, start=N_FEATURES):
+            value = record.get(name)
+            row[i] = np.nan if value is None else value
+    return out[:n]
+
+
+def encode_columns(columns, out=None):
+    """
+    Vectorized encoding of column-oriented data (a DataFrame or a dict of arrays).
+    Numeric fields absent from the source are left as NaN (missing for XGBoost).
+    """
+    n = len(next(iter(columns.values()))) if isinstance(columns, dict) else len(columns)
+    if out is None:
+        out = np.empty((n, N_FEATURES), dtype=DTYPE)
+    for name, i in NUMERIC_INDEX:
+        if name in columns:
+            out[:n, i] = np.asarray(columns[name], dtype=DTYPE)
+        else:
+            out[:n, i] = np.nan
+    for field, mapping in CATEGORY_INDEX.items():
+        values = np.asarray(columns[field], dtype=object) if field in columns else None
+        for category, i in mapping.items():
+            out[:n, i] = 0.0 if values is None else (values == category)
+    return out[:n]
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from src.inference.metrics import Histogram
+from src.inference.tracing import span
+
+logger = logging.getLogger("healthcare-api")
+
+# === CONFIG ===
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+QUEUE_DELAY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100]
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row scoring requests into one matrix.
+
+    A batch is dispatched when it reaches `max_batch_size` rows or when the oldest
+    request has waited `max_wait_ms`. `score_fn` takes an (n, features) float32
+    matrix and returns n probabilities; it runs in the default executor so the
+    event loop keeps accepting requests while a batch is being scored. Pass the
+    histograms of a batcher being replaced to keep one series across reloads.
+    """
+
+    def __init__(self, score_fn, max_batch_size=32, max_wait_ms=2.0, max_inflight_batches=2,
+                 batch_sizes=None, queue_delay_ms=None):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_inflight_batches = max_inflight_batches
+        self._queue = None
+        self._worker = None
+        self._inflight = None
+        self._pending_batches = set()
+        self.batch_sizes = batch_sizes or Histogram(
+            "batcher_batch_size", "Rows per coalesced model call", buckets=BATCH_SIZE_BUCKETS
+        )
+        self.queue_delay_ms = queue_delay_ms or Histogram(
+            "batcher_queue_delay_ms", "Time a request waited before its batch was dispatched",
+            buckets=QUEUE_DELAY_BUCKETS_MS
+        )
+        self.failed_batches = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._inflight = asyncio.Semaphore(self.max_inflight_batches)
+        self._worker = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Score everything already queued, then stop the worker."""
+        if self._worker is None:
+            return
+        self._queue.put_nowait(_STOP)
+        await self._worker
+        if self._pending_batches:
+            await asyncio.gather(*self._pending_batches, return_exceptions=True)
+        self._worker = None
+
+    async def submit(self, row) -> float:
+        """Queue one feature row and wait for its probability."""
+        future = asyncio.get_event_loop().create_future()
+        self._queue.put_nowait((row, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if not batch:
+                continue
+            await self._inflight.acquire()
+            task = asyncio.ensure_future(self._score(batch))
+            self._pending_batches.add(task)
+            task.add_done_callback(self._pending_batches.discard)
+
+    async def _score(self, batch):
+        try:
+            dispatched = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.queue_delay_ms.observe((dispatched - enqueued) * 1000)
+
+            X = np.vstack([row for row, _, _ in batch]).astype(np.float32, copy=False)
+            loop = asyncio.get_event_loop()
+            try:
+                with span("batcher", "model_call"):
+                    proba = await loop.run_in_executor(None, self.score_fn, X)
+                if len(proba) != len(batch):
+                    raise ValueError(f"Model returned {len(proba)} scores for a batch of {len(batch)}")
+            except Exception as e:
+                self.failed_batches += 1
+                logger.error(f"[Batcher] Scoring failed for batch of {len(batch)}", exc_info=True)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future, _), p in zip(batch, proba):
+                if not future.done():
+                    future.set_result(float(p))
+        finally:
+            self._inflight.release()
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "failed_batches": self.failed_batches,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_delay_ms": self.queue_delay_ms.snapshot(),
+        }
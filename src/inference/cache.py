@@ -0,0 +1,150 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# === CONFIG ===
+PREDICTION_CACHE = os.getenv("PREDICTION_CACHE", "false").lower() == "true"
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "100000"))  # entries
+PREDICTION_CACHE_TTL_S = float(os.getenv("PREDICTION_CACHE_TTL_S", "300"))
+# Per-entry cost besides the key bytes: OrderedDict slot and link, (version, bytes) tuple, value tuple, float
+_ENTRY_OVERHEAD_BYTES = 100 + sys.getsizeof((None, None)) * 2 + sys.getsizeof(0.0)
+
+
+class PredictionCache:
+    """
+    Bounded LRU + TTL map from (model version, encoded feature row) to the
+    model's probability. Rows are keyed by their float32 bytes, so only
+    bit-identical inputs hit. Including the version means entries from a
+    replaced model can never be served; `invalidate()` also drops them
+    eagerly on reload. Thread-safe: the API looks up on the event loop and
+    batch scoring fills it from worker threads.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl_s=PREDICTION_CACHE_TTL_S, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _entry_bytes(key):
+        return sys.getsizeof(key[1]) + _ENTRY_OVERHEAD_BYTES
+
+    def get(self, version, row):
+        """Cached probability for `row` under `version`, or None."""
+        key = (version, row.tobytes())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.memory_bytes -= self._entry_bytes(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version, row, value):
+        self._put_many(version, [row.tobytes()], [value])
+
+    def _put_many(self, version, raw_rows, values):
+        expires_at = self.clock() + self.ttl_s
+        with self._lock:
+            for raw, value in zip(raw_rows, values):
+                key = (version, raw)
+                if key not in self._entries:
+                    self.memory_bytes += self._entry_bytes(key)
+                self._entries[key] = (float(value), expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                key, _ = self._entries.popitem(last=False)
+                self.memory_bytes -= self._entry_bytes(key)
+                self.evictions += 1
+
+    def predict(self, version, predict_proba, X) -> np.ndarray:
+        """
+        Probabilities for every row of X, calling `predict_proba` once on the
+        distinct rows that are not cached (repeats within X count as hits).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        proba = np.empty(len(X), dtype=np.float64)
+        raw_rows = [row.tobytes() for row in X]
+        missing = {}  # raw row -> indices in X
+        now = self.clock()
+        with self._lock:
+            for i, raw in enumerate(raw_rows):
+                if raw in missing:
+                    missing[raw].append(i)
+                    continue
+                key = (version, raw)
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    proba[i] = entry[0]
+                    continue
+                if entry is not None:
+                    del self._entries[key]
+                    self.memory_bytes -= self._entry_bytes(key)
+                    self.expirations += 1
+                missing[raw] = [i]
+            self.hits += len(X) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            first = [indices[0] for indices in missing.values()]
+            scored = np.asarray(predict_proba(X[first]), dtype=np.float64).reshape(-1)
+            for indices, p in zip(missing.values(), scored):
+                proba[indices] = p
+            self._put_many(version, list(missing), scored)
+        return proba
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "memory_bytes": self.memory_bytes,
+        }
+
+
+class CachedBackend:
+    """Scoring backend wrapper that serves repeated rows from a PredictionCache."""
+
+    def __init__(self, backend, cache, version):
+        self.backend = backend
+        self.cache = cache
+        self.version = version
+        self.name = backend.name
+        self.label = backend.label
+        self.n_features = getattr(backend, "n_features", None)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.cache.predict(self.version, self.backend.predict_proba, X)
@@ -0,0 +1,183 @@
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger("healthcare-api")
+
+# === CONFIG ===
+CHUNK_ROWS = 1024  # rows traversed together; keeps the (rows x trees) working arrays in cache
+SIGMOID_OBJECTIVES = ("binary:logistic", "reg:logistic")
+IDENTITY_OBJECTIVES = ("reg:squarederror",)
+
+
+def _base_score(learner) -> float:
+    value = learner["learner_model_param"]["base_score"]
+    return float(value.strip("[]").split(",")[0])  # "5E-1", or "[5E-1]" from xgboost 3
+
+
+# === Flattened Trees ===
+class CompiledTrees:
+    """
+    All trees of a booster as flat node arrays: split feature, float32
+    threshold, (left, right) children, missing-value direction and leaf value.
+    Leaves point to themselves, so `max_depth` vectorized steps take every
+    (row, tree) pair to its leaf, whatever the tree's shape. A row goes left
+    when `x < threshold`, or when x is NaN and the node defaults left, as in
+    XGBoost. Needs only NumPy; no DMatrix, no library call per batch.
+    """
+
+    def __init__(self, feature, threshold, children, default_left, leaf_value, roots, base_margin, objective,
+                 n_features, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.base_margin = base_margin
+        self.objective = objective
+        self.n_features = n_features
+        self.max_depth = max_depth
+        self._children_flat = children.reshape(-1)
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Convert an XGBoost gbtree binary classifier / regressor with numeric splits."""
+        learner = json.loads(booster.save_raw("json"))["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in SIGMOID_OBJECTIVES + IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective {objective}")
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster {learner['gradient_booster']['name']}")
+        base_score = _base_score(learner)
+        base_margin = float(np.log(base_score / (1 - base_score))) if objective in SIGMOID_OBJECTIVES else base_score
+
+        features, thresholds, children, default_left, leaf_values, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in learner["gradient_booster"]["model"]["trees"]:
+            if any(tree["split_type"]):
+                raise ValueError(f"Tree {tree['id']} has categorical splits")
+            left = np.asarray(tree["left_children"], dtype=np.int64)
+            right = np.asarray(tree["right_children"], dtype=np.int64)
+            n = left.size
+            is_leaf = left == -1
+            own = np.arange(n)
+            depth = np.zeros(n, dtype=np.int64)
+            for node in range(n):  # parents come before their children
+                if not is_leaf[node]:
+                    depth[left[node]] = depth[right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            features.append(np.where(is_leaf, 0, tree["split_indices"]))
+            thresholds.append(np.where(is_leaf, np.float32(0), conditions))
+            children.append(np.stack([np.where(is_leaf, own, left), np.where(is_leaf, own, right)], axis=1) + offset)
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            leaf_values.append(np.where(is_leaf, conditions, np.float32(0)))  # leaves keep their value here
+            roots.append(offset)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float32),
+            children=np.concatenate(children).astype(np.int32),
+            default_left=np.concatenate(default_left),
+            leaf_value=np.concatenate(leaf_values).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.int32),
+            base_margin=base_margin,
+            objective=objective,
+            n_features=int(learner["learner_model_param"]["num_feature"]),
+            max_depth=max_depth,
+        )
+
+    @classmethod
+    def from_artifacts(cls, paths=None):
+        from src.inference.model_backend import load_booster
+        booster, _ = load_booster(paths)
+        return cls.from_booster(booster)
+
+    # --- persistence: serving from the .npz needs no xgboost import ---
+    def save(self, path: str):
+        np.savez(path, feature=self.feature, threshold=self.threshold, children=self.children,
+                 default_left=self.default_left, leaf_value=self.leaf_value, roots=self.roots,
+                 meta=np.array(json.dumps({"base_margin": self.base_margin, "objective": self.objective,
+                                           "n_features": self.n_features, "max_depth": self.max_depth})))
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as arrays:
+            meta = json.loads(str(arrays["meta"]))
+            return cls(arrays["feature"], arrays["threshold"], arrays["children"], arrays["default_left"],
+                       arrays["leaf_value"], arrays["roots"], **meta)
+
+    # --- scoring ---
+    def _margin_chunk(self, X) -> np.ndarray:
+        n, n_trees = X.shape[0], self.roots.size
+        values = X.reshape(-1)
+        row_offsets = (np.arange(n, dtype=np.int32) * X.shape[1])[:, None]
+        has_missing = np.isnan(values).any()
+        nodes = np.empty((n, n_trees), dtype=np.int32)
+        nodes[:] = self.roots
+        index = np.empty_like(nodes)
+        x = np.empty((n, n_trees), dtype=np.float32)
+        threshold = np.empty_like(x)
+        go_right = np.empty((n, n_trees), dtype=bool)
+        for _ in range(self.max_depth):
+            np.take(self.feature, nodes, out=index)
+            index += row_offsets
+            np.take(values, index, out=x)
+            np.take(self.threshold, nodes, out=threshold)
+            np.greater_equal(x, threshold, out=go_right)  # NaN compares False, i.e. left, unless fixed below
+            if has_missing:
+                missing = np.isnan(x)
+                go_right[missing] = ~self.default_left[nodes[missing]]
+            nodes *= 2
+            nodes += go_right
+            np.take(self._children_flat, nodes, out=nodes)
+        return np.take(self.leaf_value, nodes).sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_margin(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        if X.shape[0] <= CHUNK_ROWS:
+            return self._margin_chunk(X)
+        return np.concatenate([self._margin_chunk(X[i:i + CHUNK_ROWS]) for i in range(0, X.shape[0], CHUNK_ROWS)])
+
+    def predict_proba(self, X) -> np.ndarray:
+        margin = self.predict_margin(X)
+        if self.objective in SIGMOID_OBJECTIVES:
+            return 1.0 / (1.0 + np.exp(-margin))
+        return margin
+
+    def memory_bytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.default_left,
+                                      self.leaf_value, self.roots))
+
+    def stats(self) -> dict:
+        return {
+            "trees": int(self.roots.size),
+            "nodes": int(self.feature.size),
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "objective": self.objective,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert a booster artifact into flat node arrays (.npz)")
+    parser.add_argument("artifact", nargs="?", help="booster file; default: the API's local model candidates")
+    parser.add_argument("output", nargs="?", default="models/compiled_trees.npz")
+    args = parser.parse_args()
+    trees = CompiledTrees.from_artifacts([args.artifact] if args.artifact else None)
+    trees.save(args.output)
+    print(f" Wrote {args.output}: {trees.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+from bisect import bisect_left
+from collections import deque
+import logging
+import threading
+import time
+
+logger = logging.getLogger("healthcare-api")
+
+# === CONFIG ===
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+CLOUDWATCH_FLUSH_INTERVAL_S = 60.0
+FOLD_INTERVAL_S = 1.0
+CLOUDWATCH_MAX_DATUMS_PER_CALL = 20
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (list(extra) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+# === Metric Types ===
+class _Metric:
+    """
+    Recording only appends to a deque (atomic in CPython, no lock on the hot path).
+    Pending observations are folded into the aggregates under a lock by the
+    publisher thread, when the metric is read, or inline once FOLD_THRESHOLD
+    entries are pending (which bounds memory if nothing else folds).
+    """
+
+    FOLD_THRESHOLD = 65536
+
+    def __init__(self, name, help_text, label_names, cloudwatch_name, unit):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.cloudwatch_name = cloudwatch_name
+        self.unit = unit
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def _record(self, labels, value):
+        pending = self._pending
+        pending.append((labels, value))
+        if len(pending) >= self.FOLD_THRESHOLD:
+            self._fold()
+
+    def _fold(self):
+        pending = self._pending
+        with self._lock:
+            while True:
+                try:
+                    labels, value = pending.popleft()
+                except IndexError:
+                    return
+                self._apply(labels, value)
+
+
+class Counter(_Metric):
+    """Monotonic counter keyed by a tuple of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=(), cloudwatch_name=None, unit="Count"):
+        super().__init__(name, help_text, label_names, cloudwatch_name, unit)
+        self._values = {}
+        self._flushed = {}
+
+    def inc(self, labels=(), value=1):
+        self._record(labels, value)
+
+    def _apply(self, labels, value):
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def value(self, labels=()):
+        self._fold()
+        return self._values.get(labels, 0)
+
+    def render(self):
+        self._fold()
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {value}" for labels, value in items]
+
+    def drain_cloudwatch(self):
+        """Datapoints for the increase since the previous flush."""
+        self._fold()
+        datums = []
+        with self._lock:
+            for labels, value in self._values.items():
+                delta = value - self._flushed.get(labels, 0)
+                self._flushed[labels] = value
+                if delta:
+                    datums.append((labels, {"Value": delta}))
+        return datums
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram keyed by a tuple of label values. Keeps cumulative
+    buckets and sum for Prometheus, plus the min/max since the last CloudWatch
+    flush so each flush can send a statistic set.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS_MS,
+                 cloudwatch_name=None, unit="Milliseconds"):
+        super().__init__(name, help_text, label_names, cloudwatch_name, unit)
+        self.buckets = list(buckets)
+        self._series = {}
+        self._flushed = {}
+
+    def observe(self, value, labels=()):
+        self._record(labels, value)
+
+    def _apply(self, labels, value):
+        # Flat list per series: [bucket counts..., +Inf, sum, window min, window max]
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, float("inf"), float("-inf")]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-3] += value
+        if value < series[-2]:
+            series[-2] = value
+        if value > series[-1]:
+            series[-1] = value
+
+    def _read(self):
+        self._fold()
+        with self._lock:
+            return [(labels, series[:-3], series[-3]) for labels, series in self._series.items()]
+
+    def series(self):
+        """Every series as (labels, bucket counts incl. +Inf, sum)."""
+        return self._read()
+
+    def snapshot(self, labels=()):
+        """Plain-dict view of one series, for JSON stats endpoints."""
+        counts, total = [0] * (len(self.buckets) + 1), 0.0
+        for series_labels, series_counts, series_total in self._read():
+            if series_labels == labels:
+                counts, total = series_counts, series_total
+        count = sum(counts)
+        return {
+            "count": count,
+            "mean": round(total / count, 4) if count else 0.0,
+            "buckets": dict(zip([f"le_{b}" for b in self.buckets] + ["le_inf"], counts)),
+        }
+
+    def render(self):
+        lines = []
+        for labels, counts, total in self._read():
+            cumulative = 0
+            for bound, n in zip(self.buckets + ["+Inf"], counts):
+                cumulative += n
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, labels, [('le', bound)])} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {round(total, 6)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+    def drain_cloudwatch(self):
+        """Statistic set (count/sum/min/max) for observations since the previous flush."""
+        self._fold()
+        datums = []
+        with self._lock:
+            for labels, series in self._series.items():
+                count, total = sum(series[:-3]), series[-3]
+                low, high = series[-2], series[-1]
+                series[-2], series[-1] = float("inf"), float("-inf")
+                last_count, last_total = self._flushed.get(labels, (0, 0.0))
+                self._flushed[labels] = (count, total)
+                if count > last_count:
+                    datums.append((labels, {"StatisticValues": {
+                        "SampleCount": count - last_count, "Sum": total - last_total,
+                        "Minimum": low, "Maximum": high
+                    }}))
+        return datums
+
+
+# === Registry ===
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._gauges = {}
+
+    def register(self, metric):
+        """Add (or replace, by name) a metric created elsewhere."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def fold(self):
+        """Aggregate pending observations of every metric."""
+        for metric in list(self._metrics.values()):
+            metric._fold()
+
+    def register_gauges(self, prefix, collect):
+        """Expose a stats() callable (returning flat numeric values) as gauges named prefix_<key>."""
+        self._gauges[prefix] = collect
+
+    def render_prometheus(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for prefix, collect in self._gauges.items():
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def cloudwatch_metric_data(self):
+        data = []
+        for metric in self._metrics.values():
+            if not metric.cloudwatch_name:
+                continue
+            for labels, payload in metric.drain_cloudwatch():
+                datum = {"MetricName": metric.cloudwatch_name, "Unit": metric.unit}
+                dimensions = [
+                    {"Name": "".join(p.capitalize() for p in k.split("_")), "Value": str(v)}
+                    for k, v in zip(metric.label_names, labels)
+                ]
+                if dimensions:
+                    datum["Dimensions"] = dimensions
+                datum.update(payload)
+                data.append(datum)
+        return data
+
+
+# === CloudWatch Publisher ===
+class CloudWatchPublisher:
+    """
+    Background thread that folds pending observations every FOLD_INTERVAL_S and
+    flushes aggregated registry deltas to CloudWatch every `interval_s` seconds.
+    """
+
+    def __init__(self, registry, client, namespace, interval_s=CLOUDWATCH_FLUSH_INTERVAL_S):
+        self.registry = registry
+        self.client = client
+        self.namespace = namespace
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="cloudwatch-publisher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the publisher after one final flush."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(self.interval_s)
+        self._thread = None
+
+    def _run(self):
+        next_flush = time.monotonic() + self.interval_s
+        while not self._stop.wait(min(FOLD_INTERVAL_S, self.interval_s)):
+            self.registry.fold()
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush += self.interval_s
+        self.flush()
+
+    def flush(self):
+        from src.inference.tracing import span  # tracing imports this module
+        data = self.registry.cloudwatch_metric_data()
+        for i in range(0, len(data), CLOUDWATCH_MAX_DATUMS_PER_CALL):
+            try:
+                with span("metrics", "put_metric_data"):
+                    self.client.put_metric_data(
+                        Namespace=self.namespace,
+                        MetricData=data[i:i + CLOUDWATCH_MAX_DATUMS_PER_CALL]
+                    )
+            except Exception:
+                self.failed_flushes += 1
+                logger.error("[Metrics] CloudWatch flush failed", exc_info=True)
+        self.flushes += 1
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,155 @@
+import glob
+import io
+import logging
+import os
+import pickle
+import tarfile
+
+import numpy as np
+
+logger = logging.getLogger("healthcare-api")
+
+# === CONFIG ===
+LOCAL_MODEL_CANDIDATES = [
+    "models/xgboost-*.ubj",            # versioned local training output, newest first
+    "models/trained_model/model.pkl",  # committed artifact
+    "models/xgboost-model",            # extracted by Download_saved_model_s3_to_models_folder.py
+    "models/model.tar.gz",             # raw SageMaker training output
+]
+SAGEMAKER_MODEL_MEMBER = "xgboost-model"
+# Batches up to this many rows are scored by the NumPy evaluator over the flattened trees instead of
+# the booster, skipping xgboost's per-call overhead; larger batches still go to xgboost. 0 = off
+COMPILED_TREES_MAX_ROWS = int(os.getenv("COMPILED_TREES_MAX_ROWS", "16"))
+
+
+# === Artifact Loading ===
+def _booster_from_bytes(raw: bytes):
+    import xgboost as xgb
+
+    # SageMaker XGBoost containers save either a native booster or a pickle
+    try:
+        booster = xgb.Booster()
+        booster.load_model(bytearray(raw))
+        return booster
+    except Exception:
+        model = pickle.loads(raw)
+    if hasattr(model, "get_booster"):
+        return model.get_booster()
+    if isinstance(model, xgb.Booster):
+        return model
+    raise ValueError(f"Unsupported model object: {type(model).__name__}")
+
+
+def _read_artifact(path: str) -> bytes:
+    if path.endswith((".tar.gz", ".tgz")):
+        with tarfile.open(path, "r:gz") as tar:
+            for member in tar.getmembers():
+                if not member.isfile():
+                    continue
+                if os.path.basename(member.name) == SAGEMAKER_MODEL_MEMBER or member.name.endswith((".pkl", ".json", ".ubj")):
+                    return tar.extractfile(member).read()
+        raise ValueError(f"No model file found inside {path}")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def load_booster(paths=None):
+    """Load the first usable XGBoost booster from the candidate artifact paths (globs: newest first)."""
+    errors = []
+    candidates = []
+    for pattern in paths or LOCAL_MODEL_CANDIDATES:
+        candidates.extend(sorted(glob.glob(pattern), reverse=True) if "*" in pattern else [pattern])
+    for path in candidates:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            errors.append(f"{path}: missing or empty")
+            continue
+        try:
+            booster = _booster_from_bytes(_read_artifact(path))
+            logger.info(f" Loaded local model from {path}")
+            return booster, path
+        except Exception as e:
+            errors.append(f"{path}: {e}")
+    raise FileNotFoundError("No usable model artifact found (" + "; ".join(errors) + ")")
+
+
+# === Scoring Backends ===
+class LocalXGBoostBackend:
+    """Scores feature matrices in-process with a booster loaded once at startup."""
+
+    name = "local"
+    label = "local XGBoost"
+
+    def __init__(self, booster, source=None):
+        self.booster = booster
+        self.source = source
+        self.n_features = booster.num_features()
+        self.compiled = None
+        if COMPILED_TREES_MAX_ROWS:
+            from src.inference.compiled_trees import CompiledTrees
+            try:
+                self.compiled = CompiledTrees.from_booster(booster)
+            except ValueError as e:
+                logger.info(f" Small batches stay on xgboost: {e}")
+
+    @classmethod
+    def from_artifacts(cls, paths=None):
+        booster, source = load_booster(paths)
+        return cls(booster, source)
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if self.compiled is not None and X.shape[0] <= COMPILED_TREES_MAX_ROWS:
+            return self.compiled.predict_proba(X)
+        return np.asarray(self.booster.inplace_predict(X), dtype=np.float64).reshape(-1)
+
+
+class SageMakerBackend:
+    """Scores feature matrices by sending them as CSV to a SageMaker endpoint."""
+
+    name = "sagemaker"
+    label = "SageMaker"
+
+    def __init__(self, endpoint_name: str, region: str, client=None):
+        self.endpoint_name = endpoint_name
+        if client is None:
+            import boto3  # only the SageMaker path needs it; keeps API imports fast
+            client = boto3.client("sagemaker-runtime", region_name=region)
+        self.client = client
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        buffer = io.StringIO()
+        np.savetxt(buffer, X, delimiter=",", fmt="%.7g")
+        response = self.client.invoke_endpoint(
+            EndpointName=self.endpoint_name,
+            ContentType="text/csv",
+            Body=buffer.getvalue()
+        )
+        payload = response["Body"].read().decode("utf-8")
+        values = payload.replace("\n", ",").strip().strip(",").split(",")
+        return np.array([float(v) for v in values if v.strip()], dtype=np.float64)
+
+
+def backend_version(backend) -> str:
+    """Version label for a backend not loaded from the registry: artifact file name or endpoint name."""
+    source = getattr(backend, "source", None)
+    if source:
+        return os.path.basename(source).split(".")[0]
+    return getattr(backend, "endpoint_name", backend.name)
+
+
+def load_backend(kind: str, endpoint_name: str, region: str, model_paths=None, fallback: bool = True):
+    """
+    Build the scoring backend selected by config ("local" or "sagemaker").
+    A local backend that cannot load its artifact falls back to SageMaker.
+    """
+    if kind == "local":
+        try:
+            return LocalXGBoostBackend.from_artifacts(model_paths)
+        except Exception as e:
+            if not fallback:
+                raise
+            logger.warning(f" Local model unavailable ({e}); falling back to SageMaker endpoint {endpoint_name}")
+    elif kind != "sagemaker":
+        raise ValueError("Unsupported model backend. Use 'local' or 'sagemaker'.")
+    return SageMakerBackend(endpoint_name, region)
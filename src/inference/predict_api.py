@@ -1,32 +1,390 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import pandas as pd
-import boto3
-import uuid
+import asyncio
+import hmac
 import json
 from datetime import datetime
 import logging
-import watchtower
-from src.post_prediction.store_to_sql import store_prediction_to_sql
+import os
+import time
+from typing import Optional
+from src.features.schema import encode_batch, encode_row
+from src.inference.batcher import MicroBatcher
+from src.inference.cache import PREDICTION_CACHE, CachedBackend, PredictionCache
+from src.inference.metrics import REGISTRY, CloudWatchPublisher
+from src.inference.model_backend import backend_version, load_backend
+from src.inference.registry import ModelRegistry, warm_up
+from src.inference.scoring import make_result, score_records
+from src.inference.shadow import Candidate, ShadowScorer, in_sample, model_output
+from src.inference.side_effects import SideEffectExecutor
+from src.inference import tracing
+from src.inference.tracing import TracingMiddleware, current_trace, profiler, request_span, span, stage_breakdown
+from src.logging.log_to_s3 import AuditLogShipper, FileSink, S3Sink
+from src.post_prediction.drift import DriftMonitor
 
 # === CONFIG ===
 S3_BUCKET = "your-s3-bucket-name"
 LOG_PREFIX = "inference_logs/"
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR")  # write audit logs to a local directory instead of S3
 ENDPOINT_NAME = "xgb-readmission-endpoint-20240718143000"  # Replace with your SageMaker endpoint
 REGION = "us-east-1"
+METRICS_NAMESPACE = "HealthcarePrediction"
+METRICS_FLUSH_INTERVAL_S = float(os.getenv("METRICS_FLUSH_INTERVAL_S", "60"))
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "local")  # "local" (in-process XGBoost) or "sagemaker"
+MODEL_RELOAD_INTERVAL_S = float(os.getenv("MODEL_RELOAD_INTERVAL_S", "30"))  # registry poll; 0 disables
+MICRO_BATCHING = os.getenv("MICRO_BATCHING", "true").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "2"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "1000"))  # rows scored per model call in /predict/batch
+BATCH_JSON_MAX_BYTES = 16 * 1024 * 1024  # larger uploads must use NDJSON so they can be streamed
+SIDE_EFFECT_WORKERS = int(os.getenv("SIDE_EFFECT_WORKERS", "4"))  # 0 runs logging/SQL/metrics inline
+SIDE_EFFECT_MAX_PENDING = int(os.getenv("SIDE_EFFECT_MAX_PENDING", "1000"))
+WARM_UP_IN_BACKGROUND = os.getenv("WARM_UP_IN_BACKGROUND", "true").lower() == "true"  # live before the model is ready
+CLOUDWATCH_LOGS = os.getenv("CLOUDWATCH_LOGS", "true").lower() == "true"
+DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "false").lower() == "true"  # /debug/* answer 404 unless enabled
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")  # when set, /debug/* also need it in the X-Debug-Token header
 
-# === SageMaker and CloudWatch clients ===
-sm_runtime = boto3.client("sagemaker-runtime", region_name=REGION)
-cloudwatch = boto3.client("cloudwatch", region_name=REGION)
+# === CloudWatch client and in-process metrics (aggregated, flushed on an interval) ===
+cloudwatch = None  # boto3 client, created at startup unless one was set beforehand
+metrics_publisher = None
+PREDICTIONS = REGISTRY.counter(
+    "predictions_successful_total", "Successful predictions", ["model_version"],
+    cloudwatch_name="SuccessfulPredictions"
+)
+FAILURES = REGISTRY.counter(
+    "predictions_failed_total", "Failed predictions", ["model_version"],
+    cloudwatch_name="PredictionFailures"
+)
+LATENCY = REGISTRY.histogram(
+    "prediction_latency_ms", "Model scoring latency in milliseconds", ["model_version", "status"],
+    cloudwatch_name="PredictionLatencyMs"
+)
+COMPARISONS = REGISTRY.counter(
+    "candidate_comparisons_total", "Requests scored by both production and candidate models",
+    ["production_version", "candidate_version", "outcome"], cloudwatch_name="CandidateComparisons"
+)
+
+# === Served model (swapped on reload), audit log and SQL writers ===
+class ServedModel:
+    """
+    A scoring backend, its version and its request coalescer. A reload builds a
+    new instance and rebinds `model`; a request reads `model` once and finishes
+    on that instance, so in-flight requests are never cut over mid-call.
+    """
+
+    def __init__(self, backend, version, batcher=None):
+        self.backend = backend
+        self.version = version
+        self.batcher = batcher
+        self.loaded_at = datetime.utcnow().isoformat()
+
+    async def predict(self, row) -> float:
+        if self.batcher is not None:
+            return await self.batcher.submit(row)
+        return float((await run_in_threadpool(self.backend.predict_proba, row[None, :]))[0])
+
+model = None
+candidate = None  # Candidate scored alongside `model` in shadow or canary mode
+shadow = None
+prediction_cache = None  # PredictionCache when PREDICTION_CACHE=true
+registry = ModelRegistry()
+reload_lock = None
+reload_task = None
+reload_stats = {"reloads": 0, "reload_failures": 0, "last_reload_ms": 0.0}
+audit_log = None
+sql_writer = None
+side_effects = None
+drift_monitor = None
+startup_task = None
+# "stopped" -> "starting" -> "warming_up" -> "ready" (or "failed") -> "stopping" -> "stopped"
+lifecycle = {"phase": "stopped", "started_at": None, "ready_at": None, "startup_ms": None, "error": None}
 
 # === FastAPI App ===
 app = FastAPI(title="Healthcare Risk Prediction API (SageMaker)")
+app.add_middleware(TracingMiddleware)  # per-stage timings, Server-Timing header, sampled profiling
 
-# === CloudWatch Logging Setup ===
+# === CloudWatch Logging Setup (handler attached at startup) ===
 LOG_GROUP = "HealthcarePredictionLogs"
 logger = logging.getLogger("healthcare-api")
 logger.setLevel(logging.INFO)
-logger.addHandler(watchtower.CloudWatchLogHandler(log_group=LOG_GROUP))
+log_handler = None
+
+# === Model Loading and Hot Reload ===
+def _warm_up(backend):
+    # Requests carry no rolling vitals aggregates, so the API serves base-feature models only
+    # (encode_row / encode_batch); models trained with them are for the stream consumer
+    warm_up(backend, encode=encode_batch)
+
+def _load_initial_backend():
+    """(backend, version): the registry's production version if there is one, else the configured backend."""
+    if MODEL_BACKEND == "local":
+        try:
+            backend, version = registry.load_backend()
+            _warm_up(backend)
+            return backend, version
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.error("[Startup] Registry production model unusable; trying local artifacts", exc_info=True)
+    backend = load_backend(MODEL_BACKEND, endpoint_name=ENDPOINT_NAME, region=REGION)
+    if backend.name == "local":
+        _warm_up(backend)
+    return backend, backend_version(backend)
+
+def _load_registry_version(version):
+    backend, version = registry.load_backend(version)
+    _warm_up(backend)
+    return backend, version
+
+async def _serve(backend, version, previous=None):
+    batcher = None
+    if MICRO_BATCHING:
+        old = previous.batcher if previous is not None else None
+        batcher = MicroBatcher(
+            backend.predict_proba, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS,
+            batch_sizes=old.batch_sizes if old else None, queue_delay_ms=old.queue_delay_ms if old else None
+        )
+        await batcher.start()
+    return ServedModel(backend, version, batcher)
+
+async def reload_model():
+    """
+    Swap in the registry's production version if it differs from the one
+    serving. The new model is loaded, checksum-verified and warmed up in a
+    worker thread while the old one keeps serving; `model` is then rebound,
+    and the old batcher drains the requests already queued on it.
+    """
+    global model
+    async with reload_lock:
+        target = await run_in_threadpool(registry.production_version)
+        if target is None or target == model.version:
+            return model.version
+        start = time.perf_counter()
+        try:
+            backend, version = await run_in_threadpool(_load_registry_version, target)
+        except Exception:
+            reload_stats["reload_failures"] += 1
+            logger.error(f"[Reload] Could not load model version {target}; still serving {model.version}",
+                         exc_info=True)
+            raise
+        new_model = await _serve(backend, version, previous=model)
+        old_model, model = model, new_model
+        if prediction_cache is not None:
+            prediction_cache.invalidate()
+        reload_stats["reloads"] += 1
+        reload_stats["last_reload_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(f"[Reload] Now serving model version {version} (was {old_model.version})")
+        await _retire(old_model)
+        return version
+
+async def _retire(old_model):
+    # Canary-mode shadow calls may still target the old model; let them finish before its batcher stops
+    await shadow.drain()
+    if old_model.batcher is not None:
+        await old_model.batcher.stop()
+
+async def sync_candidate():
+    """Load, re-route or drop the candidate model to match the registry's `candidate` entry."""
+    global candidate, shadow
+    async with reload_lock:
+        target = await run_in_threadpool(registry.candidate)
+        current = candidate
+        if target is None or target["percent"] <= 0:
+            if current is not None:
+                candidate = None
+                logger.info(f"[Candidate] Stopped scoring candidate {current.model.version}")
+                await _retire(current.model)
+            return None
+        if current is not None and current.model.version == target["version"]:
+            if (current.mode, current.percent) != (target["mode"], target["percent"]):
+                candidate = Candidate(current.model, target["mode"], target["percent"])
+            return target["version"]
+        backend, version = await run_in_threadpool(_load_registry_version, target["version"])
+        candidate = Candidate(await _serve(backend, version), target["mode"], target["percent"])
+        logger.info(f"[Candidate] Scoring candidate {version} ({target['mode']}, {target['percent']}% of traffic)")
+        if current is not None:
+            await _retire(current.model)
+        shadow = ShadowScorer(_record_comparisons_async)  # comparison stats start over for the new candidate
+        return version
+
+async def _poll_registry():
+    while True:
+        await asyncio.sleep(MODEL_RELOAD_INTERVAL_S)
+        for sync in (reload_model, sync_candidate):
+            try:
+                await sync()
+            except Exception:
+                logger.error(f"[Reload] {sync.__name__} failed; retrying on the next poll", exc_info=True)
+
+def model_stats() -> dict:
+    return dict(reload_stats, batching=int(model.batcher is not None), candidate=int(candidate is not None))
+
+# === Shadow / Canary Comparisons ===
+def record_comparisons(records: list, comparisons: list):
+    for data, comparison in zip(records, comparisons):
+        audit_log.log_comparison(data, comparison)
+        background = comparison["production" if comparison["answered_by"] == "candidate" else "candidate"]
+        LATENCY.observe(background["latency_ms"], (background["version"], "shadow"))
+        COMPARISONS.inc((comparison["production"]["version"], comparison["candidate"]["version"],
+                         "agree" if comparison["agree"] else "disagree"))
+
+def _record_comparisons_async(records: list, comparisons: list):
+    side_effects.submit(record_comparisons, records, comparisons)
+
+# === Startup / Shutdown ===
+def _create_aws_clients():
+    """CloudWatch metrics client and log handler. Created here rather than at import, so importing needs no AWS."""
+    global cloudwatch, log_handler
+    if cloudwatch is None:
+        import boto3
+        cloudwatch = boto3.client("cloudwatch", region_name=REGION)
+    if CLOUDWATCH_LOGS and log_handler is None:
+        try:
+            import watchtower
+            log_handler = watchtower.CloudWatchLogHandler(log_group=LOG_GROUP)
+            logger.addHandler(log_handler)
+        except Exception:
+            logger.error("[Startup] CloudWatch Logs unavailable; logging locally only", exc_info=True)
+
+def _start_sql_writer():
+    from src.post_prediction.store_to_sql import PredictionWriter, init_db  # SQLAlchemy is only needed from here on
+    try:
+        init_db()
+        create_table = False
+    except Exception:
+        logger.error("[Startup] Could not create `predictions_log`; the SQL writer creates it before its next "
+                     "insert. Failed batches are retried, then dropped and counted", exc_info=True)
+        create_table = True
+    return PredictionWriter(create_table=create_table).start()
+
+async def _start_services():
+    """
+    Create clients and writers, then load, verify and warm up the model. Runs
+    after the app accepts connections when WARM_UP_IN_BACKGROUND is set, so
+    liveness answers at once and readiness flips once this completes.
+    """
+    global model, shadow, prediction_cache, reload_task, audit_log, sql_writer, side_effects, \
+        metrics_publisher, drift_monitor
+    start = time.perf_counter()
+    lifecycle["phase"] = "warming_up"
+    try:
+        await run_in_threadpool(_create_aws_clients)
+        metrics_publisher = CloudWatchPublisher(
+            REGISTRY, cloudwatch, METRICS_NAMESPACE, interval_s=METRICS_FLUSH_INTERVAL_S
+        ).start()
+        side_effects = SideEffectExecutor(max_workers=SIDE_EFFECT_WORKERS, max_pending=SIDE_EFFECT_MAX_PENDING)
+        sink = FileSink(AUDIT_LOG_DIR) if AUDIT_LOG_DIR else S3Sink(S3_BUCKET)
+        audit_log = AuditLogShipper(sink, prefix=LOG_PREFIX).start()
+        sql_writer = await run_in_threadpool(_start_sql_writer)
+        drift_monitor = DriftMonitor.from_reference_file()
+        if drift_monitor is None:
+            logger.info("[Startup] No drift reference profile; drift monitoring disabled")
+        else:
+            drift_monitor.start()
+            REGISTRY.register_gauges("drift", drift_monitor.stats)
+        backend, version = await run_in_threadpool(_load_initial_backend)
+        model = await _serve(backend, version)
+        logger.info(f"[Startup] Scoring backend: {backend.label}, model version {version}")
+        if model.batcher is not None:
+            REGISTRY.register(model.batcher.batch_sizes)
+            REGISTRY.register(model.batcher.queue_delay_ms)
+        shadow = ShadowScorer(_record_comparisons_async)
+        if backend.name == "local":
+            try:
+                await sync_candidate()
+            except Exception:
+                logger.error("[Startup] Could not load the candidate model; serving production only", exc_info=True)
+            if MODEL_RELOAD_INTERVAL_S > 0:
+                reload_task = asyncio.ensure_future(_poll_registry())
+        REGISTRY.register_gauges("model", model_stats)
+        if PREDICTION_CACHE:
+            prediction_cache = PredictionCache()
+            REGISTRY.register_gauges("prediction_cache", prediction_cache.stats)
+        REGISTRY.register_gauges("candidate", lambda: shadow.stats())
+        REGISTRY.register_gauges("side_effects", side_effects.stats)
+        REGISTRY.register_gauges("audit_log", audit_log.stats)
+        REGISTRY.register_gauges("sql_writer", sql_writer.stats)
+    except Exception as e:
+        lifecycle.update(phase="failed", error=f"{type(e).__name__}: {e}")
+        logger.error("[Startup] Could not start serving", exc_info=True)
+        return
+    lifecycle.update(phase="ready", ready_at=datetime.utcnow().isoformat(),
+                     startup_ms=round((time.perf_counter() - start) * 1000, 1))
+    logger.info(f"[Startup] Ready in {lifecycle['startup_ms']} ms")
+
+@app.on_event("startup")
+async def load_model_backend():
+    global reload_lock, startup_task
+    lifecycle.update(phase="starting", started_at=datetime.utcnow().isoformat(), ready_at=None, startup_ms=None,
+                     error=None)
+    reload_lock = asyncio.Lock()
+    startup_task = asyncio.ensure_future(_start_services())
+    if not WARM_UP_IN_BACKGROUND:
+        await startup_task
+        if lifecycle["phase"] == "failed":
+            raise RuntimeError(f"Startup failed: {lifecycle['error']}")
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    global model, candidate, log_handler
+    lifecycle["phase"] = "stopping"
+    if startup_task is not None and not startup_task.done():
+        startup_task.cancel()
+        await asyncio.gather(startup_task, return_exceptions=True)
+    if reload_task is not None:
+        reload_task.cancel()
+    if shadow is not None:
+        await shadow.drain()
+    for served in (model, candidate.model if candidate is not None else None):
+        if served is not None and served.batcher is not None:
+            await served.batcher.stop()
+    model = candidate = None
+    if side_effects is not None:
+        await run_in_threadpool(side_effects.shutdown)
+    if audit_log is not None:
+        await run_in_threadpool(audit_log.close)
+    if sql_writer is not None:
+        await run_in_threadpool(sql_writer.close)
+    if drift_monitor is not None:
+        await run_in_threadpool(drift_monitor.close)
+    if metrics_publisher is not None:
+        await run_in_threadpool(metrics_publisher.stop)
+    profiler.stop()
+    if log_handler is not None:
+        logger.removeHandler(log_handler)
+        await run_in_threadpool(log_handler.close)
+        log_handler = None
+    lifecycle["phase"] = "stopped"
+
+def _require_ready():
+    if lifecycle["phase"] != "ready":
+        raise HTTPException(status_code=503, detail=f"Service is {lifecycle['phase']}", headers={"Retry-After": "1"})
+
+def _require_debug(request: Request):
+    """The /debug routes expose and change profiling at runtime, so they are opt-in and token-checked."""
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if DEBUG_TOKEN and not hmac.compare_digest(request.headers.get("x-debug-token", ""), DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Missing or invalid X-Debug-Token")
+    _require_ready()
+
+# === Health Probes ===
+@app.get("/health/live")
+async def liveness():
+    """The process is up and its event loop responsive. Fails only once startup has failed for good."""
+    if lifecycle["phase"] == "failed":
+        return JSONResponse(status_code=503, content={"status": "failed", "error": lifecycle["error"]})
+    return {"status": "alive", "phase": lifecycle["phase"]}
+
+@app.get("/health/ready")
+async def readiness():
+    """200 once the model is loaded, verified and warmed up; 503 while starting, after a failed start and on shutdown."""
+    body = dict(lifecycle, model_version=model.version if model is not None else None)
+    if lifecycle["phase"] != "ready":
+        return JSONResponse(status_code=503, content=body)
+    return body
 
 # === Input Schema ===
 class PatientInput(BaseModel):
@@ -40,103 +398,380 @@ class PatientInput(BaseModel):
     oxygen_saturation: float
     temperature: float
 
-# === Preprocess Input ===
-def preprocess(data: PatientInput):
-    df = pd.DataFrame([data.dict()])
-    df = pd.get_dummies(df, columns=["gender", "blood_pressure"], drop_first=True)
-
-    for col in ["gender_male", "blood_pressure_normal"]:
-        if col not in df.columns:
-            df[col] = 0
-
-    return df[[
-        "age", "heart_rate", "cholesterol", "blood_sugar",
-        "oxygen_saturation", "temperature", "gender_male", "blood_pressure_normal"
-    ]]
-
-# === Log to S3 ===
-def log_to_s3(data: dict, result: dict):
-    s3 = boto3.client("s3")
-    timestamp = datetime.utcnow().strftime("%Y-%m-%d-%H-%M-%S")
-    log_id = f"{data['patient_id']}_{timestamp}_{uuid.uuid4().hex[:6]}"
-    s3.put_object(Bucket=S3_BUCKET, Key=f"{LOG_PREFIX}inputs/{log_id}.json", Body=json.dumps(data))
-    s3.put_object(Bucket=S3_BUCKET, Key=f"{LOG_PREFIX}outputs/{log_id}.json", Body=json.dumps(result))
-    logger.info(f" Input/output logged to S3 for {data['patient_id']}")
+class TracingSettings(BaseModel):
+    server_timing: Optional[bool] = None
+    profile_sample_rate: Optional[float] = None
+    reset_profile: bool = False
+
+# === Side Effects (run off the event loop) ===
+def record_prediction(data_dict: dict, result: dict):
+    with span("side_effects", "audit_log"):
+        audit_log.log_prediction(data_dict, result)
+    with span("side_effects", "sql"):
+        sql_writer.add(data_dict, result)
+    if drift_monitor is not None:
+        with span("side_effects", "drift"):
+            drift_monitor.observe(data_dict, result)
+    with span("side_effects", "log"):
+        logger.info(
+            f"[Prediction Result] ID: {data_dict['patient_id']} "
+            f"y={result['readmitted_prediction']} prob={result['readmitted_probability']:.4f}"
+        )
 
 # === Prediction Endpoint ===
 @app.post("/predict")
 async def predict(input: PatientInput):
+    _require_ready()
+    trace = current_trace.get()
+    if trace is not None:
+        trace.mark("validate")  # body read, JSON decoding and pydantic validation, before this handler ran
     data_dict = input.dict()
     logger.info(f"[Request Received] Patient ID: {data_dict['patient_id']}")
 
+    start_time = time.perf_counter()
+    # This request stays on these models even if a reload swaps `model` or `candidate` meanwhile
+    served, role, background = model, "production", None
+    current_candidate = candidate
+    if current_candidate is not None:
+        served, role, background = current_candidate.route(model, data_dict["patient_id"])
     try:
-        X = preprocess(input)
-        csv_payload = X.to_csv(index=False, header=False)
+        with request_span("encode"):
+            row = encode_row(data_dict)
 
-        start_time = datetime.utcnow()
+        # Repeated feature vectors are answered from the cache; otherwise score in-process or via
+        # the SageMaker endpoint, coalesced with concurrent requests
+        y_proba = None
+        if prediction_cache is not None:
+            with request_span("cache"):
+                y_proba = prediction_cache.get(served.version, row)
+        if y_proba is None:
+            with request_span("model"):  # includes the micro-batcher's queueing delay
+                y_proba = await served.predict(row)
+            if prediction_cache is not None:
+                prediction_cache.put(served.version, row, y_proba)
 
-        # Call SageMaker Endpoint
-        response = sm_runtime.invoke_endpoint(
-            EndpointName=ENDPOINT_NAME,
-            ContentType="text/csv",
-            Body=csv_payload
-        )
+        latency = (time.perf_counter() - start_time) * 1000  # ms
 
-        result_payload = response["Body"].read().decode("utf-8")
-        y_proba = float(result_payload.strip())
-        y_pred = int(y_proba > 0.5)
+        # Shadow / canary: the other model scores this row in the background and the pair is audit-logged
+        if background is not None:
+            shadow.submit(background, row, data_dict, model_output(served.version, y_proba, latency), role,
+                          current_candidate.mode)
 
-        latency = (datetime.utcnow() - start_time).total_seconds() * 1000  # ms
-
-        # Prepare result
-        result = {
-            "readmitted_prediction": y_pred,
-            "readmitted_probability": round(y_proba, 4),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-
-        # Logging
-        log_to_s3(data_dict, result)
-        store_prediction_to_sql(data_dict, result)
-        logger.info(f"[Prediction Result] ID: {data_dict['patient_id']} y={y_pred} prob={y_proba:.4f}")
-
-        # CloudWatch Custom Metrics
-        cloudwatch.put_metric_data(
-            Namespace="HealthcarePrediction",
-            MetricData=[
-                {
-                    'MetricName': 'SuccessfulPredictions',
-                    'Dimensions': [{'Name': 'ModelVersion', 'Value': 'xgboost-v1'}],
-                    'Unit': 'Count',
-                    'Value': 1
-                },
-                {
-                    'MetricName': 'PredictionLatencyMs',
-                    'Dimensions': [{'Name': 'ModelVersion', 'Value': 'xgboost-v1'}],
-                    'Unit': 'Milliseconds',
-                    'Value': latency
-                }
-            ]
-        )
+        # Metrics are aggregated in-process; audit log and SQL row are recorded after the response
+        with request_span("metrics"):
+            PREDICTIONS.inc((served.version,))
+            LATENCY.observe(latency, (served.version, "success"))
+        result = make_result(y_proba)
+        result["model_version"] = served.version
+        with request_span("side_effects"):
+            side_effects.submit(record_prediction, data_dict, result)
 
         return {
             "patient_id": data_dict["patient_id"],
-            "prediction": y_pred,
-            "probability": round(y_proba, 4),
-            "message": " Prediction complete (via SageMaker)"
+            "prediction": result["readmitted_prediction"],
+            "probability": result["readmitted_probability"],
+            "model_version": served.version,
+            "message": f" Prediction complete (via {served.backend.label})"
         }
 
     except Exception as e:
         logger.error(f"[ERROR] Prediction failed for {data_dict['patient_id']}", exc_info=True)
-        cloudwatch.put_metric_data(
-            Namespace="HealthcarePrediction",
-            MetricData=[{
-                'MetricName': 'PredictionFailures',
-                'Unit': 'Count',
-                'Value': 1
-            }]
-        )
+        FAILURES.inc((served.version,))
+        LATENCY.observe((time.perf_counter() - start_time) * 1000, (served.version, "failure"))
         return {
             "error": "Prediction failed",
             "details": str(e)
         }
+
+# === Metrics ===
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of the in-process registry."""
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/model")
+async def model_info():
+    """Version being served, where it came from, and reload counters."""
+    _require_ready()
+    return dict(
+        reload_stats,
+        version=model.version,
+        backend=model.backend.name,
+        source=getattr(model.backend, "source", None),
+        loaded_at=model.loaded_at,
+        registry_production=await run_in_threadpool(registry.production_version),
+    )
+
+@app.post("/model/reload")
+async def trigger_reload():
+    """Check the registry now instead of waiting for the next poll."""
+    _require_ready()
+    if model.backend.name != "local":
+        raise HTTPException(status_code=409, detail="Hot reload needs the local model backend")
+    previous = model.version
+    try:
+        version = await reload_model()
+        candidate_version = await sync_candidate()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+    return {"version": version, "previous_version": previous, "reloaded": version != previous,
+            "candidate_version": candidate_version}
+
+@app.get("/stats/candidate")
+async def candidate_stats():
+    """Agreement and mean |Δprobability| between production and the candidate on sampled traffic."""
+    _require_ready()
+    if candidate is None:
+        return {"enabled": False}
+    return dict(shadow.stats(), enabled=True, version=candidate.model.version, mode=candidate.mode,
+                percent=candidate.percent, production_version=model.version)
+
+@app.get("/stats/batcher")
+async def batcher_stats():
+    _require_ready()
+    if model.batcher is None:
+        return {"enabled": False}
+    return dict(model.batcher.stats(), enabled=True)
+
+@app.get("/stats/audit-log")
+async def audit_log_stats():
+    _require_ready()
+    return audit_log.stats()
+
+@app.get("/stats/sql-writer")
+async def sql_writer_stats():
+    _require_ready()
+    return sql_writer.stats()
+
+@app.get("/stats/side-effects")
+async def side_effect_stats():
+    _require_ready()
+    return side_effects.stats()
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """Prediction cache hit ratio, size and estimated memory use."""
+    _require_ready()
+    if prediction_cache is None:
+        return {"enabled": False}
+    return dict(prediction_cache.stats(), enabled=True)
+
+@app.get("/stats/stages")
+async def stage_stats():
+    """
+    Per-stage latency of every instrumented path (count, mean, bucket-bound p50/p95/p99 in ms):
+    /predict, /predict/batch, side effects, the batcher's model call and the background writers.
+    """
+    _require_ready()
+    return stage_breakdown()
+
+def _tracing_state():
+    return {"server_timing": tracing.SERVER_TIMING, "profiler": profiler.stats()}
+
+@app.get("/debug/tracing")
+async def tracing_settings(request: Request):
+    _require_debug(request)
+    return _tracing_state()
+
+@app.post("/debug/tracing")
+async def update_tracing(settings: TracingSettings, request: Request):
+    """Switch Server-Timing headers and the sampling profiler at runtime (e.g. profile_sample_rate=0.01)."""
+    _require_debug(request)
+    if settings.profile_sample_rate is not None:
+        try:
+            profiler.set_rate(settings.profile_sample_rate)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if settings.server_timing is not None:
+        tracing.SERVER_TIMING = settings.server_timing
+    if settings.reset_profile:
+        profiler.reset()
+    return _tracing_state()
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def profile(request: Request, top: int = 200):
+    """Collapsed stacks from the sampling profiler ("frame;frame;... count"), ready for flamegraph.pl."""
+    _require_debug(request)
+    return PlainTextResponse(profiler.collapsed(top))
+
+@app.get("/stats/drift")
+async def drift_stats():
+    """Per-feature PSI / KS of predictions served so far against the training reference profile."""
+    _require_ready()
+    if drift_monitor is None:
+        return {"enabled": False}
+    return dict(drift_monitor.report(), enabled=True)
+
+# === Batch Prediction Endpoint ===
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that may keep reading the request body while it responds.
+    The stock class listens for disconnects on `receive` concurrently (ASGI spec < 2.4),
+    which swallows body chunks; disconnects still surface through request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def _iter_json_list(records):
+    for line_no, record in enumerate(records, start=1):
+        yield line_no, record
+
+class _LineTooLarge(ValueError):
+    def __init__(self, line_no, limit):
+        super().__init__(f"NDJSON line {line_no} exceeds {limit} bytes")
+        self.line_no = line_no
+
+async def _iter_ndjson(chunks, max_line_bytes=BATCH_JSON_MAX_BYTES):
+    """(line number, line) per non-empty line; each chunk is searched for newlines once, and lines are capped."""
+    buffer = bytearray()
+    line_no = 0
+    async for chunk in chunks:
+        start, search_from = 0, len(buffer)  # only the new tail can hold a newline
+        buffer += chunk
+        newline = buffer.find(b"\n", search_from)
+        while newline != -1:
+            line_no += 1
+            if newline - start > max_line_bytes:
+                raise _LineTooLarge(line_no, max_line_bytes)
+            line = bytes(buffer[start:newline])
+            if line.strip():
+                yield line_no, line
+            start = newline + 1
+            newline = buffer.find(b"\n", start)
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise _LineTooLarge(line_no + 1, max_line_bytes)
+    if buffer.strip():
+        yield line_no + 1, bytes(buffer)
+
+async def _prime_ndjson(items):
+    """Read the first line before the response starts, so an oversized one is still answered with a 413."""
+    try:
+        first = await items.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except _LineTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    async def chained():
+        if first is not None:
+            yield first
+        async for item in items:
+            yield item
+    return chained()
+
+def record_batch(records: list, results: list):
+    with span("side_effects", "audit_log"):
+        for data, result in zip(records, results):
+            audit_log.log_prediction(data, result)
+    with span("side_effects", "sql"):
+        sql_writer.add_many(records, results)
+    if drift_monitor is not None:
+        with span("side_effects", "drift"):
+            drift_monitor.observe_many(records, results)
+
+def _shadow_chunk(current_candidate, served, records, results, latency_ms):
+    """Batch traffic is always answered by production; sampled rows are shadow-scored by the candidate."""
+    sampled = [i for i, d in enumerate(records) if in_sample(d["patient_id"], current_candidate.percent)]
+    if sampled:
+        shadow.submit_many(
+            current_candidate.model, [records[i] for i in sampled],
+            [model_output(served.version, results[i]["readmitted_probability"], latency_ms) for i in sampled],
+            "production", "shadow"
+        )
+
+async def _score_chunk(records: list) -> str:
+    served = model
+    current_candidate = candidate
+    try:
+        start = time.perf_counter()
+        backend = served.backend
+        if prediction_cache is not None:
+            backend = CachedBackend(backend, prediction_cache, served.version)
+        with request_span("score"):
+            results = await run_in_threadpool(score_records, backend, records)
+        latency_ms = (time.perf_counter() - start) * 1000
+        for result in results:
+            result["model_version"] = served.version
+        PREDICTIONS.inc((served.version,), len(records))
+        side_effects.submit(record_batch, records, results)
+        if current_candidate is not None:
+            _shadow_chunk(current_candidate, served, records, results, latency_ms)
+    except Exception as e:
+        FAILURES.inc((served.version,), len(records))
+        logger.error(f"[ERROR] Batch prediction failed for {len(records)} records", exc_info=True)
+        return "".join(
+            json.dumps({"patient_id": d["patient_id"], "error": "Prediction failed", "details": str(e)}) + "\n"
+            for d in records
+        )
+    return "".join(
+        json.dumps({
+            "patient_id": d["patient_id"],
+            "prediction": r["readmitted_prediction"],
+            "probability": r["readmitted_probability"],
+            "model_version": r["model_version"]
+        }) + "\n"
+        for d, r in zip(records, results)
+    )
+
+async def _stream_batch_results(items):
+    chunk = []
+    too_large = None
+    try:
+        async for line_no, item in items:
+            try:
+                raw = json.loads(item) if isinstance(item, (bytes, str)) else item
+                chunk.append(PatientInput(**raw).dict())
+            except Exception as e:
+                yield json.dumps({"line": line_no, "error": "Invalid record", "details": str(e)}) + "\n"
+                continue
+            if len(chunk) >= BATCH_CHUNK_SIZE:
+                yield await _score_chunk(chunk)
+                chunk = []
+    except _LineTooLarge as e:
+        too_large = e  # the response has started: report it in-stream and stop reading the upload
+    if chunk:
+        yield await _score_chunk(chunk)
+    if too_large is not None:
+        yield json.dumps({"line": too_large.line_no, "error": "Line too large", "status": 413,
+                          "details": str(too_large)}) + "\n"
+
+async def _read_json_batch(request: Request):
+    """Buffer a JSON batch body, counting bytes as they arrive, since chunked uploads carry no Content-Length."""
+    too_large = HTTPException(status_code=413, detail="JSON batch too large; send application/x-ndjson instead")
+    if int(request.headers.get("content-length") or 0) > BATCH_JSON_MAX_BYTES:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > BATCH_JSON_MAX_BYTES:
+            raise too_large
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed JSON batch")
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """
+    Score many patients in one call. Accepts a JSON list of PatientInput records or an
+    NDJSON stream (Content-Type: application/x-ndjson) and streams NDJSON results back
+    as each BATCH_CHUNK_SIZE chunk is scored; invalid lines are reported immediately with
+    their line number. NDJSON uploads are read incrementally, so memory stays bounded
+    regardless of upload size.
+    """
+    _require_ready()
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        records = await _read_json_batch(request)
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON list of patient records")
+        items = _iter_json_list(records)
+    else:
+        items = await _prime_ndjson(_iter_ndjson(request.stream()))
+
+    logger.info(f"[Batch Request Received] Content-Type: {content_type or 'unspecified'}")
+    return DuplexStreamingResponse(_stream_batch_results(items), media_type="application/x-ndjson")
@@ -0,0 +1,232 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+from datetime import datetime
+
+from src.features.schema import N_EXTENDED_FEATURES, encode_batch, encode_batch_extended
+from src.inference.model_backend import LocalXGBoostBackend, _booster_from_bytes
+
+logger = logging.getLogger("healthcare-api")
+
+# === CONFIG ===
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "models/registry/")
+INDEX_FILE = "index.json"
+ARTIFACT_FILE = "model.ubj"
+WARMUP_ROWS = 16
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# === Registry ===
+class ModelRegistry:
+    """
+    Directory of immutable model versions, `<root>/<version>/model.ubj` plus
+    `metadata.json`, indexed by `<root>/index.json`. The index records every
+    version's sha256, size and metadata, a `production` pointer that the API
+    follows, and an optional `candidate` (version, shadow/canary mode, traffic
+    percentage) that the API scores alongside production. The index is
+    replaced atomically (write to a temp file, then os.replace), so a reader
+    never sees a half-written one. Expect one writer at a time, e.g. the
+    retraining job or the CLI.
+    """
+
+    def __init__(self, root_dir=MODEL_REGISTRY_DIR):
+        self.root_dir = root_dir
+        self.index_path = os.path.join(root_dir, INDEX_FILE)
+
+    # --- index ---
+    def load_index(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"production": None, "candidate": None, "versions": {}}
+
+    def _save_index(self, index):
+        os.makedirs(self.root_dir, exist_ok=True)
+        index["updated_at"] = datetime.utcnow().isoformat()
+        with open(self.index_path + ".tmp", "w") as f:
+            json.dump(index, f, indent=2, default=str)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def list_versions(self) -> list:
+        index = self.load_index()
+        return [dict(entry, production=version == index["production"])
+                for version, entry in sorted(index["versions"].items())]
+
+    def get(self, version) -> dict:
+        entry = self.load_index()["versions"].get(version)
+        if entry is None:
+            raise KeyError(f"Unknown model version {version!r}")
+        return entry
+
+    def production_version(self):
+        return self.load_index()["production"]
+
+    def candidate(self):
+        """{"version", "mode", "percent"} of the model under evaluation, or None."""
+        return self.load_index().get("candidate")
+
+    # --- writes ---
+    def register(self, artifact_path, metadata=None, version=None, promote=False) -> dict:
+        """
+        Copy `artifact_path` into the registry as a new version. Registering the
+        same bytes under an existing version is a no-op; different bytes raise
+        ValueError, because versions are immutable.
+        """
+        metadata = dict(metadata or {})
+        version = version or metadata.get("version") or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        checksum = _sha256(artifact_path)
+        index = self.load_index()
+        existing = index["versions"].get(version)
+        if existing is not None and existing["sha256"] != checksum:
+            raise ValueError(f"Model version {version!r} is already registered with different contents")
+        if existing is None:
+            version_dir = os.path.join(self.root_dir, version)
+            os.makedirs(version_dir, exist_ok=True)
+            target = os.path.join(version_dir, ARTIFACT_FILE)
+            shutil.copyfile(artifact_path, target + ".tmp")
+            os.replace(target + ".tmp", target)
+            with open(os.path.join(version_dir, "metadata.json"), "w") as f:
+                json.dump(metadata, f, indent=2, default=str)
+            index["versions"][version] = {
+                "version": version,
+                "artifact": target,
+                "sha256": checksum,
+                "bytes": os.path.getsize(target),
+                "registered_at": datetime.utcnow().isoformat(),
+                "source": artifact_path,
+                "metadata": metadata,
+            }
+        if promote:
+            index["production"] = version
+        self._save_index(index)
+        print(f" Registered model version {version}" + (" (production)" if promote else ""))
+        return index["versions"][version]
+
+    def promote(self, version):
+        index = self.load_index()
+        if version not in index["versions"]:
+            raise KeyError(f"Unknown model version {version!r}")
+        index["production"] = version
+        if (index.get("candidate") or {}).get("version") == version:
+            index["candidate"] = None  # evaluation over
+        self._save_index(index)
+        print(f" Model version {version} promoted to production")
+
+    def set_candidate(self, version, mode="shadow", percent=100.0):
+        index = self.load_index()
+        if version not in index["versions"]:
+            raise KeyError(f"Unknown model version {version!r}")
+        if mode not in ("shadow", "canary") or not 0 <= percent <= 100:
+            raise ValueError("Candidate mode must be 'shadow' or 'canary' with percent in [0, 100]")
+        index["candidate"] = {"version": version, "mode": mode, "percent": float(percent)}
+        self._save_index(index)
+        print(f" Model version {version} is the candidate ({mode}, {percent}% of traffic)")
+
+    def clear_candidate(self):
+        index = self.load_index()
+        index["candidate"] = None
+        self._save_index(index)
+        print(" Candidate cleared")
+
+    # --- reads ---
+    def load(self, version=None):
+        """(booster, entry) for `version` (default: production), after checking the artifact's sha256."""
+        version = version or self.production_version()
+        if version is None:
+            raise FileNotFoundError(f"No production model in registry {self.root_dir}")
+        entry = self.get(version)
+        with open(entry["artifact"], "rb") as f:
+            raw = f.read()
+        if hashlib.sha256(raw).hexdigest() != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for model version {version} ({entry['artifact']})")
+        return _booster_from_bytes(raw), entry
+
+    def load_backend(self, version=None):
+        booster, entry = self.load(version)
+        return LocalXGBoostBackend(booster, source=entry["artifact"]), entry["version"]
+
+
+# === Warm-up ===
+def warmup_records(n=WARMUP_ROWS, seed=0):
+    """Synthetic PatientInput dicts spanning the input ranges, used to exercise a model before serving it."""
+    rng = random.Random(seed)
+    return [{
+        "patient_id": f"WARMUP{i}",
+        "age": rng.randint(18, 95),
+        "gender": rng.choice(["male", "female"]),
+        "blood_pressure": rng.choice(["normal", "high", "low"]),
+        "heart_rate": rng.randint(60, 130),
+        "cholesterol": rng.uniform(150, 300),
+        "blood_sugar": rng.uniform(70, 200),
+        "oxygen_saturation": rng.uniform(90, 100),
+        "temperature": rng.uniform(36.0, 39.0),
+    } for i in range(n)]
+
+
+def warm_up(backend, n=WARMUP_ROWS, encode=None):
+    """
+    Score synthetic rows (single row, then a batch) and check the output; raises
+    if the model is unusable. `encode` is the encoder the caller serves with
+    (default: base or extended, from the model's feature count); a model that
+    expects a different number of features than it builds is rejected.
+    """
+    n_features = getattr(backend, "n_features", None)
+    if encode is None:
+        encode = encode_batch_extended if n_features == N_EXTENDED_FEATURES else encode_batch
+    X = encode(warmup_records(n))
+    if n_features is not None and n_features != X.shape[1]:
+        raise ValueError(f"Model expects {n_features} features; the serving encoder builds {X.shape[1]}")
+    backend.predict_proba(X[:1])
+    proba = backend.predict_proba(X)
+    if len(proba) != n or not all(0.0 <= p <= 1.0 for p in proba):
+        raise ValueError(f"Warm-up produced invalid scores: {list(proba)[:5]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local model registry.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    register = sub.add_parser("register")
+    register.add_argument("artifact")
+    register.add_argument("--version")
+    register.add_argument("--promote", action="store_true")
+    promote = sub.add_parser("promote")
+    promote.add_argument("version")
+    candidate = sub.add_parser("candidate")
+    candidate.add_argument("version")
+    candidate.add_argument("--mode", choices=["shadow", "canary"], default="shadow")
+    candidate.add_argument("--percent", type=float, default=100.0)
+    sub.add_parser("clear-candidate")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    if args.command == "list":
+        current = registry.candidate() or {}
+        for entry in registry.list_versions():
+            marker = "*" if entry["production"] else "~" if entry["version"] == current.get("version") else " "
+            print(f"{marker} {entry['version']}  {entry['sha256'][:12]}  {entry['bytes']} B  {entry['registered_at']}")
+    elif args.command == "register":
+        meta_path = args.artifact.rsplit(".", 1)[0] + ".meta.json"
+        metadata = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                metadata = json.load(f)
+        registry.register(args.artifact, metadata, version=args.version, promote=args.promote)
+    elif args.command == "promote":
+        registry.promote(args.version)
+    elif args.command == "candidate":
+        registry.set_candidate(args.version, args.mode, args.percent)
+    else:
+        registry.clear_candidate()
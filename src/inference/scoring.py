@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from src.features.schema import N_EXTENDED_FEATURES, encode_batch, encode_batch_extended
+from src.inference.tracing import span
+
+# === CONFIG ===
+DECISION_THRESHOLD = 0.5
+
+
+# === Result Formatting ===
+def make_result(y_proba: float, timestamp: str = None) -> dict:
+    """Prediction record in the shape stored to S3 and `predictions_log`."""
+    return {
+        "readmitted_prediction": int(y_proba > DECISION_THRESHOLD),
+        "readmitted_probability": round(float(y_proba), 4),
+        "timestamp": timestamp or datetime.utcnow().isoformat()
+    }
+
+
+# === Batch Scoring ===
+def uses_rolling_features(backend) -> bool:
+    """True for models trained with the rolling vitals aggregates (EXTENDED_FEATURE_COLUMNS)."""
+    return getattr(backend, "n_features", None) == N_EXTENDED_FEATURES
+
+
+def score_records(backend, records, out=None, path="batch", features=None):
+    """
+    Encode a list of PatientInput dicts and score them with a single backend call.
+    Models trained with the rolling vitals aggregates also get those columns,
+    from `features` (one mapping per record) when given. Encoding and the
+    model call are timed as stages of `path`.
+    """
+    with span(path, "encode"):
+        if uses_rolling_features(backend):
+            X = encode_batch_extended(records, out, features)
+        else:
+            X = encode_batch(records, out)
+    with span(path, "model"):
+        proba = backend.predict_proba(X)
+    timestamp = datetime.utcnow().isoformat()
+    return [make_result(p, timestamp) for p in proba]
+
+
+class BatchScorer:
+    """
+    In-process scoring for callers outside the API (e.g. the Kinesis consumer):
+    scores a page of PatientInput dicts with one backend call and records each
+    prediction to the audit log, SQL writer and drift monitor, as the /predict
+    endpoint does.
+    """
+
+    def __init__(self, backend, audit_log=None, sql_writer=None, drift_monitor=None):
+        self.backend = backend
+        self.audit_log = audit_log
+        self.sql_writer = sql_writer
+        self.drift_monitor = drift_monitor
+
+    @property
+    def uses_rolling_features(self) -> bool:
+        return uses_rolling_features(self.backend)
+
+    def score(self, records, features=None):
+        """`features`: rolling aggregates per record for extended models; kept out of the audit log and SQL rows."""
+        if not records:
+            return []
+        results = score_records(self.backend, records, path="stream", features=features)
+        if self.audit_log is not None:
+            with span("stream", "audit_log"):
+                for data, result in zip(records, results):
+                    self.audit_log.log_prediction(data, result)
+        if self.sql_writer is not None:
+            with span("stream", "sql"):
+                self.sql_writer.add_many(records, results)
+        if self.drift_monitor is not None:
+            with span("stream", "drift"):
+                self.drift_monitor.observe_many(records, results)
+        return results
+
+    def close(self):
+        if self.audit_log is not None:
+            self.audit_log.close()
+        if self.sql_writer is not None:
+            self.sql_writer.close()
+        if self.drift_monitor is not None:
+            self.drift_monitor.close()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import time
+import zlib
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.inference.scoring import DECISION_THRESHOLD, score_records
+
+logger = logging.getLogger("healthcare-api")
+
+# === CONFIG ===
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "256"))  # background model calls in flight; more are shed
+CANDIDATE_MODES = ("shadow", "canary")
+
+
+def in_sample(patient_id, percent) -> bool:
+    """Sticky sampling: for a given percentage a patient is always in, or always out of, the candidate slice."""
+    return zlib.crc32(str(patient_id).encode("utf-8")) % 10000 < percent * 100
+
+
+class Candidate:
+    """
+    A candidate model and how it takes traffic. In "shadow" mode it scores the
+    sampled `percent` of requests in the background and never answers. In
+    "canary" mode it answers the sampled requests, and production scores them
+    in the background. Either way each sampled request yields a paired
+    comparison.
+    """
+
+    def __init__(self, model, mode="shadow", percent=100.0):
+        if mode not in CANDIDATE_MODES:
+            raise ValueError(f"Unsupported candidate mode {mode!r}. Use 'shadow' or 'canary'.")
+        self.model = model
+        self.mode = mode
+        self.percent = float(percent)
+
+    def route(self, production, patient_id):
+        """(answering model, its role, model to score in the background or None) for one request."""
+        if not in_sample(patient_id, self.percent):
+            return production, "production", None
+        if self.mode == "canary":
+            return self.model, "candidate", production
+        return production, "production", self.model
+
+
+def model_output(version, probability, latency_ms):
+    return {
+        "version": version,
+        "probability": round(float(probability), 4),
+        "prediction": int(probability > DECISION_THRESHOLD),
+        "latency_ms": round(latency_ms, 3),
+    }
+
+
+class ShadowScorer:
+    """
+    Scores requests with the non-answering model off the request path and hands
+    paired outputs to `record_fn(records, comparisons)`. At most `max_pending`
+    background calls run at once; requests beyond that are shed (counted) rather
+    than queued, so shadow traffic cannot build up behind a slow candidate.
+    """
+
+    def __init__(self, record_fn, max_pending=SHADOW_MAX_PENDING):
+        self.record_fn = record_fn
+        self.max_pending = max_pending
+        self._pending = set()
+        self.scored = 0
+        self.shed = 0
+        self.failed = 0
+        self.disagreements = 0
+        self.abs_diff_sum = 0.0
+
+    def _spawn(self, coro) -> bool:
+        if len(self._pending) >= self.max_pending:
+            coro.close()
+            self.shed += 1
+            return False
+        task = asyncio.ensure_future(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return True
+
+    def submit(self, model, row, data, answered, answered_role, mode) -> bool:
+        """Background-score one request; `answered` is the answering side's model_output()."""
+        return self._spawn(self._score_one(model, row, data, answered, answered_role, mode))
+
+    def submit_many(self, model, records, answered_sides, answered_role, mode) -> bool:
+        return self._spawn(self._score_many(model, records, answered_sides, answered_role, mode))
+
+    async def _score_one(self, model, row, data, answered, answered_role, mode):
+        start = time.perf_counter()
+        try:
+            probability = await model.predict(row)
+        except Exception:
+            self.failed += 1
+            logger.error(f"[Shadow] Model {model.version} failed for {data.get('patient_id')}", exc_info=True)
+            return
+        other = model_output(model.version, probability, (time.perf_counter() - start) * 1000)
+        self._record([data], [answered], [other], answered_role, mode)
+
+    async def _score_many(self, model, records, answered_sides, answered_role, mode):
+        start = time.perf_counter()
+        try:
+            # score_records picks the base or extended encoding from the candidate's feature count
+            results = await run_in_threadpool(score_records, model.backend, records, path="shadow")
+        except Exception:
+            self.failed += len(records)
+            logger.error(f"[Shadow] Model {model.version} failed for a batch of {len(records)}", exc_info=True)
+            return
+        latency_ms = (time.perf_counter() - start) * 1000
+        others = [model_output(model.version, r["readmitted_probability"], latency_ms) for r in results]
+        self._record(records, answered_sides, others, answered_role, mode)
+
+    def _record(self, records, answered_sides, others, answered_role, mode):
+        comparisons = []
+        for answered, other in zip(answered_sides, others):
+            production, candidate = (answered, other) if answered_role == "production" else (other, answered)
+            agree = production["prediction"] == candidate["prediction"]
+            abs_diff = abs(production["probability"] - candidate["probability"])
+            self.scored += 1
+            self.disagreements += not agree
+            self.abs_diff_sum += abs_diff
+            comparisons.append({
+                "mode": mode,
+                "answered_by": answered_role,
+                "production": production,
+                "candidate": candidate,
+                "agree": agree,
+                "abs_diff": round(abs_diff, 4),
+            })
+        try:
+            self.record_fn(records, comparisons)
+        except Exception:
+            logger.error("[Shadow] Failed to record comparisons", exc_info=True)
+
+    async def drain(self):
+        """Wait for background scoring already started (used at shutdown and on candidate swaps)."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "scored": self.scored,
+            "shed": self.shed,
+            "failed": self.failed,
+            "disagreements": self.disagreements,
+            "agreement_rate": round(1 - self.disagreements / self.scored, 4) if self.scored else 1.0,
+            "mean_abs_diff": round(self.abs_diff_sum / self.scored, 5) if self.scored else 0.0,
+        }
@@ -0,0 +1,79 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("healthcare-api")
+
+
+class SideEffectExecutor:
+    """
+    Runs request side effects (audit log, SQL row, metrics) on a bounded thread pool
+    so the response can return right after scoring.
+
+    At most `max_pending` tasks may be queued or running; beyond that new tasks are
+    rejected and counted instead of growing the queue without bound. With
+    `max_workers=0` tasks run inline on the caller's thread (useful for debugging
+    and for measuring the blocking baseline).
+    """
+
+    def __init__(self, max_workers=4, max_pending=1000):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="side-effects") if max_workers > 0 else None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs) -> bool:
+        if self._pool is None:
+            with self._lock:
+                self.submitted += 1
+            self._call(fn, args, kwargs)
+            return True
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            logger.error(f"[SideEffects] Queue full ({self.max_pending}); dropped {getattr(fn, '__name__', fn)}")
+            return False
+        with self._lock:
+            self.submitted += 1
+        try:
+            self._pool.submit(self._call_and_release, fn, args, kwargs)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        return True
+
+    def _call_and_release(self, fn, args, kwargs):
+        try:
+            self._call(fn, args, kwargs)
+        finally:
+            self._slots.release()
+
+    def _call(self, fn, args, kwargs):
+        try:
+            fn(*args, **kwargs)
+            with self._lock:
+                self.completed += 1
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"[SideEffects] {getattr(fn, '__name__', fn)} failed", exc_info=True)
+
+    def shutdown(self, wait=True):
+        """Wait for queued side effects to finish and stop the workers."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
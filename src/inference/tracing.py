@@ -0,0 +1,273 @@
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from src.inference.metrics import REGISTRY
+
+# === CONFIG ===
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() == "true"  # Server-Timing header on every response
+SERVER_TIMING_REQUEST_HEADER = b"x-server-timing"  # ...or only on requests that send this header
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # fraction of requests profiled; runtime-switchable
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_STACKS = 5000  # distinct stacks kept; further ones are counted as "[other]"
+# Innermost frames of threads blocked waiting for work; samples ending there only count as idle
+_IDLE_LEAVES = {"threading.py:wait", "selectors.py:select", "thread.py:_worker", "queue.py:get"}
+STAGE_BUCKETS_MS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000, 2500]
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "stage_latency_ms", "Time spent in each stage of the request and streaming paths", ["path", "stage"],
+    buckets=STAGE_BUCKETS_MS
+)
+
+
+# === Spans ===
+class Span:
+    """
+    Times one stage with perf_counter and records it in STAGE_LATENCY (and in
+    `trace`, if given, for the Server-Timing header). Costs about a
+    microsecond, so it stays on in production.
+    """
+
+    __slots__ = ("path", "stage", "trace", "start", "ms")
+
+    def __init__(self, path, stage, trace=None):
+        self.path = path
+        self.stage = stage
+        self.trace = trace
+        self.ms = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.ms = (time.perf_counter() - self.start) * 1000
+        STAGE_LATENCY.observe(self.ms, (self.path, self.stage))
+        if self.trace is not None:
+            self.trace.spans.append((self.stage, self.ms))
+        return False
+
+
+def span(path, stage) -> Span:
+    """`with span("stream", "score"):` outside a request trace (worker threads, the consumer)."""
+    return Span(path, stage)
+
+
+class Trace:
+    """Stage timings of one HTTP request, started by TracingMiddleware when the request arrives."""
+
+    __slots__ = ("path", "started", "spans", "server_timing")
+
+    def __init__(self, path, server_timing=False):
+        self.path = path
+        self.started = time.perf_counter()
+        self.spans = []
+        self.server_timing = server_timing
+
+    def span(self, stage) -> Span:
+        return Span(self.path, stage, self)
+
+    def mark(self, stage) -> float:
+        """Record the time from the request's arrival until now as `stage` (e.g. body parsing and validation)."""
+        ms = (time.perf_counter() - self.started) * 1000
+        STAGE_LATENCY.observe(ms, (self.path, stage))
+        self.spans.append((stage, ms))
+        return ms
+
+    def header(self) -> bytes:
+        total = (time.perf_counter() - self.started) * 1000
+        parts = [f"{stage};dur={ms:.3f}" for stage, ms in self.spans] + [f"total;dur={total:.3f}"]
+        return ", ".join(parts).encode("latin-1")
+
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def request_span(stage) -> Span:
+    """Span on the current request's trace; a plain histogram span when there is none."""
+    trace = current_trace.get()
+    return trace.span(stage) if trace is not None else Span("untraced", stage)
+
+
+# === Sampling Profiler ===
+def _collapse(frame, thread_name):
+    code = frame.f_code
+    if f"{os.path.basename(code.co_filename)}:{code.co_name}" in _IDLE_LEAVES:
+        return None
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for a fraction of requests. While at least one sampled
+    request is in flight, a daemon thread snapshots every other thread's stack
+    each `interval_ms` and counts collapsed stacks ("thread;file:func;..."),
+    the input format of flame graph tools. Threads blocked waiting for work
+    are only counted as idle samples. With asyncio the event-loop samples
+    include whatever else the loop runs meanwhile, so read it as a profile of
+    the process under sampled traffic. `sample_rate` can be changed at runtime;
+    at 0 the sampler thread sleeps and requests pay one float comparison.
+    """
+
+    def __init__(self, sample_rate=PROFILE_SAMPLE_RATE, interval_ms=PROFILE_INTERVAL_MS,
+                 max_stacks=PROFILE_MAX_STACKS):
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.max_stacks = max_stacks
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.sampled_requests = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def begin(self):
+        with self._lock:
+            self._active += 1
+            self.sampled_requests += 1
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def end(self):
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self._wake.clear()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.is_set():
+            if not self._wake.wait(0.5):
+                continue
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = _collapse(frame, names.get(ident, str(ident)))
+                with self._lock:
+                    self.samples += 1
+                    if stack is None:
+                        self.idle_samples += 1
+                    elif stack in self.stacks or len(self.stacks) < self.max_stacks:
+                        self.stacks[stack] += 1
+                    else:
+                        self.stacks["[other]"] += 1
+            time.sleep(self.interval_ms / 1000.0)
+
+    def set_rate(self, sample_rate):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("Profile sample rate must be in [0, 1]")
+        self.sample_rate = sample_rate
+
+    def collapsed(self, top=None) -> str:
+        """Collapsed stacks, most frequent first: one "stack count" line each."""
+        with self._lock:
+            items = self.stacks.most_common(top)
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.idle_samples = 0
+            self.sampled_requests = 0
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        self._wake.clear()
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval_ms,
+            "sampled_requests": self.sampled_requests,
+            "active": self._active,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "distinct_stacks": len(self.stacks),
+        }
+
+
+profiler = SamplingProfiler()
+
+
+def stage_breakdown() -> dict:
+    """{path: {stage: count, mean and bucket-bound p50/p95/p99 in ms}} from STAGE_LATENCY."""
+    bounds = STAGE_BUCKETS_MS + [None]  # None: above the largest bucket
+    out = {}
+    for (path, stage), counts, total in STAGE_LATENCY.series():
+        count = sum(counts)
+        if not count:
+            continue
+        summary = {"count": count, "mean_ms": round(total / count, 4)}
+        for q in (0.5, 0.95, 0.99):
+            cumulative = 0
+            for bound, n in zip(bounds, counts):
+                cumulative += n
+                if cumulative >= q * count:
+                    break
+            summary[f"p{int(q * 100)}_ms_le"] = bound
+        out.setdefault(path, {})[stage] = summary
+    return out
+
+
+# === ASGI Middleware ===
+class TracingMiddleware:
+    """
+    Starts a Trace for every HTTP request (available to handlers through
+    `current_trace`), optionally profiles it, and appends a Server-Timing header
+    with the recorded stages when SERVER_TIMING is on or the request sends
+    `X-Server-Timing`. Pure ASGI, so streaming responses pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        wants_header = SERVER_TIMING or any(
+            name == SERVER_TIMING_REQUEST_HEADER for name, _ in scope.get("headers", ()))
+        trace = Trace(scope["path"], server_timing=wants_header)
+        token = current_trace.set(trace)
+        sampled = profiler.should_sample()
+        if sampled:
+            profiler.begin()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and trace.server_timing:
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"server-timing", trace.header())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if sampled:
+                profiler.end()
+            current_trace.reset(token)
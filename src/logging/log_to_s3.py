@@ -0,0 +1,234 @@
+# src/logging/log_to_s3.py
+
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+from src.inference.tracing import span
+
+logger = logging.getLogger("healthcare-api")
+
+# === CONFIG ===
+S3_BUCKET = "your-s3-bucket-name"
+LOG_PREFIX = "inference_logs/"
+MAX_QUEUE_RECORDS = 10000          # bounded in-memory buffer between request path and flusher
+MAX_OBJECT_BYTES = 8 * 1024 * 1024  # rotate once this much uncompressed NDJSON is buffered
+MAX_OBJECT_AGE_S = 30.0            # ...or once the oldest buffered record is this old
+UPLOAD_ATTEMPTS = 3
+
+
+# === Sinks ===
+class S3Sink:
+    def __init__(self, bucket: str, client=None):
+        self.bucket = bucket
+        if client is None:
+            import boto3  # imported on first use, so importing the API does not pay for it
+            client = boto3.client("s3")
+        self.client = client
+
+    def write(self, key: str, body: bytes):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=body,
+            ContentType="application/x-ndjson",
+            ContentEncoding="gzip"
+        )
+
+    def describe(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+
+class FileSink:
+    """Writes objects under a local directory; a stand-in for S3 in development and tests."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def write(self, key: str, body: bytes):
+        path = os.path.join(self.root_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    def describe(self, key: str) -> str:
+        return os.path.join(self.root_dir, key)
+
+
+_STOP = object()
+
+
+# === Background Shipper ===
+class AuditLogShipper:
+    """
+    Ships inference audit records to S3 as gzip-compressed NDJSON objects.
+
+    `log()` only enqueues, so it is safe to call from the request path. A single
+    flusher thread drains the bounded queue and rotates to a new object on size
+    or age. When the queue is full, records are dropped (and counted) unless
+    `block_on_full` is set, in which case callers wait up to `block_timeout_s`.
+    """
+
+    def __init__(self, sink, prefix=LOG_PREFIX, max_queue_records=MAX_QUEUE_RECORDS,
+                 max_object_bytes=MAX_OBJECT_BYTES, max_object_age_s=MAX_OBJECT_AGE_S,
+                 block_on_full=False, block_timeout_s=0.05):
+        self.sink = sink
+        self.prefix = prefix
+        self.max_object_bytes = max_object_bytes
+        self.max_object_age_s = max_object_age_s
+        self.block_on_full = block_on_full
+        self.block_timeout_s = block_timeout_s
+        self._queue = queue.Queue(maxsize=max_queue_records)
+        self._thread = None
+        self._source = f"{socket.gethostname()}-{os.getpid()}"
+        self._sequence = 0
+        self._reset_buffer()
+        self._counts_lock = threading.Lock()  # log() runs on many threads; += on an attribute is not atomic
+        self.enqueued = 0
+        self.dropped = 0
+        self.shipped_records = 0
+        self.shipped_objects = 0
+        self.failed_objects = 0
+
+    # --- producer side ---
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="audit-log-shipper", daemon=True)
+        self._thread.start()
+        return self
+
+    def log(self, record: dict) -> bool:
+        try:
+            if self.block_on_full:
+                self._queue.put(record, timeout=self.block_timeout_s)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            with self._counts_lock:
+                self.dropped += 1
+            return False
+        with self._counts_lock:
+            self.enqueued += 1
+        return True
+
+    def log_prediction(self, data: dict, result: dict) -> bool:
+        return self.log({
+            "log_id": uuid.uuid4().hex,
+            "patient_id": data.get("patient_id"),
+            "logged_at": datetime.utcnow().isoformat(),
+            "input": data,
+            "output": result,
+        })
+
+    def log_comparison(self, data: dict, comparison: dict) -> bool:
+        """Paired production/candidate outputs for one request (shadow or canary scoring)."""
+        return self.log({
+            "log_id": uuid.uuid4().hex,
+            "record_type": "model_comparison",
+            "patient_id": data.get("patient_id"),
+            "logged_at": datetime.utcnow().isoformat(),
+            "input": data,
+            **comparison,
+        })
+
+    def close(self, timeout=10.0):
+        """Flush everything still buffered and stop the flusher thread."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error("[AuditLog] Queue still full at shutdown; buffered records may be lost")
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "shipped_records": self.shipped_records,
+            "shipped_objects": self.shipped_objects,
+            "failed_objects": self.failed_objects,
+        }
+
+    # --- flusher side ---
+    def _reset_buffer(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+        self._chunks = []
+        self._raw_bytes = 0
+        self._records = 0
+        self._opened_at = None
+
+    def _run(self):
+        while True:
+            if self._records:
+                timeout = max(0.0, self._opened_at + self.max_object_age_s - time.monotonic())
+            else:
+                timeout = None
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+
+            if record is _STOP:
+                self._flush()
+                return
+            if record is not None:
+                self._append(record)
+            if self._records and (
+                self._raw_bytes >= self.max_object_bytes
+                or time.monotonic() - self._opened_at >= self.max_object_age_s
+            ):
+                self._flush()
+
+    def _append(self, record: dict):
+        if self._opened_at is None:
+            self._opened_at = time.monotonic()
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+        compressed = self._compressor.compress(line)
+        if compressed:
+            self._chunks.append(compressed)
+        self._raw_bytes += len(line)
+        self._records += 1
+
+    def _next_key(self) -> str:
+        now = datetime.utcnow()
+        self._sequence += 1
+        return (
+            f"{self.prefix}dt={now:%Y-%m-%d}/hour={now:%H}/"
+            f"{now:%Y%m%dT%H%M%S}_{self._source}_{self._sequence:06d}.ndjson.gz"
+        )
+
+    def _flush(self):
+        if not self._records:
+            return
+        self._chunks.append(self._compressor.flush())
+        body = b"".join(self._chunks)
+        records = self._records
+        key = self._next_key()
+        self._reset_buffer()
+
+        for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+            try:
+                with span("audit_log", "upload"):
+                    self.sink.write(key, body)
+                self.shipped_records += records
+                self.shipped_objects += 1
+                logger.info(f" Shipped {records} audit records to {self.sink.describe(key)}")
+                return
+            except Exception:
+                if attempt == UPLOAD_ATTEMPTS:
+                    self.failed_objects += 1
+                    logger.error(f"[AuditLog] Failed to ship {records} records to {key}", exc_info=True)
+                else:
+                    time.sleep(0.2 * 2 ** (attempt - 1))
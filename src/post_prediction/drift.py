@@ -0,0 +1,390 @@
+from bisect import bisect_right
+import glob
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import numpy as np
+from src.features.schema import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+
+logger = logging.getLogger("healthcare-api")
+
+# === CONFIG ===
+DRIFT_REFERENCE_PATH = os.getenv("DRIFT_REFERENCE_PATH", "models/drift_reference.json")
+DRIFT_STATE_DIR = os.getenv("DRIFT_STATE_DIR", "drift_state/")  # one live-sketch file per process
+DRIFT_SAVE_INTERVAL_S = 60.0
+N_BINS = 20
+PSI_THRESHOLD = 0.2        # >= 0.2 is the usual "significant shift" cut-off
+KS_THRESHOLD = 0.1
+MIN_OBSERVATIONS = 500     # live rows needed before a feature can be flagged
+PROBABILITY_FEATURE = "readmitted_probability"
+PROBABILITY_EDGES = np.linspace(0.0, 1.0, N_BINS + 1)[1:-1]
+_EPS = 1e-4
+
+# === Sketches ===
+class NumericSketch:
+    """
+    Fixed-edge histogram. Edges are the reference data's quantiles, so the
+    reference is spread evenly over the bins and KS on the binned CDFs is
+    accurate to one bin. Adding a value is one bisect; sketches with the same
+    edges merge by adding counts.
+    """
+
+    kind = "numeric"
+
+    def __init__(self, edges, counts=None, missing=0):
+        self.edges = [float(e) for e in edges]
+        self.counts = [0] * (len(self.edges) + 1) if counts is None else [int(n) for n in counts]
+        self.missing = missing
+
+    @classmethod
+    def from_values(cls, values, n_bins=N_BINS):
+        values = np.asarray(values, dtype=float)
+        finite = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(finite, np.linspace(0, 1, n_bins + 1)[1:-1])) if finite.size else []
+        sketch = cls(edges)
+        sketch.update(values)
+        return sketch
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def add(self, value):
+        if value is None or value != value:
+            self.missing += 1
+        else:
+            self.counts[bisect_right(self.edges, value)] += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        nan = np.isnan(values)
+        self.missing += int(nan.sum())
+        binned = np.bincount(np.searchsorted(self.edges, values[~nan], side="right"), minlength=len(self.counts))
+        self.counts = [a + int(b) for a, b in zip(self.counts, binned)]
+
+    def empty(self):
+        return NumericSketch(self.edges)
+
+    def merge(self, other):
+        if other.edges != self.edges:
+            raise ValueError(f"Cannot merge sketches with different bin edges ({len(other.edges)} vs {len(self.edges)})")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.missing += other.missing
+
+    def compare(self, live) -> dict:
+        ref = np.asarray(self.counts, dtype=float) / self.total
+        cur = np.asarray(live.counts, dtype=float) / live.total
+        ks = float(np.max(np.abs(np.cumsum(ref) - np.cumsum(cur))))
+        return {"psi": _psi(ref, cur), "ks": round(ks, 4)}
+
+    def to_dict(self):
+        return {"kind": self.kind, "edges": self.edges, "counts": self.counts, "missing": self.missing}
+
+class CategoricalSketch:
+    """Category counts; compared with PSI over the union of categories."""
+
+    kind = "categorical"
+
+    def __init__(self, counts=None, missing=0):
+        self.counts = dict(counts or {})
+        self.missing = missing
+
+    @classmethod
+    def from_values(cls, values):
+        sketch = cls()
+        sketch.update(values)
+        return sketch
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def add(self, value):
+        if value is None:
+            self.missing += 1
+        else:
+            self.counts[value] = self.counts.get(value, 0) + 1
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def empty(self):
+        return CategoricalSketch()
+
+    def merge(self, other):
+        for value, n in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + n
+        self.missing += other.missing
+
+    def compare(self, live) -> dict:
+        keys = sorted(set(self.counts) | set(live.counts), key=str)
+        ref = np.array([self.counts.get(k, 0) for k in keys], dtype=float)
+        cur = np.array([live.counts.get(k, 0) for k in keys], dtype=float)
+        return {"psi": _psi(ref / ref.sum(), cur / cur.sum()), "ks": None}
+
+    def to_dict(self):
+        return {"kind": self.kind, "counts": self.counts, "missing": self.missing}
+
+def _psi(ref, cur):
+    ref = np.clip(ref, _EPS, None)
+    cur = np.clip(cur, _EPS, None)
+    return round(float(np.sum((cur - ref) * np.log(cur / ref))), 4)
+
+def _sketch_from_dict(data):
+    if data["kind"] == "numeric":
+        return NumericSketch(data["edges"], data["counts"], data["missing"])
+    return CategoricalSketch(data["counts"], data["missing"])
+
+def _fingerprint(sketches: dict) -> str:
+    return hashlib.sha256(json.dumps(sketches, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+# === Profiles ===
+class DriftProfile:
+    """
+    One sketch per PatientInput feature plus the predicted probability.
+    `reference_id` identifies the reference profile: a content hash for the
+    reference itself, inherited by the live profiles built from it, so live
+    counts are never merged into or compared with another reference.
+    """
+
+    def __init__(self, sketches, reference_id=None):
+        self.sketches = sketches
+        self.reference_id = reference_id or _fingerprint({name: s.to_dict() for name, s in sketches.items()})
+
+    @classmethod
+    def from_records(cls, columns, probabilities=None, n_bins=N_BINS):
+        """
+        Reference profile from training data: `columns` maps feature name to
+        values (a DataFrame works). Missing features get empty sketches and are
+        skipped when comparing.
+        """
+        sketches = {}
+        for name in NUMERIC_FEATURES:
+            sketches[name] = NumericSketch.from_values(columns[name], n_bins) if name in columns else NumericSketch([])
+        for name in CATEGORICAL_FEATURES:
+            sketches[name] = CategoricalSketch.from_values(list(columns[name])) if name in columns else CategoricalSketch()
+        sketches[PROBABILITY_FEATURE] = NumericSketch(PROBABILITY_EDGES)
+        if probabilities is not None:
+            sketches[PROBABILITY_FEATURE].update(probabilities)
+        return cls(sketches)
+
+    def empty(self):
+        return DriftProfile({name: sketch.empty() for name, sketch in self.sketches.items()}, self.reference_id)
+
+    def add(self, record: dict, probability):
+        sketches = self.sketches
+        for name in NUMERIC_FEATURES:
+            sketches[name].add(record.get(name))
+        for name in CATEGORICAL_FEATURES:
+            sketches[name].add(record.get(name))
+        sketches[PROBABILITY_FEATURE].add(probability)
+
+    def update(self, records: list, probabilities):
+        sketches = self.sketches
+        for name in NUMERIC_FEATURES:
+            sketches[name].update([r.get(name, np.nan) for r in records])
+        for name in CATEGORICAL_FEATURES:
+            sketches[name].update([r.get(name) for r in records])
+        sketches[PROBABILITY_FEATURE].update(probabilities)
+
+    def merge(self, other):
+        if other.reference_id != self.reference_id:
+            raise ValueError(f"Cannot merge a profile of reference {other.reference_id} into {self.reference_id}")
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+
+    def to_dict(self):
+        return {"reference_id": self.reference_id,
+                "sketches": {name: sketch.to_dict() for name, sketch in self.sketches.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        if "sketches" not in data:  # older files: sketches only, no reference id
+            data = {"reference_id": None, "sketches": data}
+        return cls({name: _sketch_from_dict(sketch) for name, sketch in data["sketches"].items()},
+                   data["reference_id"])
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+def compare_profiles(reference, live, psi_threshold=PSI_THRESHOLD, ks_threshold=KS_THRESHOLD,
+                     min_observations=MIN_OBSERVATIONS) -> dict:
+    """Per-feature PSI / KS of `live` against `reference`; cost depends only on the bin count."""
+    if live.reference_id != reference.reference_id:
+        raise ValueError(f"Live profile of reference {live.reference_id} compared with {reference.reference_id}")
+    features = {}
+    for name, ref in reference.sketches.items():
+        cur = live.sketches[name]
+        entry = {"reference_count": ref.total, "live_count": cur.total, "live_missing": cur.missing}
+        if not ref.total:
+            entry["status"] = "no_reference"
+        elif cur.total < min_observations:
+            entry["status"] = "insufficient_data"
+        else:
+            entry.update(ref.compare(cur))
+            drifted = entry["psi"] >= psi_threshold or (entry["ks"] is not None and entry["ks"] >= ks_threshold)
+            entry["status"] = "drift" if drifted else "ok"
+        features[name] = entry
+    drifted = sorted(name for name, entry in features.items() if entry["status"] == "drift")
+    return {"drifted": bool(drifted), "drifted_features": drifted, "features": features}
+
+def load_live_profile(reference, state_dir=DRIFT_STATE_DIR):
+    """Sum of the live sketches saved by every serving/consumer process against `reference`."""
+    live = reference.empty()
+    for path in glob.glob(os.path.join(state_dir, "*.json")):
+        try:
+            profile = DriftProfile.load(path)
+        except Exception as e:
+            print(f" Skipping unreadable drift state {path}: {e}")
+            continue
+        if profile.reference_id != reference.reference_id:
+            print(f" Dropping drift state {path}: built against reference {profile.reference_id}")
+            _remove(path)
+            continue
+        live.merge(profile)
+    return live
+
+def reset_live_state(state_dir=DRIFT_STATE_DIR):
+    """
+    Drop saved live sketches, e.g. after retraining on the data they describe.
+    Running monitors start over on their own once they see the new reference file.
+    """
+    for path in glob.glob(os.path.join(state_dir, "*.json")):
+        _remove(path)
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# === Monitor ===
+class DriftMonitor:
+    """
+    Live sketches updated as predictions are stored, compared on demand with the
+    training-time reference profile. The live profile is saved to
+    `<state_dir>/<host>-<pid>.json` every `save_interval_s` and on close, so the
+    retraining job can merge the sketches of every process without touching SQL.
+    When started from a reference file, the file is re-checked at the same
+    interval; a new reference replaces the old one and the live sketches start over.
+    """
+
+    def __init__(self, reference, state_dir=DRIFT_STATE_DIR, save_interval_s=DRIFT_SAVE_INTERVAL_S,
+                 reference_path=None):
+        self.reference = reference
+        self.reference_path = reference_path
+        self._reference_mtime = os.stat(reference_path).st_mtime_ns if reference_path else None
+        self.live = reference.empty()
+        self.state_path = os.path.join(state_dir, f"{socket.gethostname()}-{os.getpid()}.json") if state_dir else None
+        self.save_interval_s = save_interval_s
+        self.observations = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_reference_file(cls, path=DRIFT_REFERENCE_PATH, **kwargs):
+        """Monitor for the saved reference profile, or None if there is none yet."""
+        if not os.path.exists(path):
+            return None
+        return cls(DriftProfile.load(path), reference_path=path, **kwargs)
+
+    def start(self):
+        if self.state_path:
+            self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.save()
+
+    def _run(self):
+        while not self._stop.wait(self.save_interval_s):
+            self.reload_reference()
+            self.save()
+
+    def reload_reference(self) -> bool:
+        """Switch to the reference file's profile if it changed (e.g. after retraining); True if it did."""
+        if not self.reference_path:
+            return False
+        try:
+            mtime = os.stat(self.reference_path).st_mtime_ns
+            if mtime == self._reference_mtime:
+                return False
+            reference = DriftProfile.load(self.reference_path)
+        except Exception:
+            logger.error("[Drift] Failed to reload the reference profile", exc_info=True)
+            return False
+        self._reference_mtime = mtime
+        if reference.reference_id == self.reference.reference_id:
+            return False
+        with self._lock:
+            self.reference = reference
+            self.live = reference.empty()
+            self.observations = 0
+        if self.state_path:
+            _remove(self.state_path)
+        logger.info(f"[Drift] New reference profile {reference.reference_id}; live sketches reset")
+        return True
+
+    def observe(self, record: dict, result: dict):
+        with self._lock:
+            self.live.add(record, result["readmitted_probability"])
+            self.observations += 1
+
+    def observe_many(self, records: list, results: list):
+        probabilities = [r["readmitted_probability"] for r in results]
+        with self._lock:
+            self.live.update(records, probabilities)
+            self.observations += len(records)
+
+    def _snapshot(self):
+        """(reference, copy of the live profile), taken together so a reference swap cannot split them."""
+        with self._lock:
+            snapshot = self.live.empty()
+            snapshot.merge(self.live)
+            return self.reference, snapshot
+
+    def save(self):
+        if not self.state_path or not self.observations:
+            return
+        try:
+            self._snapshot()[1].save(self.state_path)
+        except Exception:
+            logger.error("[Drift] Failed to save live sketches", exc_info=True)
+
+    def report(self) -> dict:
+        reference, live = self._snapshot()
+        return dict(compare_profiles(reference, live), observations=self.observations)
+
+    def stats(self) -> dict:
+        report = self.report()
+        stats = {"observations": self.observations, "drifted_features": len(report["drifted_features"])}
+        for name, entry in report["features"].items():
+            if "psi" in entry:
+                stats[f"{name}_psi"] = entry["psi"]
+        return stats
+
+def build_reference_profile(df, probabilities=None, path=DRIFT_REFERENCE_PATH):
+    """Profile the training data (and, if given, the model's scores on it) and save it as the reference."""
+    profile = DriftProfile.from_records(df, probabilities)
+    profile.save(path)
+    print(f" Saved drift reference profile ({len(df)} rows) to {path}")
+    return profile
@@ -0,0 +1,233 @@
+# src/sql_to_s3/dataset.py
+
+import boto3
+import io
+import json
+import os
+import shutil
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import text
+from src.sql_to_s3.extract_from_sql import S3_BUCKET, export_query_to_s3
+
+# -------- Configuration --------
+DATASET_PREFIX = os.getenv("DATASET_PREFIX", "datasets/readmission/")
+DATASET_LOCAL_DIR = os.getenv("DATASET_LOCAL_DIR")        # set to keep the dataset on local disk instead of S3
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", "data_cache/")  # downloaded partitions (immutable)
+
+# Tables in the training dataset. Tables with a watermark column are appended
+# as delta partitions holding only rows above the stored high-water mark; the
+# others are exported once as the base snapshot (re-export with rebase=True).
+# `label_column` is the table's column holding the observed outcome used as the
+# training label. Logged predictions have none yet: their `readmitted_prediction`
+# is the model's own output, and training on it would teach the model its own
+# mistakes, so they stay out of training until an outcome column is joined in.
+SOURCES = {
+    "patient_data": {
+        "columns": ["patient_id", "age", "gender", "blood_pressure", "heart_rate", "cholesterol",
+                    "blood_sugar", "diagnosis", "readmitted"],
+        "watermark_column": None,
+        "label_column": "readmitted",
+    },
+    "predictions_log": {
+        "columns": ["id", "patient_id", "age", "gender", "blood_pressure", "heart_rate", "cholesterol",
+                    "blood_sugar", "oxygen_saturation", "temperature", "readmitted_prediction",
+                    "readmitted_probability", "timestamp"],
+        "watermark_column": "id",
+        "label_column": None,
+    },
+}
+TRAINING_LABEL = "readmitted"
+TRAINING_DEFAULTS = {"diagnosis": "unknown"}  # training columns a table does not carry
+
+def has_outcome_label(table, sources=None) -> bool:
+    return bool((sources or SOURCES)[table].get("label_column"))
+
+def to_training_schema(df, table, columns, sources=None):
+    """`table` rows in the given training columns: label renamed to `readmitted`, absent columns defaulted."""
+    label = (sources or SOURCES)[table].get("label_column")
+    if label and label != TRAINING_LABEL:
+        df = df.rename(columns={label: TRAINING_LABEL})
+    missing = {c: TRAINING_DEFAULTS.get(c) for c in columns if c not in df.columns}
+    return df.assign(**missing)[list(columns)]
+
+def _error_code(exc):
+    return getattr(exc, "response", {}).get("Error", {}).get("Code")
+
+# -------- Local Object Store --------
+class LocalObjectStore:
+    """
+    Directory-backed stand-in for the subset of the boto3 S3 client the dataset
+    uses (put/get object, multipart upload), so the same code can keep the
+    dataset on local disk. Objects live at <root>/<bucket>/<key>.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root_dir, bucket, *key.split("/"))
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(Body.encode("utf-8") if isinstance(Body, str) else Body)
+        os.replace(path + ".tmp", path)
+        return {}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        return {"Body": open(self._path(Bucket, Key), "rb")}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path + ".upload", "wb").close()
+        return {"UploadId": path + ".upload"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with open(UploadId, "ab") as f:
+            f.write(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        os.replace(UploadId, self._path(Bucket, Key))
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        if os.path.exists(UploadId):
+            os.remove(UploadId)
+        return {}
+
+def get_dataset_client():
+    return LocalObjectStore(DATASET_LOCAL_DIR) if DATASET_LOCAL_DIR else boto3.client("s3")
+
+# -------- Incremental Dataset --------
+class IncrementalDataset:
+    """
+    Training dataset kept as immutable gzip CSV partitions under `prefix`, with
+    `_manifest.json` listing every partition and the high-water mark reached
+    per table. `sync()` only queries rows above the stored watermark and the
+    manifest is rewritten after the partition is uploaded, so an interrupted
+    run simply re-extracts the same range next time. `read()` serves
+    partitions from a local cache, downloading only ones it has not seen.
+    """
+
+    def __init__(self, client=None, bucket=S3_BUCKET, prefix=DATASET_PREFIX, sources=None,
+                 cache_dir=DATASET_CACHE_DIR):
+        self.client = client or get_dataset_client()
+        self.bucket = bucket
+        self.prefix = prefix
+        self.sources = sources or SOURCES
+        self.cache_dir = cache_dir
+        self.manifest_key = f"{prefix}_manifest.json"
+
+    # --- manifest ---
+    def load_manifest(self) -> dict:
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self.manifest_key)["Body"]
+            with body:
+                return json.loads(body.read())
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            if _error_code(e) not in ("NoSuchKey", "404"):
+                raise
+        return {"partitions": [], "watermarks": {}}
+
+    def _save_manifest(self, manifest):
+        manifest["updated_at"] = datetime.utcnow().isoformat()
+        self.client.put_object(
+            Bucket=self.bucket, Key=self.manifest_key,
+            Body=json.dumps(manifest, indent=2, default=str).encode("utf-8"), ContentType="application/json"
+        )
+
+    # --- extraction ---
+    def sync(self, engine, rebase=False) -> dict:
+        """Export the base snapshot if missing (or `rebase`) and append a delta per watermarked table."""
+        manifest = self.load_manifest()
+        for table, source in self.sources.items():
+            column = source["watermark_column"]
+            has_base = any(p["table"] == table for p in manifest["partitions"])
+            if column is None and has_base and not rebase:
+                continue
+            partition = self._extract(engine, table, source, manifest["watermarks"].get(table) if column else None)
+            if partition is None:
+                print(f" No new rows in `{table}`.")
+                continue
+            if column is None:
+                manifest["partitions"] = [p for p in manifest["partitions"] if p["table"] != table]
+            else:
+                manifest["watermarks"][table] = partition["watermark_to"]
+            manifest["partitions"].append(partition)
+            self._save_manifest(manifest)
+        return manifest
+
+    def _extract(self, engine, table, source, low):
+        column = source["watermark_column"]
+        select = f"SELECT {', '.join(source['columns'])} FROM {table}"
+        timestamp = datetime.utcnow().strftime("%Y-%m-%d-%H-%M-%S-%f")
+        params = {}
+        if column is None:
+            high = None
+            key = f"{self.prefix}{table}/base_{timestamp}.csv.gz"
+        else:
+            # Fix the upper bound first so rows inserted during the export land in the next delta
+            with engine.connect() as conn:
+                high = conn.execute(text(f"SELECT MAX({column}) FROM {table}")).scalar()
+            if high is None or (low is not None and high <= low):
+                return None
+            if low is None:
+                select += f" WHERE {column} <= :high"
+            else:
+                select += f" WHERE {column} > :low AND {column} <= :high"
+                params["low"] = low
+            select += f" ORDER BY {column}"
+            params["high"] = high
+            key = f"{self.prefix}{table}/delta_{timestamp}.csv.gz"
+
+        export = export_query_to_s3(engine, select, key, bucket=self.bucket, params=params, client=self.client)
+        return {
+            "table": table,
+            "key": key,
+            "rows": export["rows"],
+            "bytes": export["bytes"],
+            "watermark_column": column,
+            "watermark_from": low,
+            "watermark_to": high,
+            "created_at": export["finished_at"],
+        }
+
+    # --- reading ---
+    def open_partition(self, key):
+        if not self.cache_dir:
+            return io.BytesIO(self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read())
+        path = os.path.join(self.cache_dir, self.bucket, *key.split("/"))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self.client.get_object(Bucket=self.bucket, Key=key)["Body"] as body, open(path + ".tmp", "wb") as f:
+                shutil.copyfileobj(body, f)
+            os.replace(path + ".tmp", path)
+        return open(path, "rb")
+
+    def read(self, table) -> pd.DataFrame:
+        """All partitions of `table` (base or base + deltas) as one DataFrame."""
+        frames = []
+        for partition in self.load_manifest()["partitions"]:
+            if partition["table"] == table:
+                with self.open_partition(partition["key"]) as f:
+                    frames.append(pd.read_csv(f, compression="gzip"))
+        if not frames:
+            return pd.DataFrame(columns=self.sources[table]["columns"])
+        return pd.concat(frames, ignore_index=True)
+
+    def row_counts(self) -> dict:
+        counts = {}
+        for partition in self.load_manifest()["partitions"]:
+            counts[partition["table"]] = counts.get(partition["table"], 0) + partition["rows"]
+        return counts
+
+if __name__ == "__main__":
+    from src.post_prediction.store_to_sql import get_engine
+    manifest = IncrementalDataset().sync(get_engine())
+    print(f" Dataset watermarks: {manifest['watermarks']}")
@@ -1,16 +1,22 @@
 # src/sql_to_s3/extract_from_sql.py
 
-import pandas as pd
 import boto3
-import os
+import csv
+import gzip
+import io
+import json
+import uuid
 from datetime import datetime
+from sqlalchemy import text
 from src.sql.connect_sql import get_sql_connection
 
 # -------- Configuration --------
 TABLE_NAME = "patient_data"
 S3_BUCKET = "your-s3-bucket-name"
 S3_KEY_PREFIX = "training_data/"
-LOCAL_CSV_PATH = "sample_data/patient_records/patient_data_export.csv"
+CHUNK_ROWS = 10000                   # rows per fetchmany() from the server-side cursor
+PART_SIZE_BYTES = 8 * 1024 * 1024    # compressed bytes per multipart part (S3 minimum is 5 MB except the last)
+COMPRESS_LEVEL = 6
 
 # -------- SQL Query Template --------
 SQL_QUERY = f"""
@@ -27,45 +33,143 @@ SELECT
 FROM {TABLE_NAME};
 """
 
-def upload_to_s3(local_file, bucket, s3_key):
-    s3 = boto3.client('s3')
+# -------- Streaming Export --------
+class MultipartUpload:
+    """One S3 object written part by part; aborted if the export fails."""
+
+    def __init__(self, client, bucket, key, content_type="text/csv", content_encoding="gzip"):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = client.create_multipart_upload(
+            Bucket=bucket, Key=key, ContentType=content_type, ContentEncoding=content_encoding
+        )["UploadId"]
+        self.parts = []
+
+    def upload_part(self, body: bytes) -> dict:
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=part_number, Body=body
+        )
+        part = {"PartNumber": part_number, "ETag": response["ETag"]}
+        self.parts.append(part)
+        return part
+
+    def complete(self):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts}
+        )
+
+    def abort(self):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+def _csv_bytes(rows, header=None) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+def export_query_to_s3(engine, query, key, bucket=S3_BUCKET, params=None, client=None,
+                       chunk_rows=CHUNK_ROWS, part_size_bytes=PART_SIZE_BYTES, manifest_extra=None) -> dict:
+    """
+    Stream a query result to s3://bucket/key as gzip CSV without a local copy.
+
+    Rows are read from a server-side cursor `chunk_rows` at a time and
+    compressed into an in-memory part; every `part_size_bytes` the part is sent
+    as one multipart-upload part, so memory is bounded by one chunk plus one
+    part regardless of table size. Each part is a complete gzip member (the
+    object as a whole is still a valid gzip file) and the header row is in
+    part 1 only. A manifest listing the parts with their row counts and byte
+    offsets is written next to the object as `<key>.manifest.json` and returned.
+    """
+    client = client or boto3.client("s3")
+    started_at = datetime.utcnow().isoformat()
+    upload = MultipartUpload(client, bucket, key)
+    parts = []
+    offset = 0
+
+    def send(buffer, n_rows):
+        nonlocal offset
+        body = buffer.getvalue()
+        part = upload.upload_part(body)
+        parts.append({"part_number": part["PartNumber"], "etag": part["ETag"], "rows": n_rows,
+                      "offset": offset, "bytes": len(body)})
+        offset += len(body)
+
     try:
-        s3.upload_file(local_file, bucket, s3_key)
-        print(f" Uploaded to S3: s3://{bucket}/{s3_key}")
-    except Exception as e:
-        print(f" Failed to upload to S3: {e}")
-
-def extract_and_upload():
-    print(" Connecting to SQL database...")
-    engine, _ = get_sql_connection(
-        db_type="mysql",       # or "postgresql"
-        username="admin",
-        password="admin123",
-        host="localhost",
-        port="3306",
-        database="hospital_db"
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(text(query), params or {})
+            columns = list(result.keys())
+            header = columns
+            buffer, part_rows = io.BytesIO(), 0
+            gz = gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=COMPRESS_LEVEL)
+            while True:
+                rows = result.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                gz.write(_csv_bytes(rows, header))
+                header = None
+                part_rows += len(rows)
+                if buffer.tell() >= part_size_bytes:
+                    gz.close()
+                    send(buffer, part_rows)
+                    buffer, part_rows = io.BytesIO(), 0
+                    gz = gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=COMPRESS_LEVEL)
+            if header:
+                gz.write(_csv_bytes([], header))  # empty result: header-only object
+            gz.close()
+            if part_rows or not parts:
+                send(buffer, part_rows)
+        upload.complete()
+    except Exception:
+        upload.abort()
+        raise
+
+    manifest = {
+        "run_id": uuid.uuid4().hex,
+        "bucket": bucket,
+        "key": key,
+        "format": "csv.gz",
+        "columns": columns,
+        "rows": sum(p["rows"] for p in parts),
+        "bytes": offset,
+        "parts": parts,
+        "started_at": started_at,
+        "finished_at": datetime.utcnow().isoformat(),
+    }
+    manifest.update(manifest_extra or {})
+    client.put_object(
+        Bucket=bucket, Key=f"{key}.manifest.json", Body=json.dumps(manifest, indent=2).encode("utf-8"),
+        ContentType="application/json"
     )
+    print(f" Exported {manifest['rows']} rows in {len(parts)} parts to s3://{bucket}/{key}")
+    return manifest
+
+def extract_and_upload(engine=None, client=None):
+    if engine is None:
+        print(" Connecting to SQL database...")
+        engine, _ = get_sql_connection(
+            db_type="mysql",       # or "postgresql"
+            username="admin",
+            password="admin123",
+            host="localhost",
+            port="3306",
+            database="hospital_db"
+        )
 
     if not engine:
         print(" SQL connection failed. Aborting.")
         return
 
-    print(" Pulling data from SQL...")
+    print(" Streaming data from SQL to S3...")
+    timestamp = datetime.utcnow().strftime("%Y-%m-%d-%H-%M-%S")
+    s3_key = f"{S3_KEY_PREFIX}patient_data_{timestamp}.csv.gz"
     try:
-        df = pd.read_sql(SQL_QUERY, con=engine)
-        print(f" Retrieved {len(df)} records.")
+        return export_query_to_s3(engine, SQL_QUERY, s3_key, client=client, manifest_extra={"table": TABLE_NAME})
     except Exception as e:
-        print(f" Failed to query SQL: {e}")
-        return
-
-    print(" Saving locally as CSV...")
-    os.makedirs(os.path.dirname(LOCAL_CSV_PATH), exist_ok=True)
-    df.to_csv(LOCAL_CSV_PATH, index=False)
-
-    print(" Uploading CSV to S3...")
-    timestamp = datetime.utcnow().strftime("%Y-%m-%d-%H-%M-%S")
-    s3_key = f"{S3_KEY_PREFIX}patient_data_{timestamp}.csv"
-    upload_to_s3(LOCAL_CSV_PATH, S3_BUCKET, s3_key)
+        print(f" Failed to export to S3: {e}")
 
 if __name__ == "__main__":
     extract_and_upload()
@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# === CONFIG ===
+CHECKPOINT_PATH = os.getenv("KINESIS_CHECKPOINT_PATH", "checkpoints/kinesis_checkpoints.db")
+
+
+class CheckpointStore:
+    """
+    Last processed sequence number per (stream, shard), persisted in a local
+    SQLite file so a restarted consumer resumes with AFTER_SEQUENCE_NUMBER.
+    Records the consumer gave up on (unparseable, or failing every retry) are
+    kept in a dead-letter table in the same file, so checkpointing past them
+    loses nothing.
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS kinesis_checkpoints (
+                    stream_name TEXT NOT NULL,
+                    shard_id TEXT NOT NULL,
+                    sequence_number TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (stream_name, shard_id)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS kinesis_dead_letters (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    stream_name TEXT NOT NULL,
+                    shard_id TEXT NOT NULL,
+                    sequence_number TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    error TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """)
+
+    def get(self, stream_name, shard_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sequence_number FROM kinesis_checkpoints WHERE stream_name = ? AND shard_id = ?",
+                (stream_name, shard_id)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, stream_name, shard_id, sequence_number):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kinesis_checkpoints (stream_name, shard_id, sequence_number, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (stream_name, shard_id, sequence_number, datetime.utcnow().isoformat())
+            )
+
+    def all(self, stream_name):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT shard_id, sequence_number FROM kinesis_checkpoints WHERE stream_name = ?",
+                (stream_name,)
+            ).fetchall()
+        return dict(rows)
+
+    def add_dead_letter(self, stream_name, shard_id, sequence_number, data, error):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", "replace")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO kinesis_dead_letters (stream_name, shard_id, sequence_number, data, error, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (stream_name, shard_id, sequence_number, data, str(error), datetime.utcnow().isoformat())
+            )
+
+    def dead_letters(self, stream_name, limit=100):
+        """Most recent dead letters as dicts (shard_id, sequence_number, data, error, created_at)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT shard_id, sequence_number, data, error, created_at FROM kinesis_dead_letters "
+                "WHERE stream_name = ? ORDER BY id DESC LIMIT ?",
+                (stream_name, limit)
+            ).fetchall()
+        return [dict(zip(("shard_id", "sequence_number", "data", "error", "created_at"), row)) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
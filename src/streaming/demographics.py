@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from sqlalchemy import bindparam, text
+
+from src.post_prediction.store_to_sql import get_engine
+
+# === CONFIG ===
+CACHE_MAX_ENTRIES = 100000
+CACHE_TTL_S = 15 * 60
+LOOKUP_CHUNK_SIZE = 500    # ids per `WHERE patient_id IN (...)` query
+WARM_UP_CHUNK_SIZE = 5000  # rows fetched per round-trip during warm-up
+
+DEMOGRAPHIC_COLUMNS = ["patient_id", "age", "gender", "cholesterol", "blood_sugar"]
+_SELECT = f"SELECT {', '.join(DEMOGRAPHIC_COLUMNS)} FROM patient_data"
+SELECT_ONE = text(f"{_SELECT} WHERE patient_id = :patient_id")
+SELECT_MANY = text(f"{_SELECT} WHERE patient_id IN :patient_ids").bindparams(
+    bindparam("patient_ids", expanding=True)
+)
+SELECT_ALL = text(_SELECT)
+
+_MISSING = object()
+
+
+def _to_dict(row) -> dict:
+    # MySQL DECIMAL columns come back as Decimal, which json/requests cannot encode
+    return {k: float(v) if isinstance(v, Decimal) else v for k, v in row._mapping.items()}
+
+
+class DemographicsService:
+    """
+    Patient demographics lookups for the Kinesis consumer, served from an
+    LRU cache with a TTL in front of the shared pooled SQL engine. Patients
+    that are not in `patient_data` are cached as misses too, so unknown ids
+    do not hit the database on every event.
+    """
+
+    def __init__(self, engine=None, max_entries=CACHE_MAX_ENTRIES, ttl_s=CACHE_TTL_S, clock=time.monotonic):
+        self.engine = engine
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.db_queries = 0
+
+    def _engine(self):
+        return self.engine or get_engine()
+
+    # --- cache ---
+    def _cache_get(self, patient_id):
+        entry = self._cache.get(patient_id)
+        if entry is None:
+            return _MISSING
+        expires_at, row = entry
+        if expires_at < self.clock():
+            del self._cache[patient_id]
+            self.expired += 1
+            return _MISSING
+        self._cache.move_to_end(patient_id)
+        return row
+
+    def _cache_put(self, patient_id, row, now):
+        self._cache[patient_id] = (now + self.ttl_s, row)
+        self._cache.move_to_end(patient_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    # --- lookups ---
+    def get(self, patient_id):
+        """Demographics dict for one patient, or None if unknown."""
+        return self.get_many([patient_id]).get(patient_id)
+
+    def get_many(self, patient_ids) -> dict:
+        """Demographics for a page of events; unknown patients are absent from the result."""
+        found = {}
+        wanted = []
+        with self._lock:
+            for patient_id in dict.fromkeys(patient_ids):
+                row = self._cache_get(patient_id)
+                if row is _MISSING:
+                    self.misses += 1
+                    wanted.append(patient_id)
+                else:
+                    self.hits += 1
+                    if row is not None:
+                        found[patient_id] = row
+
+        for i in range(0, len(wanted), LOOKUP_CHUNK_SIZE):
+            chunk = wanted[i:i + LOOKUP_CHUNK_SIZE]
+            with self._engine().connect() as conn:
+                if len(chunk) == 1:
+                    rows = conn.execute(SELECT_ONE, {"patient_id": chunk[0]})
+                else:
+                    rows = conn.execute(SELECT_MANY, {"patient_ids": chunk})
+                fetched = {r["patient_id"]: r for r in map(_to_dict, rows)}
+            now = self.clock()
+            with self._lock:
+                self.db_queries += 1
+                for patient_id in chunk:
+                    row = fetched.get(patient_id)
+                    self._cache_put(patient_id, row, now)
+                    if row is not None:
+                        found[patient_id] = row
+        return found
+
+    def warm_up(self, limit=None) -> int:
+        """Bulk-load `patient_data` into the cache (up to `limit` or the cache size)."""
+        limit = min(limit or self.max_entries, self.max_entries)
+        loaded = 0
+        with self._engine().connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(SELECT_ALL)
+            while loaded < limit:
+                rows = result.fetchmany(WARM_UP_CHUNK_SIZE)
+                if not rows:
+                    break
+                now = self.clock()
+                with self._lock:
+                    for row in rows[:limit - loaded]:
+                        row = _to_dict(row)
+                        self._cache_put(row["patient_id"], row, now)
+                        loaded += 1
+            result.close()
+        with self._lock:
+            self.db_queries += 1
+        print(f" Warmed demographics cache with {loaded} patients.")
+        return loaded
+
+    def invalidate(self, patient_id=None):
+        with self._lock:
+            if patient_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(patient_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "db_queries": self.db_queries,
+        }
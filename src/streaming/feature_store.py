@@ -0,0 +1,303 @@
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from src.features.schema import ROLLING_VITALS, ROLLING_WINDOWS_MIN
+
+# === CONFIG ===
+FEATURE_STORE = os.getenv("FEATURE_STORE", "false").lower() == "true"  # only models on EXTENDED_FEATURE_COLUMNS use it
+RING_CAPACITY = int(os.getenv("FEATURE_STORE_RING_CAPACITY", "64"))       # events kept per patient
+MAX_PATIENTS = int(os.getenv("FEATURE_STORE_MAX_PATIENTS", "200000"))     # least recently seen evicted beyond this
+IDLE_TTL_S = float(os.getenv("FEATURE_STORE_IDLE_TTL_S", "7200"))         # stream time without events before eviction
+REBASE_EVERY = 16  # x capacity events between exact recomputations of the running sums
+N_VITALS = len(ROLLING_VITALS)
+
+# Running sums per window: Σt, Σt², then Σx and Σt·x for each vital
+_SUM_T, _SUM_TT, _SUM_X, _SUM_TX = 0, 1, 2, 2 + N_VITALS
+_SUMS_PER_WINDOW = 2 + 2 * N_VITALS
+
+
+def _feature_names(window_min):
+    """([mean, min, max, slope] column names per vital, count column name) for one window."""
+    per_vital = [[f"{vital}_{stat}_{window_min}m" for stat in ("mean", "min", "max", "slope")]
+                 for vital in ROLLING_VITALS]
+    return per_vital, f"vitals_count_{window_min}m"
+
+
+def event_time(timestamp) -> float:
+    """Epoch seconds for an event timestamp: a number, or an ISO string (naive means UTC)."""
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+# === Per-patient series ===
+class PatientSeries:
+    """
+    The last `capacity` vitals readings of one patient in a ring buffer, with
+    running sums per window (count, mean and least-squares slope in O(1)) and
+    monotonic min/max wedges over the largest window (window min/max by
+    bisection). A window therefore holds at most `capacity` readings.
+    Timestamps are stored relative to `origin`; every REBASE_EVERY * capacity
+    events the sums are recomputed exactly and the origin moved up, so
+    floating-point drift from add/subtract cannot build up. A reading older
+    than the previous one is clamped to its time, so windows only move forward.
+    `position` is the stream position (Kinesis sequence number) of the last
+    event pushed, when the caller supplies one.
+    """
+
+    __slots__ = ("capacity", "windows_s", "origin", "last_t", "seq", "times", "values", "starts", "sums", "wedges",
+                 "position")
+
+    def __init__(self, windows_s, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.windows_s = windows_s                # ascending
+        self.origin = None
+        self.last_t = 0.0                         # relative to origin
+        self.seq = 0                              # events pushed so far; event k lives at slot k % capacity
+        self.times = array("d")
+        self.values = array("f")                  # N_VITALS per slot
+        self.starts = [0] * len(windows_s)        # first event seq inside each window
+        self.sums = array("d", bytes(8 * _SUMS_PER_WINDOW * len(windows_s)))
+        self.wedges = [[] for _ in range(2 * N_VITALS)]  # per vital: max wedge, min wedge (event seqs)
+        self.position = None
+
+    @property
+    def last_time(self) -> float:
+        return self.origin + self.last_t
+
+    def _accumulate(self, w, k, sign):
+        slot = k % self.capacity
+        t = self.times[slot]
+        sums = self.sums
+        base = w * _SUMS_PER_WINDOW
+        sums[base + _SUM_T] += sign * t
+        sums[base + _SUM_TT] += sign * t * t
+        for v, x in enumerate(self.values[slot * N_VITALS:(slot + 1) * N_VITALS]):
+            sums[base + _SUM_X + v] += sign * x
+            sums[base + _SUM_TX + v] += sign * t * x
+
+    def push(self, timestamp, readings):
+        if self.origin is None:
+            self.origin = timestamp
+        t = timestamp - self.origin
+        if t < self.last_t:
+            t = self.last_t
+        self.last_t = t
+        cap, k, starts = self.capacity, self.seq, self.starts
+        slot = k % cap
+        if k < cap:
+            self.times.append(t)
+            self.values.extend(readings)
+        else:
+            # The slot's previous event leaves every window that still holds it
+            for w in range(len(starts)):
+                if starts[w] <= k - cap:
+                    self._accumulate(w, starts[w], -1.0)
+                    starts[w] += 1
+            self.times[slot] = t
+            self.values[slot * N_VITALS:(slot + 1) * N_VITALS] = array("f", readings)
+        self.seq = k + 1
+        xs = self.values[slot * N_VITALS:(slot + 1) * N_VITALS].tolist()  # as stored (float32)
+        sums, tt = self.sums, t * t
+        for base in range(0, len(sums), _SUMS_PER_WINDOW):
+            sums[base + _SUM_T] += t
+            sums[base + _SUM_TT] += tt
+            for v, x in enumerate(xs):
+                sums[base + _SUM_X + v] += x
+                sums[base + _SUM_TX + v] += t * x
+        values, wedges = self.values, self.wedges
+        for v, x in enumerate(xs):
+            high, low = wedges[2 * v], wedges[2 * v + 1]
+            while high and values[(high[-1] % cap) * N_VITALS + v] <= x:
+                high.pop()
+            high.append(k)
+            while low and values[(low[-1] % cap) * N_VITALS + v] >= x:
+                low.pop()
+            low.append(k)
+        self._expire(t)
+        if self.seq % (cap * REBASE_EVERY) == 0:
+            self._rebase()
+
+    def _expire(self, now):
+        times, values, sums = self.times, self.values, self.sums
+        cap, seq, starts = self.capacity, self.seq, self.starts
+        for w, window_s in enumerate(self.windows_s):
+            start = starts[w]
+            cutoff = now - window_s
+            base = w * _SUMS_PER_WINDOW
+            while start < seq:
+                slot = start % cap
+                t = times[slot]
+                if t >= cutoff:
+                    break
+                sums[base + _SUM_T] -= t
+                sums[base + _SUM_TT] -= t * t
+                for v, x in enumerate(values[slot * N_VITALS:(slot + 1) * N_VITALS]):
+                    sums[base + _SUM_X + v] -= x
+                    sums[base + _SUM_TX + v] -= t * x
+                start += 1
+            starts[w] = start
+        oldest = starts[-1]
+        for wedge in self.wedges:
+            while wedge[0] < oldest:  # never empties: the newest event is always in the window
+                wedge.pop(0)
+
+    def _rebase(self):
+        """Move the origin to the oldest retained event and recompute every sum exactly."""
+        oldest = self.starts[-1]
+        shift = self.times[oldest % self.capacity] if oldest < self.seq else self.last_t
+        for slot in range(len(self.times)):
+            self.times[slot] -= shift
+        self.origin += shift
+        self.last_t -= shift
+        for i in range(len(self.sums)):
+            self.sums[i] = 0.0
+        for w, start in enumerate(self.starts):
+            for k in range(start, self.seq):
+                self._accumulate(w, k, 1.0)
+
+    def features(self, names) -> dict:
+        """Aggregates for every window; `names[w]` is _feature_names() of window w."""
+        out = {}
+        sums, values, wedges, cap, seq = self.sums, self.values, self.wedges, self.capacity, self.seq
+        for w, (window_names, count_name) in enumerate(names):
+            start = self.starts[w]
+            n = seq - start
+            out[count_name] = n
+            if n == 0:
+                for vital_names in window_names:
+                    for name in vital_names:
+                        out[name] = None
+                continue
+            base = w * _SUMS_PER_WINDOW
+            sum_t, sum_tt = sums[base + _SUM_T], sums[base + _SUM_TT]
+            denom = n * sum_tt - sum_t * sum_t
+            has_slope = n > 1 and denom > 1e-9 * (sum_tt if sum_tt > 1.0 else 1.0)
+            for v, (mean_name, min_name, max_name, slope_name) in enumerate(window_names):
+                high, low = wedges[2 * v], wedges[2 * v + 1]
+                sum_x = sums[base + _SUM_X + v]
+                out[mean_name] = sum_x / n
+                out[min_name] = values[(low[bisect_left(low, start)] % cap) * N_VITALS + v]
+                out[max_name] = values[(high[bisect_left(high, start)] % cap) * N_VITALS + v]
+                out[slope_name] = (60.0 * (n * sums[base + _SUM_TX + v] - sum_t * sum_x) / denom
+                                   if has_slope else None)
+        return out
+
+    def memory_bytes(self) -> int:
+        return (sys.getsizeof(self) + sys.getsizeof(self.times) + sys.getsizeof(self.values)
+                + sys.getsizeof(self.starts) + sys.getsizeof(self.sums)
+                + sys.getsizeof(self.wedges) + sum(sys.getsizeof(w) for w in self.wedges))
+
+
+# === Store ===
+class FeatureStore:
+    """
+    Sliding-window vitals aggregates per patient for streaming inference.
+    `update()` folds one event into the patient's series in O(1) amortized
+    and returns mean / min / max / slope of each vital over every window
+    (ROLLING_WINDOWS_MIN), keyed by the ROLLING_FEATURE_COLUMNS names; values
+    that are undefined (empty window, slope of a single reading) are None.
+    Windows are measured in stream time (event timestamps), not wall clock.
+    Patients are kept in LRU order and dropped after IDLE_TTL_S of stream
+    time without events or when more than `max_patients` are tracked.
+    Given a stream `position` (e.g. the Kinesis sequence number, as an int),
+    an event at or before the last position folded into the patient's series
+    is a replay and is not folded in again, so re-reading a page after a
+    failure does not double-count. Thread-safe: shard workers share one store.
+    """
+
+    def __init__(self, windows_min=ROLLING_WINDOWS_MIN, capacity=RING_CAPACITY, max_patients=MAX_PATIENTS,
+                 idle_ttl_s=IDLE_TTL_S):
+        if list(windows_min) != ROLLING_WINDOWS_MIN:
+            raise ValueError(f"Windows must match the feature schema ({ROLLING_WINDOWS_MIN})")
+        self.windows_s = tuple(60.0 * w for w in windows_min)
+        self.capacity = capacity
+        self.max_patients = max_patients
+        self.idle_ttl_s = idle_ttl_s
+        self._names = [_feature_names(w) for w in windows_min]
+        self._empty = PatientSeries(self.windows_s, capacity).features(self._names)
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+        self.stream_time = None
+        self.events = 0
+        self.skipped = 0
+        self.replayed = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def update(self, patient_id, timestamp, vitals, position=None) -> dict:
+        """Add one reading (epoch seconds, dict holding ROLLING_VITALS) and return the patient's aggregates."""
+        readings = tuple(vitals.get(name) for name in ROLLING_VITALS)
+        with self._lock:
+            series = self._series.get(patient_id)
+            if position is not None and series is not None and series.position is not None \
+                    and position <= series.position:
+                self.replayed += 1
+                return series.features(self._names)
+            if None in readings:
+                # Incomplete readings are not folded in; the patient's current aggregates still apply
+                self.skipped += 1
+                return series.features(self._names) if series is not None else dict(self._empty)
+            if series is None:
+                series = self._series[patient_id] = PatientSeries(self.windows_s, self.capacity)
+            else:
+                self._series.move_to_end(patient_id)
+            series.push(timestamp, readings)
+            if position is not None:
+                series.position = position
+            self.events += 1
+            if self.stream_time is None or timestamp > self.stream_time:
+                self.stream_time = timestamp
+            self._evict()
+            return series.features(self._names)
+
+    def update_event(self, vitals, position=None) -> dict:
+        """update() for a raw stream event (patient_id, ISO timestamp and vitals)."""
+        return self.update(vitals["patient_id"], event_time(vitals.get("timestamp")), vitals, position)
+
+    def features(self, patient_id):
+        """Current aggregates for a patient, or None if the store does not track them."""
+        with self._lock:
+            series = self._series.get(patient_id)
+            return series.features(self._names) if series is not None else None
+
+    def _evict(self):
+        while len(self._series) > self.max_patients:
+            self._series.popitem(last=False)
+            self.evicted += 1
+        cutoff = self.stream_time - self.idle_ttl_s
+        while self._series:
+            oldest = next(iter(self._series.values()))
+            if oldest.last_time >= cutoff:
+                break
+            self._series.popitem(last=False)
+            self.expired += 1
+
+    def __len__(self):
+        return len(self._series)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the series (walks every patient; not for the hot path)."""
+        with self._lock:
+            return sys.getsizeof(self._series) + sum(s.memory_bytes() for s in self._series.values())
+
+    def stats(self) -> dict:
+        return {
+            "patients": len(self._series),
+            "events": self.events,
+            "skipped": self.skipped,
+            "replayed": self.replayed,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
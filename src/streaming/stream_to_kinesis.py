@@ -1,26 +1,43 @@
+import argparse
 import boto3
+import glob
+import itertools
 import json
+import os
 import random
+import threading
 import time
 from datetime import datetime
+from src.inference.tracing import span
+from src.streaming.feature_store import event_time
 
 # AWS Kinesis Config
 STREAM_NAME = "patient_vitals_stream"
 REGION = "us-east-1"
 
+# PutRecords limits: 500 records and 5 MB per request, 1 MB per record (data + partition key)
+MAX_BATCH_RECORDS = 500
+MAX_BATCH_BYTES = 5 * 1024 * 1024
+MAX_RECORD_BYTES = 1024 * 1024
+MAX_BATCH_DELAY_S = 0.1   # send a partial batch once its oldest record is this old
+PUT_ATTEMPTS = 5          # per record, including the first try
+RETRY_BACKOFF_S = 0.05    # doubled on every retry of the failed entries
+
+VITALS_REPLAY_DIR = "sample_data/vitals_stream"
+
 # Initialize Kinesis client
 kinesis = boto3.client("kinesis", region_name=REGION)
 
 # Simulated patient vitals
-def generate_vital_data():
-    patient_id = f"P{random.randint(100, 999)}"
+def generate_vital_data(patient_id=None, rng=random):
+    patient_id = patient_id or f"P{rng.randint(100, 999)}"
     return {
         "patient_id": patient_id,
         "timestamp": datetime.utcnow().isoformat(),
-        "heart_rate": random.randint(60, 130),
-        "blood_pressure": random.choice(["120/80", "130/85", "140/90"]),
-        "oxygen_saturation": round(random.uniform(90, 100), 2),
-        "temperature": round(random.uniform(36.0, 39.0), 1)
+        "heart_rate": rng.randint(60, 130),
+        "blood_pressure": rng.choice(["120/80", "130/85", "140/90"]),
+        "oxygen_saturation": round(rng.uniform(90, 100), 2),
+        "temperature": round(rng.uniform(36.0, 39.0), 1)
     }
 
 def stream_to_kinesis(interval=5):
@@ -35,5 +52,276 @@ def stream_to_kinesis(interval=5):
         print(f" Sent to Kinesis: {data}")
         time.sleep(interval)
 
+# === Batched Producer ===
+class KinesisBatchProducer:
+    """
+    Aggregates records into PutRecords calls of up to MAX_BATCH_RECORDS records /
+    MAX_BATCH_BYTES bytes. Entries the service rejects (throttling, internal
+    errors) are retried on their own with exponential backoff; records that
+    still fail after `max_attempts` are counted and dropped. Safe to share
+    between threads; a full batch is sent by the thread that fills it, and
+    after `start()` a background thread sends a partial batch once its
+    oldest record is `max_delay_s` old, even if no further put() arrives.
+
+    Retried entries may land after later records of the same patient, so
+    consumers should order by the event timestamp, not arrival.
+    """
+
+    def __init__(self, client=None, stream_name=STREAM_NAME, max_records=MAX_BATCH_RECORDS,
+                 max_bytes=MAX_BATCH_BYTES, max_delay_s=MAX_BATCH_DELAY_S, max_attempts=PUT_ATTEMPTS,
+                 backoff_s=RETRY_BACKOFF_S):
+        self.client = client or kinesis
+        self.stream_name = stream_name
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_delay_s = max_delay_s
+        self.max_attempts = max_attempts
+        self.backoff_s = backoff_s
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        self._closing = False
+        self.started_at = time.monotonic()
+        self.put_calls = 0
+        self.records_sent = 0
+        self.bytes_sent = 0
+        self.records_retried = 0
+        self.records_failed = 0
+
+    def put(self, data: dict, partition_key=None):
+        body = json.dumps(data).encode("utf-8")
+        key = partition_key or data["patient_id"]
+        size = len(body) + len(key.encode("utf-8"))
+        if size > MAX_RECORD_BYTES:
+            raise ValueError(f"Record for {key} is {size} bytes; Kinesis accepts at most {MAX_RECORD_BYTES}")
+
+        batches = []
+        with self._lock:
+            if self._buffer and self._buffer_bytes + size > self.max_bytes:
+                batches.append(self._take())
+            if not self._buffer:
+                self._oldest = time.monotonic()
+                self._cond.notify()  # start the flusher's age clock
+            self._buffer.append({"Data": body, "PartitionKey": key})
+            self._buffer_bytes += size
+            if len(self._buffer) >= self.max_records or time.monotonic() - self._oldest >= self.max_delay_s:
+                batches.append(self._take())
+        for batch in batches:
+            self._send(batch)
+
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._send(batch)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="kinesis-producer-flush", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            with self._cond:
+                self._closing = True
+                self._cond.notify()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closing and (
+                    not self._buffer or time.monotonic() - self._oldest < self.max_delay_s
+                ):
+                    self._cond.wait(self._oldest + self.max_delay_s - time.monotonic() if self._buffer else None)
+                if self._closing:
+                    return
+                batch = self._take()
+            self._send(batch)
+
+    def _take(self):
+        batch, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        return batch
+
+    def _send(self, entries):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with span("producer", "put_records"):
+                    response = self.client.put_records(StreamName=self.stream_name, Records=entries)
+                failed = [e for e, r in zip(entries, response["Records"]) if r.get("ErrorCode")]
+            except Exception as e:
+                # The whole request failed (network, throttled request); retry every entry
+                print(f" PutRecords failed ({e}); retrying {len(entries)} records.")
+                failed = entries
+            with self._stats_lock:
+                self.put_calls += 1
+                self.records_sent += len(entries) - len(failed)
+                failed_ids = {id(e) for e in failed}
+                self.bytes_sent += sum(len(e["Data"]) for e in entries if id(e) not in failed_ids)
+                if failed and attempt < self.max_attempts:
+                    self.records_retried += len(failed)
+            if not failed:
+                return
+            entries = failed
+            if attempt < self.max_attempts:
+                time.sleep(self.backoff_s * (2 ** (attempt - 1)) * random.uniform(0.5, 1.0))
+        with self._stats_lock:
+            self.records_failed += len(entries)
+        print(f" Dropped {len(entries)} records after {self.max_attempts} PutRecords attempts.")
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "put_calls": self.put_calls,
+            "records_sent": self.records_sent,
+            "records_retried": self.records_retried,
+            "records_failed": self.records_failed,
+            "bytes_sent": self.bytes_sent,
+            "buffered": len(self._buffer),
+            "records_per_sec": round(self.records_sent / elapsed, 1) if elapsed else 0.0,
+        }
+
+class RateLimiter:
+    """Paces all callers together to `rate` events/sec; no more than one second of burst credit."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = None
+        self._lock = threading.Lock()
+
+    def acquire(self, n=1):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._next is None or self._next < now - 1.0:
+                self._next = now
+            slot = self._next
+            self._next += n * self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# === Load Generation ===
+def simulate_patients(producer, rate=1000, patients=1000, workers=4, duration_s=None, max_events=None,
+                      stop_event=None):
+    """
+    Stream synthetic vitals for `patients` simulated patients from `workers`
+    threads (each owning a slice of the patients) at `rate` events/sec overall
+    (0 = unthrottled), until `duration_s` elapses or `max_events` are sent.
+    """
+    stop_event = stop_event or threading.Event()
+    limiter = RateLimiter(rate)
+    issued = itertools.count()
+    deadline = time.monotonic() + duration_s if duration_s else None
+    patient_ids = [f"P{100 + i}" for i in range(patients)]
+
+    def worker(index):
+        rng = random.Random(index)
+        mine = patient_ids[index::workers]
+        for patient_id in itertools.cycle(mine):
+            if stop_event.is_set() or (deadline and time.monotonic() >= deadline):
+                return
+            if max_events is not None and next(issued) >= max_events:
+                return
+            limiter.acquire()
+            producer.put(generate_vital_data(patient_id, rng))
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"vitals-producer-{i}", daemon=True)
+               for i in range(min(workers, patients))]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+    producer.flush()
+    elapsed = time.monotonic() - start
+    print(f" Sent {producer.records_sent} events in {elapsed:.1f}s ({producer.records_sent / elapsed:.0f}/s).")
+    return producer.stats()
+
+def _event_time(event):
+    """Epoch seconds of the event's timestamp (naive means UTC), or None if it has none or it does not parse."""
+    if event.get("timestamp") is None:
+        return None
+    try:
+        return event_time(event["timestamp"])
+    except (TypeError, ValueError):
+        return None
+
+def load_replay_events(path=VITALS_REPLAY_DIR):
+    """Vitals events from a file or directory of NDJSON / JSON-array files, ordered by timestamp."""
+    files = sorted(f for f in glob.glob(os.path.join(path, "*")) if os.path.isfile(f)) if os.path.isdir(path) else [path]
+    events = []
+    for file in files:
+        with open(file) as f:
+            content = f.read().strip()
+        if not content:
+            continue
+        if content.startswith("["):
+            events.extend(json.loads(content))
+        else:
+            events.extend(json.loads(line) for line in content.splitlines() if line.strip())
+    timed = [(_event_time(e), i, e) for i, e in enumerate(events)]
+    if all(t is not None for t, _, _ in timed):
+        timed.sort()
+    return [(t, e) for t, _, e in timed]
+
+def replay(producer, events, speed=1.0):
+    """
+    Re-send recorded events keeping their relative timing, `speed` times faster
+    than real time (speed <= 0 sends as fast as possible). Events without a
+    parseable timestamp are sent without delay.
+    """
+    start = time.monotonic()
+    first = next((t for t, _ in events if t is not None), None)
+    for event_time, event in events:
+        if speed > 0 and event_time is not None and first is not None:
+            delay = start + (event_time - first) / speed - time.monotonic()
+            if delay > 0:
+                producer.flush()  # don't hold buffered events across the gap
+                time.sleep(delay)
+        producer.put(event)
+    producer.flush()
+    elapsed = time.monotonic() - start
+    print(f" Replayed {len(events)} events in {elapsed:.1f}s at {speed}x.")
+    return producer.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description="Produce patient vitals to Kinesis.")
+    parser.add_argument("--mode", choices=["synthetic", "replay", "single"], default="synthetic",
+                        help="single = one put_record every --interval seconds (original behaviour)")
+    parser.add_argument("--rate", type=float, default=100.0, help="target events/sec (0 = unthrottled)")
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run (default: until Ctrl-C)")
+    parser.add_argument("--events", type=int, default=None, help="stop after this many events")
+    parser.add_argument("--path", default=VITALS_REPLAY_DIR, help="file or directory to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up over real time")
+    parser.add_argument("--interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.mode == "single":
+        stream_to_kinesis(args.interval)
+        return
+    producer = KinesisBatchProducer().start()
+    print(f" Streaming to Kinesis stream: {STREAM_NAME} ({args.mode})")
+    if args.mode == "replay":
+        stats = replay(producer, load_replay_events(args.path), args.speed)
+    else:
+        stats = simulate_patients(producer, args.rate, args.patients, args.workers, args.duration, args.events)
+    producer.close()
+    print(f" Producer stats: {stats}")
+
 if __name__ == "__main__":
-    stream_to_kinesis()
+    main()
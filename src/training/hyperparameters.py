@@ -0,0 +1,31 @@
+import json
+import os
+
+# === CONFIG ===
+BEST_PARAMS_PATH = os.getenv("BEST_PARAMS_PATH", "models/best_hyperparameters.json")  # written by tune.py
+
+# Defaults used until a tuning run has written BEST_PARAMS_PATH
+NUM_ROUND = 100
+HYPERPARAMETERS = {
+    "objective": "binary:logistic",
+    "max_depth": 5,
+    "eta": 0.2,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "eval_metric": "logloss",
+}
+# Local-only settings, not sent to the SageMaker container
+LOCAL_TRAINING_PARAMS = {"tree_method": "hist", "max_bin": 256}
+
+def load_hyperparameters(path=BEST_PARAMS_PATH):
+    """(params, num_round): the best tuned config if one was saved, else the defaults."""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            best = json.load(f)
+        return dict(HYPERPARAMETERS, **best["params"]), best["num_round"]
+    return dict(HYPERPARAMETERS), NUM_ROUND
+
+def sagemaker_hyperparameters(path=BEST_PARAMS_PATH):
+    """Keyword arguments for Estimator.set_hyperparameters()."""
+    params, num_round = load_hyperparameters(path)
+    return dict(params, num_round=num_round)
@@ -1,12 +1,20 @@
 import boto3
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine
 from datetime import datetime
 from io import StringIO
 import os
-import sagemaker
-from sagemaker.inputs import TrainingInput
-from sagemaker.estimator import Estimator
+import time
+from src.features.schema import FEATURE_COLUMNS, encode_columns
+from src.inference.registry import ModelRegistry
+from src.post_prediction.drift import (
+    DRIFT_REFERENCE_PATH, DriftProfile, build_reference_profile, compare_profiles, load_live_profile,
+    reset_live_state
+)
+from src.sql_to_s3.dataset import IncrementalDataset, has_outcome_label, to_training_schema
+from src.training.hyperparameters import sagemaker_hyperparameters
+from src.training.train_local import train_from_dataset, train_local
 
 # === CONFIG ===
 DB_TYPE = "mysql"  # or "postgresql"
@@ -20,6 +28,9 @@ BUCKET = "your-s3-bucket-name"
 ROLE_ARN = "arn:aws:iam::YOUR_AWS_ACCOUNT_ID:role/SageMakerExecutionRole"
 RETRAIN_PREFIX = "retraining/"
 ARTIFACT_PATH = f"s3://{BUCKET}/retraining_output/"
+INCREMENTAL_DATASET = os.getenv("INCREMENTAL_DATASET", "true").lower() != "false"
+TRAINING_BACKEND = os.getenv("TRAINING_BACKEND", "sagemaker")  # "sagemaker" or "local" (xgboost hist on this node)
+AUTO_PROMOTE = os.getenv("AUTO_PROMOTE", "true").lower() == "true"  # serve locally trained models right away
 
 def get_engine():
     if DB_TYPE == "mysql":
@@ -30,6 +41,19 @@ def get_engine():
         raise ValueError("Unsupported DB type")
 
 def check_drift(engine):
+    # Statistical drift: live sketches saved by the API/consumer vs. the training reference profile
+    if os.path.exists(DRIFT_REFERENCE_PATH):
+        reference = DriftProfile.load(DRIFT_REFERENCE_PATH)
+        report = compare_profiles(reference, load_live_profile(reference))
+        for name, entry in report["features"].items():
+            print(f" {name}: {entry['status']} (psi={entry.get('psi')}, ks={entry.get('ks')}, n={entry['live_count']})")
+        if report["drifted"]:
+            print(f" Drift detected in {', '.join(report['drifted_features'])}. Retraining needed.")
+        else:
+            print(" No significant drift detected.")
+        return report["drifted"]
+
+    print(" No drift reference profile; falling back to row counts.")
     patient_data_count = pd.read_sql("SELECT COUNT(*) AS count FROM patient_data;", con=engine)['count'].iloc[0]
     predictions_count = pd.read_sql("SELECT COUNT(*) AS count FROM predictions_log;", con=engine)['count'].iloc[0]
     
@@ -43,10 +67,21 @@ def check_drift(engine):
         print(" No significant drift detected.")
         return False
 
-def fetch_combined_data(engine):
-    df_original = pd.read_sql("SELECT * FROM patient_data", con=engine)
-    df_new = pd.read_sql("SELECT * FROM predictions_log", con=engine)
-    df_new = df_new[df_original.columns]  # Ensure same structure
+def fetch_combined_data(engine, dataset=None):
+    """patient_data, plus the logged predictions once they carry an observed outcome label."""
+    if dataset is not None:
+        # Base snapshot + prediction deltas from the dataset; only rows past the watermark are queried
+        dataset.sync(engine)
+        df_original = dataset.read("patient_data")
+    else:
+        df_original = pd.read_sql("SELECT * FROM patient_data", con=engine)
+    if not has_outcome_label("predictions_log"):
+        return df_original  # their only label is the model's own prediction
+    if dataset is not None:
+        df_new = dataset.read("predictions_log")
+    else:
+        df_new = pd.read_sql("SELECT * FROM predictions_log", con=engine)
+    df_new = to_training_schema(df_new, "predictions_log", df_original.columns)  # Ensure same structure
     df_combined = pd.concat([df_original, df_new], ignore_index=True)
     return df_combined
 
@@ -55,13 +90,18 @@ def upload_data_to_s3(df, bucket, prefix):
     s3_key = f"{prefix}retraining_data_{timestamp}.csv"
 
     csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
+    df.to_csv(csv_buffer, index=False, header=False)
     s3 = boto3.client("s3")
     s3.put_object(Bucket=bucket, Key=s3_key, Body=csv_buffer.getvalue())
     print(f" Retraining CSV uploaded to s3://{bucket}/{s3_key}")
     return f"s3://{bucket}/{s3_key}"
 
 def run_sagemaker_training(s3_input_uri):
+    # Imported here so local training does not need the SageMaker SDK
+    import sagemaker
+    from sagemaker.inputs import TrainingInput
+    from sagemaker.estimator import Estimator
+
     session = sagemaker.Session()
     xgb_image_uri = sagemaker.image_uris.retrieve("xgboost", REGION, version="1.5-1")
 
@@ -75,41 +115,63 @@ def run_sagemaker_training(s3_input_uri):
         base_job_name="xgb-retraining-job"
     )
 
-    estimator.set_hyperparameters(
-        objective="binary:logistic",
-        num_round=100,
-        max_depth=5,
-        eta=0.2,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        eval_metric="logloss"
-    )
+    estimator.set_hyperparameters(**sagemaker_hyperparameters())
 
     train_input = TrainingInput(
         s3_data=s3_input_uri,
         content_type="csv"
     )
 
+    start = time.perf_counter()
     estimator.fit({"train": train_input})
-    print(" SageMaker retraining job launched.")
+    print(f" SageMaker retraining job finished in {time.perf_counter() - start:.1f}s wall time "
+          f"(ml.m5.large, including provisioning).")
+
+def run_local_training(engine, dataset=None):
+    """Train on this node; reads the incremental dataset's partitions directly when available."""
+    if dataset is not None:
+        booster, metadata, _ = train_from_dataset(dataset, engine)
+        df = dataset.read("patient_data")
+        X = encode_columns(df)  # the training matrix also holds other tables' rows; profile and score the same rows
+    else:
+        df = fetch_combined_data(engine)
+        X = encode_columns(df)
+        booster, metadata = train_local(X, df["readmitted"].to_numpy(dtype=np.float32))
+    # Reference profile includes the new model's scores, so the probability sketch is compared too
+    build_reference_profile(df, booster.inplace_predict(X))
+    # Running APIs pick up the promoted version on their next registry poll
+    ModelRegistry().register(metadata["artifact"], metadata, promote=AUTO_PROMOTE)
+    return metadata
 
 def run_retraining_pipeline():
     engine = get_engine()
 
-    if check_drift(engine):
-        df = fetch_combined_data(engine)
+    if not check_drift(engine):
+        print("ℹ Skipping retraining...")
+        return
 
-        # Preprocess data: features + label only
-        df = df[["age", "gender", "blood_pressure", "heart_rate", "cholesterol", "blood_sugar", "readmitted"]]
-        df = pd.get_dummies(df, columns=["gender", "blood_pressure"], drop_first=True)
+    dataset = IncrementalDataset() if INCREMENTAL_DATASET else None
+    if TRAINING_BACKEND == "local":
+        run_local_training(engine, dataset)
+        reset_live_state()
+        return
 
-        # Save to S3
-        s3_input_path = upload_data_to_s3(df, BUCKET, RETRAIN_PREFIX)
+    df = fetch_combined_data(engine, dataset)
 
-        # Launch training
-        run_sagemaker_training(s3_input_path)
-    else:
-        print("ℹ Skipping retraining...")
+    # New reference profile for the data the next model is trained on; live sketches start over
+    build_reference_profile(df)
+    reset_live_state()
+
+    # Preprocess data: same encoding as the prediction API, label first (SageMaker XGBoost CSV format)
+    X = encode_columns(df)
+    y = df["readmitted"].to_numpy(dtype=np.float32)
+    df = pd.DataFrame(np.column_stack([y, X]), columns=["readmitted"] + FEATURE_COLUMNS)
+
+    # Save to S3
+    s3_input_path = upload_data_to_s3(df, BUCKET, RETRAIN_PREFIX)
+
+    # Launch training
+    run_sagemaker_training(s3_input_path)
 
 if __name__ == "__main__":
     run_retraining_pipeline()
@@ -0,0 +1,120 @@
+import json
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from src.features.schema import DTYPE, FEATURE_COLUMNS, N_FEATURES, encode_columns
+from src.training.hyperparameters import LOCAL_TRAINING_PARAMS, load_hyperparameters
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# === CONFIG ===
+MODEL_DIR = "models/"
+LABEL_COLUMN = "readmitted"
+NTHREAD = int(os.getenv("TRAIN_NTHREAD", "0")) or os.cpu_count()
+READ_CHUNK_ROWS = 50000
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KiB on Linux
+
+def _label_column(dataset, table):
+    source = dataset.sources[table]
+    label = source.get("label_column", LABEL_COLUMN)
+    return label if label in source["columns"] else None
+
+def load_dataset_matrix(dataset, tables=None, chunk_rows=READ_CHUNK_ROWS):
+    """
+    Feature matrix and labels straight from the dataset's gzip CSV partitions.
+    Only tables with an outcome label column are used (not `predictions_log`,
+    whose only label is the served prediction); rows are encoded chunk by chunk
+    into arrays preallocated from the manifest's row counts, so no DataFrame
+    of the whole dataset is ever built.
+    """
+    partitions = [
+        p for p in dataset.load_manifest()["partitions"]
+        if _label_column(dataset, p["table"]) and (tables is None or p["table"] in tables)
+    ]
+    n_rows = sum(p["rows"] for p in partitions)
+    X = np.empty((n_rows, N_FEATURES), dtype=DTYPE)
+    y = np.empty(n_rows, dtype=DTYPE)
+    row = 0
+    for partition in partitions:
+        with dataset.open_partition(partition["key"]) as f:
+            for chunk in pd.read_csv(f, compression="gzip", chunksize=chunk_rows):
+                end = row + len(chunk)
+                encode_columns(chunk, out=X[row:end])
+                y[row:end] = chunk[_label_column(dataset, partition["table"])].to_numpy(dtype=DTYPE)
+                row = end
+    return X[:row], y[:row]
+
+def train_local(X, y, params=None, num_round=None, nthread=NTHREAD, model_dir=MODEL_DIR, version=None,
+                extra_metadata=None):
+    """
+    Train with xgboost's `hist` method on this node and write a versioned
+    artifact `models/xgboost-<version>.ubj` with a `.meta.json` alongside
+    (hyperparameters, rows, wall time, peak RSS, final train logloss).
+    Hyperparameters are the SageMaker ones (or the best tuned config), with
+    `params` / `num_round` overriding them.
+    """
+    base_params, base_round = load_hyperparameters()
+    params = {**base_params, **LOCAL_TRAINING_PARAMS, **(params or {}), "nthread": nthread}  # later keys win
+    num_round = num_round or base_round
+    start = time.perf_counter()
+    if params["tree_method"] == "hist":
+        # QuantileDMatrix bins the features directly instead of keeping a float copy of X
+        dtrain = xgb.QuantileDMatrix(X, label=y, max_bin=params["max_bin"], nthread=nthread)
+    else:
+        dtrain = xgb.DMatrix(X, label=y, nthread=nthread)
+    evals_result = {}
+    booster = xgb.train(params, dtrain, num_boost_round=num_round, evals=[(dtrain, "train")],
+                        evals_result=evals_result, verbose_eval=False)
+    wall_time_s = time.perf_counter() - start
+
+    version = version or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    os.makedirs(model_dir, exist_ok=True)
+    artifact = os.path.join(model_dir, f"xgboost-{version}.ubj")
+    booster.save_model(artifact)
+    metadata = {
+        "version": version,
+        "artifact": artifact,
+        "backend": "local",
+        "trained_at": datetime.utcnow().isoformat(),
+        "rows": int(len(y)),
+        "features": FEATURE_COLUMNS,
+        "num_round": num_round,
+        "params": params,
+        "wall_time_s": round(wall_time_s, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "train_logloss": round(evals_result["train"]["logloss"][-1], 6),
+    }
+    metadata.update(extra_metadata or {})
+    with open(os.path.join(model_dir, f"xgboost-{version}.meta.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+    print(f" Trained locally on {len(y)} rows in {wall_time_s:.1f}s "
+          f"({nthread} threads, peak RSS {metadata['peak_rss_mb']} MB) -> {artifact}")
+    return booster, metadata
+
+def train_from_dataset(dataset, engine=None, **kwargs):
+    """Sync the incremental dataset (if an engine is given) and train on base + deltas."""
+    if engine is not None:
+        dataset.sync(engine)
+    start = time.perf_counter()
+    X, y = load_dataset_matrix(dataset)
+    load_s = round(time.perf_counter() - start, 3)
+    extra = {"dataset_watermarks": dataset.load_manifest()["watermarks"], "load_time_s": load_s}
+    extra.update(kwargs.pop("extra_metadata", None) or {})
+    booster, metadata = train_local(X, y, extra_metadata=extra, **kwargs)
+    return booster, metadata, X
+
+if __name__ == "__main__":
+    from src.post_prediction.store_to_sql import get_engine
+    from src.sql_to_s3.dataset import IncrementalDataset
+    _, metadata, _ = train_from_dataset(IncrementalDataset(), get_engine())
+    print(json.dumps({k: metadata[k] for k in ("version", "rows", "wall_time_s", "peak_rss_mb", "train_logloss")}))
@@ -4,6 +4,7 @@ from sagemaker.inputs import TrainingInput
 import boto3
 import os
 from datetime import datetime
+from src.training.hyperparameters import sagemaker_hyperparameters
 
 # === CONFIG ===
 ROLE_ARN = "arn:aws:iam::YOUR_AWS_ACCOUNT_ID:role/SageMakerExecutionRole"
@@ -27,16 +28,8 @@ estimator = Estimator(
     base_job_name="xgb-readmission-train"
 )
 
-# Set hyperparameters
-estimator.set_hyperparameters(
-    objective="binary:logistic",
-    num_round=100,
-    max_depth=5,
-    eta=0.2,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    eval_metric="logloss"
-)
+# Set hyperparameters (defaults, or the best config saved by src/training/tune.py)
+estimator.set_hyperparameters(**sagemaker_hyperparameters())
 
 # Input format
 train_input = TrainingInput(
@@ -0,0 +1,248 @@
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+import numpy as np
+import xgboost as xgb
+from src.features.schema import FEATURE_COLUMNS
+from src.inference.registry import ModelRegistry
+from src.training.hyperparameters import BEST_PARAMS_PATH, HYPERPARAMETERS, LOCAL_TRAINING_PARAMS
+
+# === CONFIG ===
+TUNING_DIR = "tuning/"                 # one sub-directory per run: trials.jsonl, best.json
+MODEL_DIR = "models/"
+TUNE_BUDGET_S = float(os.getenv("TUNE_BUDGET_S", "600"))
+TUNE_WORKERS = int(os.getenv("TUNE_WORKERS", "0")) or os.cpu_count()
+N_TRIALS = 27
+VALID_FRACTION = 0.2
+EARLY_STOPPING_ROUNDS = 20
+MIN_ROUNDS = 50          # boosting rounds allowed at the first successive-halving rung
+MAX_ROUNDS = 1000
+REDUCTION_FACTOR = 3     # keep the best 1/3 of configs at each rung
+SEARCH_SPACE = {
+    "max_depth": ("int", 3, 8),
+    "eta": ("log", 0.02, 0.3),
+    "subsample": ("float", 0.6, 1.0),
+    "colsample_bytree": ("float", 0.6, 1.0),
+    "min_child_weight": ("log", 1.0, 20.0),
+    "lambda": ("log", 0.1, 10.0),
+}
+
+def sample_params(rng):
+    params = {}
+    for name, (kind, low, high) in SEARCH_SPACE.items():
+        if kind == "int":
+            params[name] = rng.randint(low, high)
+        elif kind == "log":
+            params[name] = round(math.exp(rng.uniform(math.log(low), math.log(high))), 5)
+        else:
+            params[name] = round(rng.uniform(low, high), 4)
+    return params
+
+def rung_schedule(strategy, n_trials):
+    """Boosting-round cap per rung: one full-length rung for random search, growing caps for halving."""
+    if strategy == "random":
+        return [MAX_ROUNDS]
+    n_rungs = int(math.log(n_trials, REDUCTION_FACTOR) + 1e-9) + 1
+    return [min(MAX_ROUNDS, MIN_ROUNDS * REDUCTION_FACTOR ** k) for k in range(n_rungs)]
+
+# === Worker Process ===
+_dtrain = None
+_dvalid = None
+
+def _init_worker(data_dir, nthread):
+    """Build the train/valid matrices once per worker from the memory-mapped split."""
+    global _dtrain, _dvalid
+    load = lambda name: np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode="r")
+    _dtrain = xgb.QuantileDMatrix(load("X_train"), label=load("y_train"),
+                                  max_bin=LOCAL_TRAINING_PARAMS["max_bin"], nthread=nthread)
+    _dvalid = xgb.QuantileDMatrix(load("X_valid"), label=load("y_valid"), ref=_dtrain, nthread=nthread)
+
+class _Deadline(xgb.callback.TrainingCallback):
+    """Stops boosting once the search's wall-clock budget is spent."""
+
+    def __init__(self, deadline):
+        super().__init__()
+        self.deadline = deadline
+        self.hit = False
+
+    def after_iteration(self, model, epoch, evals_log):
+        self.hit = time.time() >= self.deadline
+        return self.hit
+
+def run_trial(trial, num_round, deadline, model_path, nthread):
+    start = time.perf_counter()
+    params = dict(HYPERPARAMETERS, **LOCAL_TRAINING_PARAMS, **trial["params"], nthread=nthread)
+    early_stopping = xgb.callback.EarlyStopping(rounds=EARLY_STOPPING_ROUNDS, save_best=True)
+    deadline_cb = _Deadline(deadline)
+    evals_result = {}
+    booster = xgb.train(params, _dtrain, num_boost_round=num_round, evals=[(_dvalid, "valid")],
+                        evals_result=evals_result, callbacks=[early_stopping, deadline_cb], verbose_eval=False)
+    rounds_trained = len(evals_result["valid"]["logloss"])
+    losses = evals_result["valid"]["logloss"]
+    best_iteration = int(np.argmin(losses))
+    booster.save_model(model_path)
+    if deadline_cb.hit:
+        stopped = "deadline"
+    elif rounds_trained < num_round:
+        stopped = "early_stopping"
+    else:
+        stopped = "max_rounds"
+    return dict(
+        trial,
+        num_round=num_round,
+        rounds_trained=rounds_trained,
+        best_iteration=best_iteration,
+        valid_logloss=round(float(losses[best_iteration]), 6),
+        stopped=stopped,
+        seconds=round(time.perf_counter() - start, 3),
+        model_path=model_path,
+    )
+
+# === Search ===
+def _split(X, y, valid_fraction, seed):
+    order = np.random.default_rng(seed).permutation(len(y))
+    n_valid = max(1, int(len(y) * valid_fraction))
+    valid, train = order[:n_valid], order[n_valid:]
+    return X[train], y[train], X[valid], y[valid]
+
+def tune(X, y, budget_s=TUNE_BUDGET_S, workers=TUNE_WORKERS, n_trials=N_TRIALS, strategy="halving", seed=0,
+         tuning_dir=TUNING_DIR, model_dir=MODEL_DIR, best_params_path=BEST_PARAMS_PATH, registry=None):
+    """
+    Search hyperparameters on a process pool within `budget_s` seconds of wall time.
+
+    Random configs are scored by validation logloss on a held-out split, each
+    trial early-stopping after EARLY_STOPPING_ROUNDS rounds without
+    improvement. With strategy="halving" every rung keeps the best
+    1/REDUCTION_FACTOR configs and lets them boost for REDUCTION_FACTOR times
+    more rounds; "random" runs every config once at MAX_ROUNDS. Trials still
+    running at the deadline stop boosting and keep their best iteration;
+    queued ones are cancelled. Every finished trial is appended to
+    `<tuning_dir>/<run_id>/trials.jsonl`. The best config is written to
+    best.json and `best_params_path`, and its model is copied to
+    `models/xgboost-<version>.ubj` and registered (not promoted) in `registry`
+    if one is given.
+    """
+    start = time.time()
+    deadline = start + budget_s
+    run_id = datetime.utcnow().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    run_dir = os.path.join(tuning_dir, run_id)
+    data_dir = os.path.join(run_dir, "data")
+    trials_dir = os.path.join(run_dir, "trials")
+    os.makedirs(data_dir)
+    os.makedirs(trials_dir)
+
+    X_train, y_train, X_valid, y_valid = _split(np.asarray(X), np.asarray(y), VALID_FRACTION, seed)
+    for name, array in (("X_train", X_train), ("y_train", y_train), ("X_valid", X_valid), ("y_valid", y_valid)):
+        np.save(os.path.join(data_dir, f"{name}.npy"), array)
+
+    rng = random.Random(seed)
+    survivors = [{"config_id": i, "params": sample_params(rng)} for i in range(n_trials)]
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    results = []
+    print(f" Tuning run {run_id}: {n_trials} configs, {strategy}, {workers} workers x {nthread} threads, "
+          f"budget {budget_s:.0f}s")
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(data_dir, nthread)) as pool, \
+            open(os.path.join(run_dir, "trials.jsonl"), "a") as trials_log:
+        for rung, num_round in enumerate(rung_schedule(strategy, n_trials)):
+            pending = {}
+            for config in survivors:
+                trial = dict(config, trial_id=f"r{rung}-c{config['config_id']}", rung=rung)
+                model_path = os.path.join(trials_dir, f"{trial['trial_id']}.ubj")
+                pending[pool.submit(run_trial, trial, num_round, deadline, model_path, nthread)] = trial
+            rung_results = []
+            while pending:
+                done, _ = wait(pending, timeout=max(0.0, deadline - time.time()) + 5.0, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    trial = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = dict(trial, error=str(e))
+                    trials_log.write(json.dumps(result) + "\n")
+                    trials_log.flush()
+                    if "error" not in result:
+                        rung_results.append(result)
+                if time.time() >= deadline:
+                    for future in pending:
+                        future.cancel()
+            for future in pending:
+                future.cancel()  # left after a timed-out wait; queued trials would still run at pool shutdown
+            results.extend(rung_results)
+            if time.time() >= deadline or not rung_results:
+                break
+            rung_results.sort(key=lambda r: r["valid_logloss"])
+            survivors = [{"config_id": r["config_id"], "params": r["params"]}
+                         for r in rung_results[:max(1, len(rung_results) // REDUCTION_FACTOR)]]
+
+    if not results:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        raise RuntimeError(f"No tuning trial finished within {budget_s}s")
+
+    best = min(results, key=lambda r: r["valid_logloss"])
+    version = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    artifact = os.path.join(model_dir, f"xgboost-{version}.ubj")
+    os.makedirs(model_dir, exist_ok=True)
+    shutil.copyfile(best["model_path"], artifact)
+    summary = {
+        "run_id": run_id,
+        "strategy": strategy,
+        "params": best["params"],
+        "num_round": best["best_iteration"] + 1,
+        "valid_logloss": best["valid_logloss"],
+        "trial_id": best["trial_id"],
+        "trials": len(results),
+        "wall_time_s": round(time.time() - start, 3),
+        "budget_s": budget_s,
+        "artifact": artifact,
+    }
+    with open(os.path.join(run_dir, "best.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    if best_params_path:
+        if os.path.dirname(best_params_path):
+            os.makedirs(os.path.dirname(best_params_path), exist_ok=True)
+        with open(best_params_path, "w") as f:
+            json.dump(summary, f, indent=2)
+    metadata = {
+        "version": version, "artifact": artifact, "backend": "tune", "trained_at": datetime.utcnow().isoformat(),
+        "rows": int(len(y_train)), "features": FEATURE_COLUMNS, "num_round": summary["num_round"],
+        "params": dict(HYPERPARAMETERS, **LOCAL_TRAINING_PARAMS, **best["params"]),
+        "valid_logloss": best["valid_logloss"], "tuning_run": run_id,
+    }
+    with open(os.path.join(model_dir, f"xgboost-{version}.meta.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+    if registry is not None:
+        registry.register(artifact, metadata)
+
+    # Keep the trial log and summary; drop the split copy and the losing models
+    shutil.rmtree(data_dir, ignore_errors=True)
+    shutil.rmtree(trials_dir, ignore_errors=True)
+    print(f" Best of {len(results)} trials: valid logloss {best['valid_logloss']} with {best['params']}, "
+          f"{summary['num_round']} rounds ({summary['wall_time_s']:.0f}s) -> {artifact}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter search for the readmission model.")
+    parser.add_argument("--budget", type=float, default=TUNE_BUDGET_S, help="wall-clock budget in seconds")
+    parser.add_argument("--workers", type=int, default=TUNE_WORKERS)
+    parser.add_argument("--trials", type=int, default=N_TRIALS)
+    parser.add_argument("--strategy", choices=["halving", "random"], default="halving")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from src.post_prediction.store_to_sql import get_engine
+    from src.sql_to_s3.dataset import IncrementalDataset
+    from src.training.train_local import load_dataset_matrix
+    dataset = IncrementalDataset()
+    dataset.sync(get_engine())
+    X, y = load_dataset_matrix(dataset)
+    tune(X, y, args.budget, args.workers, args.trials, args.strategy, args.seed, registry=ModelRegistry())